@@ -2,7 +2,8 @@
  * ToxGuard Background Service Worker
  * Handles API communication between the content script and the ToxGuard server.
  * Acts as a bridge — receives classification requests via chrome.runtime messages
- * and forwards them to the FastAPI backend.
+ * and forwards them to the FastAPI backend over one persistent WebSocket,
+ * falling back to HTTP POST /predict when the socket is unavailable.
  *
  * @requires config.js — provides {@link CONFIG} with API_BASE
  */
@@ -58,8 +59,83 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
  * @property {ToxicityScores}  scores              - Per-category toxicity scores
  */
 
+/**
+ * @typedef {Object} PendingRequest
+ * @property {(results: ClassificationResult[]) => void} resolve
+ * @property {(error: Error) => void} reject
+ * @property {number} timer - Timeout handle
+ */
+
+/** Socket request timeout (ms) — matches the HTTP cold-start allowance. */
+const SOCKET_TIMEOUT_MS = 30000;
+
+/** HTTP request bodies at least this long (chars) are sent gzip-compressed. */
+const GZIP_MIN_BYTES = 4096;
+
+/** @type {{ base: string, ready: Promise<WebSocket> } | null} */
+let socketState = null;
+
+/** @type {Map<number, PendingRequest>} */
+const pendingRequests = new Map();
+
+let nextRequestId = 1;
+
+/**
+ * Open (or reuse) the WebSocket for an API base URL.
+ * Replies are routed back to their caller by correlation id.
+ *
+ * @param {string} base - API base URL (http/https)
+ * @returns {Promise<WebSocket>} An open socket
+ */
+function getSocket(base) {
+    if (socketState && socketState.base === base) {
+        return socketState.ready;
+    }
+    if (socketState) {
+        socketState.ready.then(ws => ws.close()).catch(() => {});
+    }
+
+    const url = base.replace(/^http/, "ws") + "/ws";
+    const ready = new Promise((resolve, reject) => {
+        const ws = new WebSocket(url);
+        ws.onopen = () => resolve(ws);
+        ws.onerror = () => reject(new Error(`WebSocket unavailable [URL: ${url}]`));
+        ws.onclose = () => {
+            if (socketState && socketState.ready === ready) {
+                socketState = null;
+            }
+            for (const [id, pending] of pendingRequests) {
+                clearTimeout(pending.timer);
+                pending.reject(new Error("Connection to server closed."));
+                pendingRequests.delete(id);
+            }
+        };
+        ws.onmessage = (event) => {
+            const reply = JSON.parse(event.data);
+            const pending = pendingRequests.get(reply.id);
+            if (!pending) return;
+            pendingRequests.delete(reply.id);
+            clearTimeout(pending.timer);
+            if (reply.status === 200) {
+                pending.resolve(reply.results);
+            } else {
+                const detail = typeof reply.detail === "string" ? reply.detail : JSON.stringify(reply.detail);
+                pending.reject(new Error(`API ${reply.status}: ${detail}`));
+            }
+        };
+    });
+    socketState = { base, ready };
+    ready.catch(() => {
+        if (socketState && socketState.ready === ready) {
+            socketState = null;
+        }
+    });
+    return ready;
+}
+
 /**
  * Send comments to the ToxGuard API for classification.
+ * Uses the persistent WebSocket when it can be opened, otherwise HTTP.
  *
  * @param {string[]} comments   - Array of comment texts to classify
  * @param {number}   [threshold=0.5] - Toxicity threshold (0–1)
@@ -68,18 +144,73 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
  */
 async function classifyComments(comments, threshold = 0.5) {
     const config = await getApiConfig();
-    const url = `${config.base}/predict`;
+
+    let ws;
+    try {
+        ws = await getSocket(config.base);
+    } catch {
+        return classifyOverHttp(config.base, comments, threshold);
+    }
+    return classifyOverSocket(ws, comments, threshold);
+}
+
+/**
+ * Send one pipelined classification message over an open socket.
+ *
+ * @param {WebSocket} ws         - Open socket from {@link getSocket}
+ * @param {string[]}  comments   - Array of comment texts to classify
+ * @param {number}    threshold  - Toxicity threshold (0–1)
+ * @returns {Promise<ClassificationResult[]>} Classified results
+ */
+function classifyOverSocket(ws, comments, threshold) {
+    const id = nextRequestId++;
+    return new Promise((resolve, reject) => {
+        const timer = setTimeout(() => {
+            pendingRequests.delete(id);
+            reject(new Error("Server timed out (possibly waking from sleep). Try again."));
+        }, SOCKET_TIMEOUT_MS);
+        pendingRequests.set(id, { resolve, reject, timer });
+        ws.send(JSON.stringify({ id, comments, threshold }));
+    });
+}
+
+/**
+ * Gzip large JSON bodies for slow uplinks (the server decompresses them).
+ * Responses are compressed by the server and decoded by fetch itself.
+ *
+ * @param {string} json - Serialized request body
+ * @returns {Promise<{body: BodyInit, headers: Object<string, string>}>}
+ */
+async function encodeRequestBody(json) {
+    const headers = { "Content-Type": "application/json" };
+    if (json.length < GZIP_MIN_BYTES || typeof CompressionStream === "undefined") {
+        return { body: json, headers };
+    }
+    const stream = new Blob([json]).stream().pipeThrough(new CompressionStream("gzip"));
+    const body = await new Response(stream).arrayBuffer();
+    return { body, headers: { ...headers, "Content-Encoding": "gzip" } };
+}
+
+/**
+ * Send comments to POST /predict (fallback when no socket is available).
+ *
+ * @param {string}   base       - API base URL
+ * @param {string[]} comments   - Array of comment texts to classify
+ * @param {number}   threshold  - Toxicity threshold (0–1)
+ * @returns {Promise<ClassificationResult[]>} Classified results
+ * @throws {Error} If server is unreachable or request fails
+ */
+async function classifyOverHttp(base, comments, threshold) {
+    const url = `${base}/predict`;
 
     try {
+        const { body, headers } = await encodeRequestBody(
+            JSON.stringify({ comments, threshold })
+        );
         const response = await fetch(url, {
             method: "POST",
-            headers: {
-                "Content-Type": "application/json",
-            },
-            body: JSON.stringify({
-                comments: comments,
-                threshold: threshold
-            }),
+            headers,
+            body,
             signal: AbortSignal.timeout(30000), // 30s timeout for cold starts
         });
 
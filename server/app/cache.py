@@ -0,0 +1,154 @@
+"""
+Score cache module — persistent store for raw model score vectors.
+Backed by SQLite in WAL mode so several workers can share one file and
+entries survive restarts and redeploys.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+# SQLite caps the number of bound parameters per statement; stay well below it.
+_SQL_CHUNK = 500
+
+
+def cache_key(namespace: str, text: str) -> bytes:
+    """Hash a text together with the model namespace it was scored under."""
+    return hashlib.sha256(f"{namespace}\x00{text}".encode("utf-8")).digest()
+
+
+class ScoreCache:
+    """Size-bounded, least-recently-used cache of float32 score vectors."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            " key BLOB PRIMARY KEY,"
+            " scores BLOB NOT NULL,"
+            " accessed REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS scores_accessed ON scores (accessed)"
+        )
+        self._conn.commit()
+        # Upper bound on the row count from this connection's view: every
+        # write may add a row; other workers' writes are seen at the next
+        # exact count, taken only when this bound passes max_entries
+        self._estimate = self._count()
+
+    def get_many(self, namespace: str, texts: list[str]) -> dict[int, np.ndarray]:
+        """
+        Look up a batch of texts in as few queries as possible.
+        Returns a mapping of input index → score vector for every hit.
+        """
+        keys = [cache_key(namespace, t) for t in texts]
+        found: dict[bytes, np.ndarray] = {}
+        with self._lock:
+            try:
+                for start in range(0, len(keys), _SQL_CHUNK):
+                    chunk = keys[start : start + _SQL_CHUNK]
+                    marks = ",".join("?" * len(chunk))
+                    rows = self._conn.execute(
+                        f"SELECT key, scores FROM scores WHERE key IN ({marks})",
+                        chunk,
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[key] = np.frombuffer(blob, dtype=np.float32)
+                    if rows:
+                        self._conn.execute(
+                            f"UPDATE scores SET accessed = ? WHERE key IN ({marks})",
+                            [time.time(), *chunk],
+                        )
+                self._conn.commit()
+            except sqlite3.Error as exc:
+                self.errors += 1
+                print(f"⚠️ Score cache lookup failed: {exc}")
+                found = {}
+
+            hits = {i: found[k] for i, k in enumerate(keys) if k in found}
+            self.hits += len(hits)
+            self.misses += len(keys) - len(hits)
+        return hits
+
+    def put_many(self, namespace: str, texts: list[str], scores: np.ndarray):
+        """Store one score row per text, then evict down to max_entries."""
+        now = time.time()
+        rows = [
+            (cache_key(namespace, t), np.asarray(s, dtype=np.float32).tobytes(), now)
+            for t, s in zip(texts, scores)
+        ]
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO scores (key, scores, accessed)"
+                    " VALUES (?, ?, ?)",
+                    rows,
+                )
+                self.writes += len(rows)
+                self._estimate += len(rows)
+                if self._estimate > self.max_entries:
+                    self._evict()
+                self._conn.commit()
+            except sqlite3.Error as exc:
+                self.errors += 1
+                print(f"⚠️ Score cache write failed: {exc}")
+
+    def _evict(self):
+        """
+        Once over max_entries, drop the least recently used rows down to 90%
+        of it, so the exact count is not needed again for a while (lock held).
+        """
+        count = self._count()
+        target = self.max_entries - self.max_entries // 10
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM scores WHERE key IN ("
+                " SELECT key FROM scores ORDER BY accessed LIMIT ?"
+                ")",
+                (count - target,),
+            )
+            self.evictions += count - target
+            count = target
+        self._estimate = count
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -3,15 +3,34 @@ Classifier module — encapsulates model loading and toxicity prediction.
 Separates ML concerns from the web framework.
 """
 
+import hashlib
 import io
+import os
 import pickle
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import NamedTuple
 
+import h5py
 import numpy as np
 from tf_keras.models import load_model
 from tf_keras.preprocessing.sequence import pad_sequences
 
+from .cache import ScoreCache
 from .config import get_settings
+from .folding import FoldedModel
+from .prefilter import LexicalPrefilter
+from .replicas import ReplicaPool
+from .tokens import (
+    VocabularyMismatchError,
+    export_vocabulary,
+    vocab_size,
+    vocabulary_fingerprint,
+)
+from .tuning import configure_threads
 
 
 class KerasCompatUnpickler(pickle.Unpickler):
@@ -23,47 +42,867 @@ class KerasCompatUnpickler(pickle.Unpickler):
         return super().find_class(module, name)
 
 
+def fingerprint_bytes(*blobs: bytes) -> str:
+    """Short content hash identifying one model + tokenizer artifact pair."""
+    digest = hashlib.sha256()
+    for blob in blobs:
+        digest.update(blob)
+    return digest.hexdigest()[:16]
+
+
+def load_model_bytes(data: bytes, suffix: str):
+    """load_model() for artifact bytes already in memory."""
+    if data.startswith(b"\x89HDF\r\n\x1a\n"):
+        with h5py.File(io.BytesIO(data), "r") as handle:
+            return load_model(handle)
+    # Other formats are only read from disk, so load a private copy
+    with tempfile.NamedTemporaryFile(suffix=suffix) as handle:
+        handle.write(data)
+        handle.flush()
+        return load_model(handle.name)
+
+
+class StageTimings(dict):
+    """Wall time per pipeline stage in milliseconds (perf_counter based)."""
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self[name] = self.get(name, 0.0) + elapsed
+
+    def header(self) -> str:
+        """Render as a Server-Timing header value."""
+        return ", ".join(f"{name};dur={ms:.2f}" for name, ms in self.items())
+
+
+class ModelBundle(NamedTuple):
+    """One immutable model + tokenizer version; swapped as a unit on reload."""
+
+    model: object
+    tokenizer: object
+    fingerprint: str
+    prefilter: LexicalPrefilter | None = None
+    vocab_version: str | None = None
+    folded: FoldedModel | None = None
+    replicas: ReplicaPool | None = None
+
+
+class PreparedBatch(NamedTuple):
+    """
+    A batch after the CPU-side stages, ready for the model. `padded` holds
+    the rows still to score (None when cache and prefilter covered all);
+    `counts` maps window rows back to comments in LONG_COMMENT_MODE.
+    """
+
+    bundle: ModelBundle
+    namespace: str | None
+    scores: np.ndarray
+    missing: list[int]
+    keys: list[str]
+    padded: np.ndarray | None = None
+    counts: np.ndarray | None = None
+    exact: np.ndarray | None = None
+
+
+def window_starts(length: int, maxlen: int, stride: int) -> list[int]:
+    """Start offsets of the windows covering a sequence longer than `maxlen`."""
+    return list(range(0, length - maxlen, stride)) + [length - maxlen]
+
+
+def plan_windows(
+    lengths: list[int], maxlen: int, stride: int, budget: int
+) -> tuple[list[bool], int]:
+    """
+    Which sequences longer than `maxlen` get windows, in order, so that the
+    extra rows beyond one per sequence stay within `budget`; the rest fall
+    back to truncation. Returns that mask and the extra rows it uses.
+    """
+    allowed, extra = [], 0
+    for length in lengths:
+        needed = len(window_starts(length, maxlen, stride)) - 1 if length > maxlen else 0
+        allowed.append(extra + needed <= budget)
+        extra += needed if allowed[-1] else 0
+    return allowed, extra
+
+
+def occlusion_spans(lengths: list[int], budget: int) -> list[int]:
+    """
+    Tokens occluded together per variant, for each comment, so that the
+    total number of variants stays within `budget`. The budget is shared
+    by water-filling: short comments get one variant per token and long
+    ones split the remainder evenly. Raises ValueError when there are more
+    non-empty comments than variants to give them one each.
+    """
+    order = sorted((i for i, n in enumerate(lengths) if n), key=lengths.__getitem__)
+    if len(order) > budget:
+        raise ValueError(f"{len(order)} comments need more than {budget} variants")
+    allowed = [0] * len(lengths)
+    remaining = budget
+    for rank, i in enumerate(order):
+        fair = remaining // (len(order) - rank)
+        allowed[i] = min(lengths[i], fair)
+        remaining -= allowed[i]
+    return [-(-n // a) if a else 1 for n, a in zip(lengths, allowed)]
+
+
+# Inputs run through a freshly loaded model before it is allowed to serve.
+WARMUP_TEXTS = ["", "hello", "You are an idiot and I hate you " * 20]
+
+
 class ToxicClassifier:
     """Encapsulates the toxic comment classification model."""
 
     def __init__(self):
-        self.model = None
-        self.tokenizer = None
+        self._bundle: ModelBundle | None = None
+        self._reload_lock = threading.Lock()
+        self._watcher: threading.Thread | None = None
+        self._watcher_stop = threading.Event()
+        self.last_reload: dict | None = None
+        self.cache = None
+        # Updated from request, pipeline and threadpool threads alike
+        self._counts_lock = threading.Lock()
+        self.stage_counts = {
+            "prefilter_seen": 0,
+            "prefilter_skipped": 0,
+            "model_rows": 0,
+            "window_extra_rows": 0,
+            "window_fallbacks": 0,
+        }
         self.settings = get_settings()
 
+    def _read_artifacts(self) -> tuple[bytes, bytes, str]:
+        """
+        Model and tokenizer bytes with their fingerprint. Both are read once,
+        so the version loaded is the version hashed even if the files are
+        replaced meanwhile.
+        """
+        settings = self.settings
+        model_data = Path(settings.MODEL_PATH).read_bytes()
+        tokenizer_data = Path(settings.TOKENIZER_PATH).read_bytes()
+        return model_data, tokenizer_data, fingerprint_bytes(model_data, tokenizer_data)
+
+    def _load_bundle(
+        self, model_data: bytes, tokenizer_data: bytes, fingerprint: str
+    ) -> ModelBundle:
+        settings = self.settings
+        model = load_model_bytes(model_data, Path(settings.MODEL_PATH).suffix)
+        tokenizer = KerasCompatUnpickler(io.BytesIO(tokenizer_data)).load()
+        folded = self._load_folded(model, tokenizer, fingerprint)
+        replicas = None
+        if settings.MODEL_REPLICAS > 1 and folded is None:
+            # Folded calls never touch the Keras model, so copies would sit idle
+            replicas = ReplicaPool.clone(model, settings.MODEL_REPLICAS)
+        return ModelBundle(
+            model,
+            tokenizer,
+            fingerprint,
+            self._load_prefilter(fingerprint),
+            vocabulary_fingerprint(tokenizer),
+            folded,
+            replicas,
+        )
+
+    def _load_prefilter(self, fingerprint: str) -> LexicalPrefilter | None:
+        """The prefilter is only valid for the model version it was distilled from."""
+        settings = self.settings
+        if not settings.PREFILTER_ENABLED:
+            return None
+        if not Path(settings.PREFILTER_PATH).exists():
+            print(f"⚠️ Prefilter enabled but {settings.PREFILTER_PATH} is missing")
+            return None
+        prefilter = LexicalPrefilter.load(settings.PREFILTER_PATH)
+        if prefilter.model_version != fingerprint:
+            print(
+                f"⚠️ Prefilter was distilled from model {prefilter.model_version}, "
+                f"serving {fingerprint}; cascade disabled until re-distilled"
+            )
+            return None
+        return prefilter
+
+    def _load_folded(self, model, tokenizer, fingerprint: str) -> FoldedModel | None:
+        """Gate tables are only used if folded from this model and they agree with it."""
+        settings = self.settings
+        if not settings.FOLDED_MODEL_ENABLED:
+            return None
+        if not Path(settings.FOLDED_MODEL_PATH).exists():
+            print(f"⚠️ Folded model enabled but {settings.FOLDED_MODEL_PATH} is missing")
+            return None
+        folded = FoldedModel.load(settings.FOLDED_MODEL_PATH)
+        if folded.model_version != fingerprint:
+            print(
+                f"⚠️ Gate tables were folded from model {folded.model_version}, "
+                f"serving {fingerprint}; using the Keras model until re-folded"
+            )
+            return None
+        padded = pad_sequences(
+            tokenizer.texts_to_sequences(WARMUP_TEXTS),
+            maxlen=settings.MAX_SEQUENCE_LENGTH,
+        )
+        drift = np.abs(folded.predict(padded) - model.predict(padded, verbose=0)).max()
+        if drift > 1e-4:
+            print(f"⚠️ Folded model differs from Keras by {drift:.2e}; not using it")
+            return None
+        return folded
+
+    def _run_model(self, bundle: ModelBundle, padded: np.ndarray) -> np.ndarray:
+        if bundle.replicas is not None:
+            return bundle.replicas.run(
+                len(padded), lambda model: self._call_model(bundle, model, padded)
+            )
+        return self._call_model(bundle, bundle.model, padded)
+
+    def _call_model(self, bundle: ModelBundle, model, padded: np.ndarray) -> np.ndarray:
+        batch_size = self.settings.INFERENCE_BATCH_SIZE
+        if bundle.folded is not None:
+            return bundle.folded.predict(padded, batch_size)
+        return model.predict(padded, batch_size=batch_size, verbose=0)
+
+    def _warm_up(self, bundle: ModelBundle):
+        """
+        Run a few predictions on every replica; raise if any output is not a
+        valid score matrix or replicas disagree.
+        """
+        tokenized = bundle.tokenizer.texts_to_sequences(WARMUP_TEXTS)
+        padded = pad_sequences(tokenized, maxlen=self.settings.MAX_SEQUENCE_LENGTH)
+        out = np.asarray(self._run_model(bundle, padded))
+        expected = (len(WARMUP_TEXTS), len(self.settings.CATEGORIES))
+        if out.shape != expected:
+            raise ValueError(f"Warm-up output shape {out.shape}, expected {expected}")
+        if not np.all(np.isfinite(out)) or out.min() < 0 or out.max() > 1:
+            raise ValueError("Warm-up produced scores outside [0, 1]")
+        if bundle.replicas is not None:
+            for replica_out in bundle.replicas.each(
+                lambda model: self._call_model(bundle, model, padded)
+            ):
+                if np.abs(np.asarray(replica_out) - out).max() > 1e-5:
+                    raise ValueError("Model replicas disagree on warm-up texts")
+
+    def replica_stats(self) -> dict | None:
+        """Per-replica load and share, or None with a single model."""
+        bundle = self._bundle
+        if bundle is None or bundle.replicas is None:
+            return None
+        return bundle.replicas.stats()
+
     def load(self):
         """Load the model and tokenizer from disk."""
+        settings = self.settings
         print("🔄 Loading model and tokenizer...")
-        self.model = load_model(self.settings.MODEL_PATH)
-        with open(self.settings.TOKENIZER_PATH, "rb") as handle:
-            self.tokenizer = KerasCompatUnpickler(handle).load()
-        print("✅ Model and tokenizer loaded successfully!")
+        configure_threads()
+        bundle = self._load_bundle(*self._read_artifacts())
+        self._warm_up(bundle)
+        self._bundle = bundle
+        if settings.SCORE_CACHE_ENABLED and self.cache is None:
+            self.cache = ScoreCache(
+                settings.SCORE_CACHE_PATH, settings.SCORE_CACHE_MAX_ENTRIES
+            )
+        print(f"✅ Model and tokenizer loaded successfully! ({bundle.fingerprint})")
+        if bundle.folded is not None:
+            print("⚡ Serving through folded gate tables")
+
+    def reload(self) -> dict:
+        """
+        Load the artifacts currently on disk next to the serving version,
+        warm them up, and swap atomically. In-flight calls keep the bundle
+        they started with; on any failure the old version keeps serving.
+        The prefilter and folded gate tables are rebuilt even when the
+        model is unchanged, so a re-distilled prefilter, a fresh fold, or a
+        changed PREFILTER_ENABLED or FOLDED_MODEL_ENABLED takes effect.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return {"status": "in_progress", "model_version": self.fingerprint}
+        try:
+            previous = self.fingerprint
+            started = time.perf_counter()
+            try:
+                model_data, tokenizer_data, fingerprint = self._read_artifacts()
+                if fingerprint == previous:
+                    bundle = self._bundle
+                    self._bundle = bundle._replace(
+                        prefilter=self._load_prefilter(fingerprint),
+                        folded=self._load_folded(
+                            bundle.model, bundle.tokenizer, fingerprint
+                        ),
+                    )
+                    status = {"status": "unchanged"}
+                else:
+                    bundle = self._load_bundle(model_data, tokenizer_data, fingerprint)
+                    self._warm_up(bundle)
+                    self._bundle = bundle
+                    status = {"status": "swapped", "previous_version": previous}
+                    print(f"🔁 Model swapped: {previous} → {bundle.fingerprint}")
+            except Exception as exc:
+                status = {"status": "rolled_back", "error": f"{type(exc).__name__}: {exc}"}
+                print(f"⚠️ Model reload failed, keeping {previous}: {exc}")
+            status["model_version"] = self.fingerprint
+            status["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            self.last_reload = status
+            return status
+        finally:
+            self._reload_lock.release()
+
+    def start_watcher(self, interval: float):
+        """
+        Poll the artifact files, and the prefilter and folded gate tables
+        if enabled, and reload once a change has settled.
+        """
+        if self._watcher is not None:
+            return
+        settings = self.settings
+        paths = (settings.MODEL_PATH, settings.TOKENIZER_PATH)
+        if settings.PREFILTER_ENABLED:
+            paths += (settings.PREFILTER_PATH,)
+        if settings.FOLDED_MODEL_ENABLED:
+            paths += (settings.FOLDED_MODEL_PATH,)
+
+        def snapshot():
+            state = []
+            for path in paths:
+                try:
+                    info = os.stat(path)
+                    state.append((info.st_mtime_ns, info.st_size))
+                except OSError:
+                    state.append(None)  # Only optional files may be missing
+            return None if None in state[:2] else tuple(state)
+
+        seen = snapshot()
+
+        def watch():
+            nonlocal seen
+            while not self._watcher_stop.wait(interval):
+                current = snapshot()
+                if current is None or current == seen:
+                    continue
+                # Wait one more interval so a half-copied file is not loaded
+                if self._watcher_stop.wait(interval) or snapshot() != current:
+                    continue
+                seen = current
+                self.reload()
+
+        self._watcher_stop.clear()
+        self._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        if self._watcher is not None:
+            self._watcher_stop.set()
+            self._watcher.join()
+            self._watcher = None
+
+    @property
+    def model(self):
+        return self._bundle.model if self._bundle else None
+
+    @property
+    def tokenizer(self):
+        return self._bundle.tokenizer if self._bundle else None
+
+    @property
+    def fingerprint(self) -> str | None:
+        return self._bundle.fingerprint if self._bundle else None
+
+    @property
+    def vocab_version(self) -> str | None:
+        return self._bundle.vocab_version if self._bundle else None
 
     @property
     def is_loaded(self) -> bool:
-        return self.model is not None and self.tokenizer is not None
+        return self._bundle is not None
+
+    def _count(self, **deltas: int):
+        with self._counts_lock:
+            for name, delta in deltas.items():
+                self.stage_counts[name] += delta
 
-    def predict(self, comments: list[str], threshold: float = 0.5) -> list[dict]:
+    def _counts(self) -> dict:
+        with self._counts_lock:
+            return dict(self.stage_counts)
+
+    def metrics(self) -> dict:
+        """Runtime counters for the /metrics endpoint."""
+        return {
+            "model_version": self.fingerprint,
+            "vocab_version": self.vocab_version,
+            "last_reload": self.last_reload,
+            "score_cache": self.cache.stats() if self.cache else None,
+            "cascade": {
+                "enabled": self._bundle is not None and self._bundle.prefilter is not None,
+            },
+            "folded_model": self._bundle is not None and self._bundle.folded is not None,
+            "replicas": self.replica_stats(),
+            "stages": self._counts(),
+        }
+
+    def score(
+        self,
+        comments: list[str],
+        threshold: float | None = None,
+        cascade: bool = True,
+        timings: StageTimings | None = None,
+    ) -> np.ndarray:
         """
-        Classify a batch of comments for toxicity.
-        Returns a list of result dicts with text, scores, is_toxic, and severity.
+        Return the raw (n, categories) float32 score matrix for a batch.
+        Served from the score cache where possible; of the misses, comments
+        the lexical prefilter rates as clearly safe skip the model and keep
+        the prefilter's scores. Pass `threshold` so the prefilter never
+        skips a comment that the caller's threshold could flag.
+        """
+        if timings is None:
+            timings = StageTimings()
+        prepared = self.prepare(comments, threshold, cascade, timings)
+        return self.complete(prepared, self.infer(prepared, timings), timings)
+
+    def prepare(
+        self,
+        comments: list[str],
+        threshold: float | None = None,
+        cascade: bool = True,
+        timings: StageTimings | None = None,
+        windows: list[bool] | None = None,
+    ) -> PreparedBatch:
+        """
+        The CPU-side half of score(): cache lookup, tokenization, prefilter
+        and padding. Finish with infer() and complete(); the split lets the
+        pipeline overlap one batch's preparation with another's inference.
+        `windows` is this batch's share of a window_plan() made for the
+        whole request; without it the batch gets MAX_WINDOW_ROWS to itself.
+        """
+        bundle = self._require_bundle()
+        if timings is None:
+            timings = StageTimings()
+
+        # Truncate individual comments to max length; requests arrive already
+        # truncated, so only copy the list when something is actually too long
+        max_len = self.settings.MAX_COMMENT_LENGTH
+        truncated = (
+            comments
+            if all(len(c) <= max_len for c in comments)
+            else [c[:max_len] for c in comments]
+        )
+
+        def tokenize(indices: list[int]) -> list[list[int]]:
+            with timings.stage("tokenize"):
+                batch = [truncated[i] for i in indices]
+                return bundle.tokenizer.texts_to_sequences(batch)
+
+        return self._prepare(
+            bundle,
+            truncated,
+            bundle.fingerprint,
+            tokenize,
+            threshold,
+            cascade,
+            timings,
+            windows,
+        )
+
+    def score_tokens(
+        self,
+        sequences: list[list[int]],
+        vocab_version: str,
+        threshold: float | None = None,
+        cascade: bool = True,
+        timings: StageTimings | None = None,
+        windows: list[bool] | None = None,
+    ) -> np.ndarray:
         """
-        if not self.is_loaded:
+        score() for comments already tokenized with the exported vocabulary.
+        Raises VocabularyMismatchError unless `vocab_version` matches the
+        serving tokenizer, and ValueError for ids outside its vocabulary.
+        """
+        bundle = self._require_bundle()
+        if timings is None:
+            timings = StageTimings()
+        if vocab_version != bundle.vocab_version:
+            raise VocabularyMismatchError(
+                f"Token ids use vocabulary {vocab_version}, "
+                f"server is on {bundle.vocab_version}"
+            )
+        limit = vocab_size(bundle.tokenizer)
+        for seq in sequences:
+            if len(seq) > self.settings.MAX_COMMENT_LENGTH:
+                raise ValueError(
+                    f"Sequences are limited to {self.settings.MAX_COMMENT_LENGTH} ids"
+                )
+            if seq and (min(seq) < 0 or max(seq) >= limit):
+                raise ValueError(f"Token ids must be in [0, {limit})")
+
+        # Token ids and raw text never share cache entries
+        keys = [",".join(map(str, seq)) for seq in sequences]
+        return self._score(
+            bundle,
+            keys,
+            f"{bundle.fingerprint}:ids",
+            lambda indices: [sequences[i] for i in indices],
+            threshold,
+            cascade,
+            timings,
+            windows,
+        )
+
+    def _require_bundle(self) -> ModelBundle:
+        bundle = self._bundle
+        if bundle is None:
             raise RuntimeError("Model not loaded. Call load() first.")
+        return bundle
 
+    def _score(
+        self,
+        bundle: ModelBundle,
+        keys: list[str],
+        namespace: str | None,
+        tokenize,
+        threshold: float | None,
+        cascade: bool,
+        timings: StageTimings,
+        windows: list[bool] | None = None,
+    ) -> np.ndarray:
+        """
+        Cache → tokenize(missing indices) → prefilter → model, for either
+        input. A None namespace leaves the cache out.
+        """
+        prepared = self._prepare(
+            bundle, keys, namespace, tokenize, threshold, cascade, timings, windows
+        )
+        return self.complete(prepared, self.infer(prepared, timings), timings)
+
+    def _prepare(
+        self,
+        bundle: ModelBundle,
+        keys: list[str],
+        namespace: str | None,
+        tokenize,
+        threshold: float | None,
+        cascade: bool,
+        timings: StageTimings,
+        windows: list[bool] | None = None,
+    ) -> PreparedBatch:
         settings = self.settings
+        scores = np.empty((len(keys), len(settings.CATEGORIES)), np.float32)
+        missing = list(range(len(keys)))
+        cache = self.cache if namespace is not None else None
 
-        # Truncate individual comments to max length
-        truncated = [c[: settings.MAX_COMMENT_LENGTH] for c in comments]
+        # Windowed scores differ from truncated ones, so they are cached apart
+        if cache is not None and settings.LONG_COMMENT_MODE:
+            namespace += (
+                f":w{settings.MAX_SEQUENCE_LENGTH}/{settings.WINDOW_STRIDE}"
+                f"/{settings.WINDOW_REDUCER}"
+            )
+
+        if cache is not None:
+            with timings.stage("cache"):
+                cached = cache.get_many(namespace, keys)
+                for i, row in cached.items():
+                    scores[i] = row
+                missing = [i for i in missing if i not in cached]
+
+        if not missing:
+            return PreparedBatch(bundle, namespace, scores, [], [])
+        batch = [keys[i] for i in missing]
+        tokenized = tokenize(missing)
+
+        # Lexical cascade — clearly safe comments skip the LSTM
+        if cascade and bundle.prefilter is not None:
+            with timings.stage("prefilter"):
+                bound = settings.PREFILTER_SAFE_BOUND
+                if threshold is not None:
+                    bound = min(bound, threshold)
+                cheap = bundle.prefilter.predict_proba(tokenized)
+                safe = cheap.max(axis=1) < bound
+                self._count(prefilter_seen=len(batch), prefilter_skipped=int(safe.sum()))
+                if safe.any():
+                    scores[[i for i, s in zip(missing, safe) if s]] = cheap[safe]
+                    keep = np.flatnonzero(~safe)
+                    missing = [missing[i] for i in keep]
+                    batch = [batch[i] for i in keep]
+                    tokenized = [tokenized[i] for i in keep]
+            if not missing:
+                return PreparedBatch(bundle, namespace, scores, [], [])
+
+        counts = exact = None
+        if settings.LONG_COMMENT_MODE:
+            allowed = [windows[i] for i in missing] if windows is not None else None
+            tokenized, counts, exact = self._window_rows(tokenized, allowed)
+        with timings.stage("pad"):
+            padded = pad_sequences(tokenized, maxlen=settings.MAX_SEQUENCE_LENGTH)
+        # Token lists take several times the padded array's memory; only the
+        # padded rows travel on to inference
+        return PreparedBatch(
+            bundle, namespace, scores, missing, batch, padded, counts, exact
+        )
+
+    def infer(
+        self, prepared: PreparedBatch, timings: StageTimings | None = None
+    ) -> np.ndarray | None:
+        """Run a prepared batch's rows through its model version."""
+        if prepared.padded is None:
+            return None
+        if timings is None:
+            timings = StageTimings()
+        self._count(model_rows=len(prepared.padded))
+        with timings.stage("infer"):
+            return self._run_model(prepared.bundle, prepared.padded)
+
+    def complete(
+        self,
+        prepared: PreparedBatch,
+        predicted: np.ndarray | None,
+        timings: StageTimings | None = None,
+    ) -> np.ndarray:
+        """Fold model output back into the score matrix and the cache."""
+        if predicted is None:
+            return prepared.scores
+        if timings is None:
+            timings = StageTimings()
+        scores, missing, batch, exact = (
+            prepared.scores,
+            prepared.missing,
+            prepared.keys,
+            prepared.exact,
+        )
+        if prepared.counts is not None and len(predicted) != len(missing):
+            offsets = np.concatenate([[0], np.cumsum(prepared.counts)[:-1]])
+            if self.settings.WINDOW_REDUCER == "mean":
+                predicted = np.add.reduceat(predicted, offsets) / prepared.counts[:, None]
+            else:
+                predicted = np.maximum.reduceat(predicted, offsets)
+            predicted = predicted.astype(np.float32)
+        scores[missing] = predicted
+
+        if self.cache is not None and prepared.namespace is not None:
+            with timings.stage("cache"):
+                if exact is not None and not exact.all():
+                    batch = [b for b, ok in zip(batch, exact) if ok]
+                    predicted = predicted[exact]
+                self.cache.put_many(prepared.namespace, batch, predicted)
+        return scores
+
+    def export_vocabulary(self) -> dict:
+        """Vocabulary for client-side tokenization, tagged with its vocab_version."""
+        bundle = self._require_bundle()
+        return {
+            **export_vocabulary(bundle.tokenizer, bundle.vocab_version),
+            "model_version": bundle.fingerprint,
+            "max_sequence_length": self.settings.MAX_SEQUENCE_LENGTH,
+        }
+
+    def _window_rows(
+        self, tokenized: list[list[int]], allowed: list[bool] | None = None
+    ) -> tuple[list[list[int]], np.ndarray, np.ndarray]:
+        """
+        Split sequences longer than MAX_SEQUENCE_LENGTH into overlapping
+        windows. Windows from every comment share one model call and are
+        reduced back to one row per comment in complete(). Long comments
+        not `allowed` windows, by default those past the first
+        MAX_WINDOW_ROWS extra rows, fall back to plain truncation. Returns
+        the rows, windows per comment, and a mask of comments that were
+        fully windowed.
+        """
+        settings = self.settings
+        maxlen, stride = settings.MAX_SEQUENCE_LENGTH, settings.WINDOW_STRIDE
+        if allowed is None:
+            allowed, _ = plan_windows(
+                [len(seq) for seq in tokenized], maxlen, stride, settings.MAX_WINDOW_ROWS
+            )
+
+        rows, counts = [], np.ones(len(tokenized), np.int64)
+        exact = np.ones(len(tokenized), bool)
+        for i, seq in enumerate(tokenized):
+            if len(seq) <= maxlen:
+                rows.append(seq)
+                continue
+            if not allowed[i]:
+                rows.append(seq)
+                exact[i] = False
+                continue
+            starts = window_starts(len(seq), maxlen, stride)
+            rows.extend(seq[start : start + maxlen] for start in starts)
+            counts[i] = len(starts)
+
+        self._count(
+            window_extra_rows=len(rows) - len(tokenized),
+            window_fallbacks=int((~exact).sum()),
+        )
+        return rows, counts, exact
+
+    def window_plan(
+        self, comments: list[str], timings: StageTimings | None = None
+    ) -> tuple[list[bool] | None, int]:
+        """
+        Plan MAX_WINDOW_ROWS for a whole request in LONG_COMMENT_MODE,
+        before it is split into sub-batches or chunks: which comments get
+        windows, and the extra model rows at most. (None, 0) when off.
+        """
+        if not self.settings.LONG_COMMENT_MODE:
+            return None, 0
+        bundle = self._require_bundle()
+        if timings is None:
+            timings = StageTimings()
+        max_len = self.settings.MAX_COMMENT_LENGTH
+        with timings.stage("tokenize"):
+            sequences = bundle.tokenizer.texts_to_sequences(
+                [c[:max_len] for c in comments]
+            )
+        return self.window_plan_tokens(sequences)
+
+    def window_plan_tokens(
+        self, sequences: list[list[int]]
+    ) -> tuple[list[bool] | None, int]:
+        """window_plan() for comments already tokenized."""
+        settings = self.settings
+        if not settings.LONG_COMMENT_MODE:
+            return None, 0
+        return plan_windows(
+            [len(seq) for seq in sequences],
+            settings.MAX_SEQUENCE_LENGTH,
+            settings.WINDOW_STRIDE,
+            settings.MAX_WINDOW_ROWS,
+        )
 
-        # Tokenize and pad
-        tokenized = self.tokenizer.texts_to_sequences(truncated)
-        padded = pad_sequences(tokenized, maxlen=settings.MAX_SEQUENCE_LENGTH)
+    def predict(
+        self,
+        comments: list[str],
+        threshold: float = 0.5,
+        timings: StageTimings | None = None,
+        windows: list[bool] | None = None,
+    ) -> list[dict]:
+        """
+        Classify a batch of comments for toxicity.
+        Returns a list of result dicts with text, scores, is_toxic, and severity.
+        Pass a StageTimings to collect per-stage durations, and `windows`
+        from window_plan() when the batch is part of a larger request.
+        """
+        if timings is None:
+            timings = StageTimings()
+        prepared = self.prepare(comments, threshold, timings=timings, windows=windows)
+        predicted = self.infer(prepared, timings)
+        return self.assemble(comments, prepared, predicted, threshold, timings)
 
-        # Predict
-        predictions = self.model.predict(padded, verbose=0)
+    def assemble(
+        self,
+        comments: list[str],
+        prepared: PreparedBatch,
+        predicted: np.ndarray | None,
+        threshold: float = 0.5,
+        timings: StageTimings | None = None,
+    ) -> list[dict]:
+        """Last stage of predict(): complete() the scores and build results."""
+        if timings is None:
+            timings = StageTimings()
+        predictions = self.complete(prepared, predicted, timings)
 
         # Build results with 3-tier classification
+        with timings.stage("postprocess"):
+            return self._build_results(comments, predictions, threshold)
+
+    def predict_tokens(
+        self,
+        sequences: list[list[int]],
+        vocab_version: str,
+        threshold: float = 0.5,
+        timings: StageTimings | None = None,
+        windows: list[bool] | None = None,
+    ) -> list[dict]:
+        """predict() for pre-tokenized comments; results carry an empty `text`."""
+        if timings is None:
+            timings = StageTimings()
+        predictions = self.score_tokens(
+            sequences, vocab_version, threshold, timings=timings, windows=windows
+        )
+        with timings.stage("postprocess"):
+            return self._build_results([""] * len(sequences), predictions, threshold)
+
+    def _occlusion_sequences(
+        self, bundle: ModelBundle, comments: list[str]
+    ) -> list[list[int]]:
+        settings = self.settings
+        truncated = [c[: settings.MAX_COMMENT_LENGTH] for c in comments]
+        sequences = bundle.tokenizer.texts_to_sequences(truncated)
+        if not settings.LONG_COMMENT_MODE:
+            # Tokens before the last MAX_SEQUENCE_LENGTH never reach the model
+            sequences = [seq[-settings.MAX_SEQUENCE_LENGTH :] for seq in sequences]
+        return sequences
+
+    def explain_plan(self, comments: list[str]) -> tuple[list[int], int]:
+        """
+        Occlusion spans for a whole request under EXPLAIN_MAX_VARIANTS, and
+        the model rows explain() will score with them: the comments plus
+        their variants. Plan before splitting a request into sub-batches so
+        that they share one budget. Raises ValueError like occlusion_spans.
+        """
+        sequences = self._occlusion_sequences(self._require_bundle(), comments)
+        lengths = [len(seq) for seq in sequences]
+        spans = occlusion_spans(lengths, self.settings.EXPLAIN_MAX_VARIANTS)
+        variants = sum(-(-n // span) for n, span in zip(lengths, spans))
+        return spans, len(comments) + variants
+
+    def explain(
+        self,
+        comments: list[str],
+        threshold: float = 0.5,
+        timings: StageTimings | None = None,
+        spans: list[int] | None = None,
+    ) -> list[dict]:
+        """
+        Per-token occlusion contributions: for each token the model sees,
+        base score minus the score with that token (or its span) removed.
+        Base scores come from score() and its cache; the variants of every
+        comment are scored together in one pass, capped by EXPLAIN_MAX_VARIANTS
+        unless `spans` come from explain_plan(). Variants bypass the score
+        cache, where they would only evict entries worth keeping.
+        """
+        bundle = self._require_bundle()
+        settings = self.settings
+        if timings is None:
+            timings = StageTimings()
+        base = self.score(comments, cascade=False, timings=timings)
+
+        with timings.stage("tokenize"):
+            sequences = self._occlusion_sequences(bundle, comments)
+        if spans is None:
+            spans = occlusion_spans(
+                [len(seq) for seq in sequences], settings.EXPLAIN_MAX_VARIANTS
+            )
+        variants = [
+            seq[:start] + seq[start + span :]
+            for seq, span in zip(sequences, spans)
+            for start in range(0, len(seq), span)
+        ]
+        occluded = self._score(
+            bundle,
+            variants,
+            None,
+            lambda indices: [variants[i] for i in indices],
+            None,
+            False,
+            timings,
+        )
+
+        with timings.stage("postprocess"):
+            index_word = bundle.tokenizer.index_word
+            results = self._build_results(comments, base, threshold)
+            offset = 0
+            for result, seq, span, scores in zip(results, sequences, spans, base):
+                count = -(-len(seq) // span)
+                deltas = scores - occluded[offset : offset + count]
+                offset += count
+                per_token = np.repeat(deltas, span, axis=0)[: len(seq)]
+                result["tokens"] = [index_word.get(t, "") for t in seq]
+                result["contributions"] = {
+                    cat: [round(float(v), 4) for v in per_token[:, j]]
+                    for j, cat in enumerate(settings.CATEGORIES)
+                }
+                result["span"] = span
+            return results
+
+    def _build_results(
+        self, comments: list[str], predictions: np.ndarray, threshold: float
+    ) -> list[dict]:
+        settings = self.settings
         results = []
         for text, pred in zip(comments, predictions):
             scores = {
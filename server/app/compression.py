@@ -0,0 +1,284 @@
+"""
+Compression module — compressed request bodies and negotiated responses.
+
+Requests may arrive with `Content-Encoding: gzip` (or `zstd` when the
+optional `zstandard` package is installed). Bodies are decompressed in
+fixed-size chunks and rejected with 413 as soon as they pass
+MAX_DECOMPRESSED_BODY_BYTES, so a small compression bomb never expands
+in memory. Responses of at least COMPRESSION_MIN_SIZE bytes are
+compressed with the best encoding the client lists in Accept-Encoding.
+
+Wire-size / latency benchmark against a running server (from server/):
+    python -m app.compression --workload comments.txt --sizes 1,10,100,500
+"""
+
+import argparse
+import gzip
+import io
+import json
+import time
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import get_settings
+
+try:
+    import zstandard
+except ImportError:  # Optional — gzip alone covers every browser
+    zstandard = None
+
+_CHUNK_SIZE = 64 * 1024
+_DECODE_ERRORS = (OSError, EOFError, zlib.error) + (
+    (zstandard.ZstdError,) if zstandard else ()
+)
+
+
+# ── Codecs ────────────────────────────────────────────────────────────
+def supported_encodings() -> list[str]:
+    """Encodings in server preference order."""
+    return (["zstd"] if zstandard else []) + ["gzip"]
+
+
+def _reader(encoding: str, body: bytes):
+    if encoding == "gzip":
+        return gzip.GzipFile(fileobj=io.BytesIO(body))
+    return zstandard.ZstdDecompressor().stream_reader(
+        io.BytesIO(body), read_across_frames=True
+    )
+
+
+def _compressor(encoding: str):
+    if encoding == "gzip":
+        return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return zstandard.ZstdCompressor(level=3).compressobj()
+
+
+def decompress_bounded(encoding: str, body: bytes, limit: int) -> bytes:
+    """Decompress `body` chunk by chunk; ValueError once it exceeds `limit` bytes."""
+    out = bytearray()
+    with _reader(encoding, body) as reader:
+        while chunk := reader.read(_CHUNK_SIZE):
+            out += chunk
+            if len(out) > limit:
+                raise ValueError(f"Decompressed body exceeds {limit} bytes")
+    return bytes(out)
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Pick the preferred supported encoding the client accepts (q > 0)."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[name.strip().lower()] = q
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+# ── Middleware ───────────────────────────────────────────────────────
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware (so response bodies stream through untouched
+    until the size threshold is known) for request decompression and
+    negotiated response compression.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        settings = get_settings()
+        headers = Headers(scope=scope)
+        encoding = headers.get("content-encoding", "identity").strip().lower()
+        if encoding != "identity":
+            rejection, scope, receive = await self._decode_request(
+                scope, receive, encoding, settings.MAX_DECOMPRESSED_BODY_BYTES
+            )
+            if rejection is not None:
+                await rejection(scope, receive, send)
+                return
+
+        target = negotiate(headers.get("accept-encoding", ""))
+        if not settings.RESPONSE_COMPRESSION or target is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingSender(send, target, settings.COMPRESSION_MIN_SIZE)
+        await self.app(scope, receive, responder)
+
+    async def _decode_request(self, scope, receive, encoding, limit):
+        if encoding not in supported_encodings():
+            detail = f"Unsupported Content-Encoding '{encoding}'"
+            return JSONResponse({"detail": detail}, status_code=415), scope, receive
+
+        compressed = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            compressed += message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(compressed) > limit:
+                break
+        try:
+            if len(compressed) > limit:
+                raise ValueError(f"Request body exceeds {limit} bytes")
+            body = decompress_bounded(encoding, bytes(compressed), limit)
+        except ValueError as exc:
+            return JSONResponse({"detail": str(exc)}, status_code=413), scope, receive
+        except _DECODE_ERRORS:
+            detail = f"Malformed {encoding} request body"
+            return JSONResponse({"detail": detail}, status_code=400), scope, receive
+
+        scope = dict(scope)
+        scope["headers"] = [
+            (k, v)
+            for k, v in scope["headers"]
+            if k not in (b"content-encoding", b"content-length")
+        ] + [(b"content-length", str(len(body)).encode())]
+        sent = False
+
+        async def replay() -> Message:
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return None, scope, replay
+
+
+class _CompressingSender:
+    """Wraps `send`; compresses the body once it is known to reach `min_size`."""
+
+    def __init__(self, send: Send, encoding: str, min_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.min_size = min_size
+        self.start: Message | None = None
+        self.pending = bytearray()
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            # Small responses often arrive as a chunk plus an empty final
+            # one, so hold chunks until the threshold or the end is reached
+            self.pending += body
+            if more_body and len(self.pending) < self.min_size:
+                return
+            body, self.pending = bytes(self.pending), bytearray()
+            headers = Headers(raw=self.start["headers"])
+            if "content-encoding" in headers or len(body) < self.min_size:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(
+                    {"type": "http.response.body", "body": body, "more_body": more_body}
+                )
+                return
+            self.compressor = _compressor(self.encoding)
+            response_headers = MutableHeaders(raw=self.start["headers"])
+            response_headers["Content-Encoding"] = self.encoding
+            response_headers.add_vary_header("Accept-Encoding")
+            del response_headers["Content-Length"]
+            await self.send(self.start)
+
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.flush()
+        if data or not more_body:
+            await self.send(
+                {"type": "http.response.body", "body": data, "more_body": more_body}
+            )
+
+
+# ── Benchmark ────────────────────────────────────────────────────────
+def _read_workload(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as handle:
+        return [line.rstrip("\n") for line in handle if line.strip()]
+
+
+def _encode(encoding: str, data: bytes) -> bytes:
+    if encoding == "identity":
+        return data
+    compressor = _compressor(encoding)
+    return compressor.compress(data) + compressor.flush()
+
+
+def bench_one(client, url: str, texts: list[str], encoding: str, repeats: int) -> dict:
+    """Bytes each way and end-to-end latency for one batch in one encoding."""
+    raw = json.dumps({"comments": texts}).encode()
+    body = _encode(encoding, raw)
+    headers = {"Content-Type": "application/json", "Accept-Encoding": encoding}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    latencies, received = [], 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        with client.stream("POST", url, content=body, headers=headers) as response:
+            response.read()
+            latencies.append(time.perf_counter() - started)
+            received = response.num_bytes_downloaded
+        response.raise_for_status()
+    latencies.sort()
+    return {
+        "batch": len(texts),
+        "encoding": encoding,
+        "request_bytes": len(body),
+        "request_bytes_raw": len(raw),
+        "response_bytes": received,
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+def main(argv: list[str] | None = None):
+    import httpx
+
+    parser = argparse.ArgumentParser(
+        description="Bytes on the wire and latency of /predict per encoding."
+    )
+    parser.add_argument("--workload", required=True, help="One comment per line")
+    parser.add_argument("--url", default="http://127.0.0.1:4000")
+    parser.add_argument("--sizes", default="1,10,100,500", help="Comma-separated batch sizes")
+    parser.add_argument("--repeats", type=int, default=10, help="Requests per cell")
+    args = parser.parse_args(argv)
+
+    texts = _read_workload(args.workload)
+    print("ℹ️ Raise RATE_LIMIT on the target server; each cell sends --repeats requests")
+    with httpx.Client(timeout=60) as client:
+        for size in (int(s) for s in args.sizes.split(",")):
+            batch = (texts * (size // max(len(texts), 1) + 1))[:size]
+            for encoding in ["identity"] + supported_encodings():
+                result = bench_one(
+                    client, f"{args.url}/predict", batch, encoding, args.repeats
+                )
+                print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
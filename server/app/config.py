@@ -5,9 +5,14 @@ Uses pydantic-settings for type-safe configuration with .env file support.
 
 from functools import lru_cache
 from pathlib import Path
+from typing import Literal
 
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings
 
+# Written by `python -m app.tuning`; loaded after .env so tuned values win.
+TUNING_PROFILE_PATH = str(Path(__file__).parent.parent / "tuning.env")
+
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables / .env file."""
@@ -18,11 +23,14 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     PORT: int = 4000
     DEBUG: bool = False
+    WORKERS: int = 1
 
     # Security
     CORS_ORIGINS: list[str] = ["chrome-extension://*"]
     ALLOWED_HOSTS: list[str] = ["*"]
     RATE_LIMIT: str = "30/minute"
+    WS_MAX_INFLIGHT: int = 4  # Concurrent messages per WebSocket connection
+    ADMIN_TOKEN: str = ""  # Empty disables every /admin endpoint
 
     # Model — points to root-level models/ directory
     MODEL_PATH: str = str(
@@ -32,6 +40,94 @@ class Settings(BaseSettings):
         Path(__file__).parent.parent.parent / "models" / "tokenizer.pickle"
     )
     MAX_SEQUENCE_LENGTH: int = 100
+    MODEL_WATCH_INTERVAL: float = 0.0  # Seconds between artifact checks; 0 = off
+
+    # Long comments — score overlapping windows instead of keeping only the
+    # last MAX_SEQUENCE_LENGTH tokens (raise MAX_COMMENT_LENGTH to benefit)
+    LONG_COMMENT_MODE: bool = False
+    WINDOW_STRIDE: int = Field(default=50, gt=0)  # At most MAX_SEQUENCE_LENGTH
+    WINDOW_REDUCER: Literal["max", "mean"] = "max"
+    MAX_WINDOW_ROWS: int = 1000  # Extra model rows allowed per request
+
+    # Folded model — per-token gate tables replace the embedding lookup and
+    # LSTM input matmul (build with `python -m app.folding fold`)
+    FOLDED_MODEL_ENABLED: bool = False
+    FOLDED_MODEL_PATH: str = str(
+        Path(__file__).parent.parent.parent / "models" / "tox_model.folded.npz"
+    )
+
+    # CPU runtime — 0 keeps TensorFlow's defaults (see `python -m app.tuning`)
+    TF_INTRA_OP_THREADS: int = 0
+    TF_INTER_OP_THREADS: int = 0
+    INFERENCE_BATCH_SIZE: int = 32
+    CPUS_PER_WORKER: int = 0  # Pin each worker to its own CPU slice; 0 = off
+
+    # Model replicas — independent model copies inside one worker, sharing
+    # the tokenizer; each call goes to the least-loaded replica (not used
+    # when the folded model serves)
+    MODEL_REPLICAS: int = 1
+    REPLICA_THREADS: int = 0  # Intra-op threads per replica; 0 = TF default
+
+    # Score cache — persistent SQLite store shared by all workers on a host
+    SCORE_CACHE_ENABLED: bool = False
+    SCORE_CACHE_PATH: str = str(Path(__file__).parent.parent / "cache" / "scores.db")
+    SCORE_CACHE_MAX_ENTRIES: int = 100_000
+
+    # Lexical prefilter — distilled bag-of-words stage that lets clearly safe
+    # comments skip the LSTM (build with `python -m app.prefilter distill`)
+    PREFILTER_ENABLED: bool = False
+    PREFILTER_PATH: str = str(
+        Path(__file__).parent.parent.parent / "models" / "prefilter.npz"
+    )
+    PREFILTER_SAFE_BOUND: float = 0.02
+
+    # Fair scheduling — weighted fair queuing of inference across clients,
+    # keyed by FAIR_CLIENT_HEADER (e.g. X-API-Key) when a trusted proxy
+    # sets it, or else the remote address
+    FAIR_SCHEDULING: bool = False
+    FAIR_SUBBATCH_SIZE: int = 32
+    FAIR_WORKERS: int = 1  # Sub-batches run concurrently
+    FAIR_CLIENT_HEADER: str = ""
+    FAIR_TRUSTED_PROXIES: list[str] = []  # Addresses or CIDR networks, as JSON
+    FAIR_DEFAULT_WEIGHT: float = 1.0
+    FAIR_WEIGHTS: dict[str, float] = {}  # Client key → weight, as JSON
+
+    # Pipelined execution — overlap one chunk's tokenization with another's
+    # inference on separate prepare / infer / assemble threads
+    PIPELINE_ENABLED: bool = False
+    PIPELINE_CHUNK_SIZE: int = 64  # Comments per chunk; large requests span several
+    PIPELINE_QUEUE_DEPTH: int = 2  # Chunks waiting between adjacent stages
+
+    # Sidecar — Unix-domain socket with binary framing for same-host
+    # services (`python -m app.sidecar serve`, or SIDECAR_SOCKET alongside HTTP)
+    SIDECAR_SOCKET: str = ""  # Empty = not served from the HTTP app
+    SIDECAR_MAX_INFLIGHT: int = 8  # Pipelined requests per connection
+    SIDECAR_MAX_FRAME_BYTES: int = 2_000_000
+
+    # Memory — comments being processed at once per worker (0 = unbounded)
+    # and per-request peak allocation tracking for /metrics
+    MAX_INFLIGHT_COMMENTS: int = 1000
+    MEMORY_TRACKING: bool = False
+
+    # Observability — per-stage durations on /predict
+    SERVER_TIMING_HEADER: bool = True
+    TIMING_LOG: bool = False  # One JSON line per request, keyed by X-Request-ID
+
+    # Profiling — per-request and time-window sampling (admin token required)
+    PROFILING_ENABLED: bool = False
+    PROFILING_DIR: str = str(Path(__file__).parent.parent / "profiles")
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_TRACEMALLOC_FRAMES: int = 10
+    PROFILING_MAX_WINDOW_SECONDS: float = 300.0
+
+    # Compression — gzip/zstd request bodies and negotiated responses
+    MAX_DECOMPRESSED_BODY_BYTES: int = 2_000_000
+    RESPONSE_COMPRESSION: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # Smaller responses are sent as-is
+
+    # Explanations — occlusion variants generated per /explain request
+    EXPLAIN_MAX_COMMENTS: int = 20
+    EXPLAIN_MAX_VARIANTS: int = 1000
 
     # Input limits
     MAX_COMMENTS_PER_REQUEST: int = 500
@@ -47,8 +143,15 @@ class Settings(BaseSettings):
         "identity_hate",
     ]
 
+    @model_validator(mode="after")
+    def check_window_stride(self):
+        # A longer stride would skip the tokens between adjacent windows
+        if self.WINDOW_STRIDE > self.MAX_SEQUENCE_LENGTH:
+            raise ValueError("WINDOW_STRIDE must not exceed MAX_SEQUENCE_LENGTH")
+        return self
+
     model_config = {
-        "env_file": str(Path(__file__).parent.parent / ".env"),
+        "env_file": (str(Path(__file__).parent.parent / ".env"), TUNING_PROFILE_PATH),
         "env_file_encoding": "utf-8",
         "case_sensitive": True,
     }
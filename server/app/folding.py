@@ -0,0 +1,355 @@
+"""
+Folding module — per-token gate tables for the LSTM input path.
+
+At every timestep the LSTM computes `embedding[token] @ kernel + bias`,
+which depends only on the token id. Folding precomputes that product for
+the whole vocabulary, so inference starts with one gather per direction
+instead of an embedding lookup plus a matmul. The recurrence and the
+dense head then run in numpy from the same artifact.
+
+Offline usage (from server/):
+    python -m app.folding fold
+    python -m app.folding bench --corpus comments.txt --batch-sizes 1,32,128
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+_ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "sigmoid": _sigmoid,
+    "hard_sigmoid": lambda x: np.clip(0.2 * x + 0.5, 0.0, 1.0),
+    "tanh": np.tanh,
+    "softmax": _softmax,
+}
+
+# Layers that are the identity at inference time
+_PASSTHROUGH = {"Dropout", "SpatialDropout1D", "GaussianNoise", "InputLayer"}
+
+
+class FoldedModel:
+    """Gate tables + recurrent kernels + dense head, evaluated in numpy."""
+
+    def __init__(self, spec: dict, arrays: dict[str, np.ndarray]):
+        self.spec = spec
+        self.arrays = arrays
+
+    @property
+    def model_version(self) -> str:
+        return self.spec["model_version"]
+
+    # ── Transform ─────────────────────────────────────────────────────
+    @classmethod
+    def fold(cls, model, model_version: str) -> "FoldedModel":
+        """
+        Fold a Keras `Embedding → LSTM | Bidirectional(LSTM) → head` model.
+        The head may hold Dense, Activation, Dropout, Flatten and global
+        pooling layers. Raises ValueError for anything else.
+        """
+        layers = [
+            layer for layer in model.layers if type(layer).__name__ not in _PASSTHROUGH
+        ]
+        if len(layers) < 2 or type(layers[0]).__name__ != "Embedding":
+            raise ValueError("Expected an Embedding layer first")
+        embedding, recurrent, head = layers[0], layers[1], layers[2:]
+
+        if type(recurrent).__name__ == "Bidirectional":
+            cells = [recurrent.forward_layer, recurrent.backward_layer]
+            merge_mode = recurrent.merge_mode
+        else:
+            cells, merge_mode = [recurrent], None
+        for cell in cells:
+            config = cell.get_config()
+            if type(cell).__name__ != "LSTM" or config.get("stateful"):
+                raise ValueError(f"Cannot fold recurrent layer {type(cell).__name__}")
+            if config.get("time_major"):
+                raise ValueError("Time-major LSTMs are not supported")
+
+        emb = embedding.get_weights()[0].astype(np.float64)
+        mask_zero = bool(embedding.get_config().get("mask_zero"))
+        tables, recurrent_kernels = [], []
+        for cell in cells:
+            kernel, recurrent_kernel, *bias = cell.get_weights()
+            table = emb @ kernel.astype(np.float64)
+            if bias:
+                table += bias[0]
+            tables.append(table.astype(np.float32))
+            recurrent_kernels.append(recurrent_kernel.astype(np.float32))
+
+        first = cells[0].get_config()
+        return_sequences = bool(first["return_sequences"])
+        if mask_zero and return_sequences:
+            raise ValueError("mask_zero needs an LSTM that returns its last state")
+
+        arrays = {
+            "tables": np.stack(tables),
+            "recurrent_kernels": np.stack(recurrent_kernels),
+        }
+        spec_head = []
+        for i, layer in enumerate(head):
+            kind = type(layer).__name__
+            config = layer.get_config()
+            if kind == "Dense":
+                kernel, *bias = layer.get_weights()
+                arrays[f"head_{i}_kernel"] = kernel.astype(np.float32)
+                if bias:
+                    arrays[f"head_{i}_bias"] = bias[0].astype(np.float32)
+                spec_head.append({"type": "dense", "activation": config["activation"]})
+            elif kind == "Activation":
+                spec_head.append(
+                    {"type": "activation", "activation": config["activation"]}
+                )
+            elif kind in ("GlobalMaxPooling1D", "GlobalAveragePooling1D", "Flatten"):
+                spec_head.append({"type": kind})
+            else:
+                raise ValueError(f"Cannot fold head layer {kind}")
+            if spec_head[-1].get("activation", "linear") not in _ACTIVATIONS:
+                raise ValueError(f"Unsupported activation {spec_head[-1]['activation']}")
+
+        for key in ("activation", "recurrent_activation"):
+            if first[key] not in _ACTIVATIONS:
+                raise ValueError(f"Unsupported LSTM {key} {first[key]}")
+        spec = {
+            "model_version": model_version,
+            "mask_zero": mask_zero,
+            "embedding_dim": int(emb.shape[1]),
+            "units": int(first["units"]),
+            "activation": first["activation"],
+            "recurrent_activation": first["recurrent_activation"],
+            "go_backwards": [bool(c.get_config()["go_backwards"]) for c in cells],
+            "merge_mode": merge_mode,
+            "return_sequences": return_sequences,
+            "head": spec_head,
+        }
+        return cls(spec, arrays)
+
+    def save(self, path: str):
+        np.savez(path, spec=np.array(json.dumps(self.spec)), **self.arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "FoldedModel":
+        with np.load(path) as data:
+            arrays = {key: data[key] for key in data.files if key != "spec"}
+            spec = json.loads(str(data["spec"]))
+        return cls(spec, arrays)
+
+    # ── Inference ─────────────────────────────────────────────────────
+    def predict(self, padded: np.ndarray, batch_size: int = 128) -> np.ndarray:
+        """Same contract as `model.predict(padded)` for the folded model."""
+        padded = np.asarray(padded, np.int64)
+        return np.concatenate(
+            [
+                self._forward(padded[start : start + batch_size])
+                for start in range(0, max(len(padded), 1), batch_size)
+            ]
+        )
+
+    def _forward(self, tokens: np.ndarray) -> np.ndarray:
+        spec = self.spec
+        kernels = self.arrays["recurrent_kernels"]
+        act = _ACTIVATIONS[spec["activation"]]
+        recurrent_act = _ACTIVATIONS[spec["recurrent_activation"]]
+        directions, units = len(self.arrays["tables"]), spec["units"]
+        batch, steps = tokens.shape
+
+        # One gather per direction replaces embedding lookup + input matmul.
+        # Directions share each step, so the recurrence is one batched matmul.
+        ordered = [tokens[:, ::-1] if back else tokens for back in spec["go_backwards"]]
+        gates = self._gates(ordered)  # (steps, directions, batch, 4 * units)
+        masks = (
+            np.stack([seq.T != 0 for seq in ordered], axis=1)[..., None]
+            if spec["mask_zero"]
+            else None
+        )
+
+        h = np.zeros((directions, batch, units), np.float32)
+        c = np.zeros_like(h)
+        outputs = []
+        for t in range(steps):
+            z = gates[t] + h @ kernels
+            i = recurrent_act(z[..., :units])
+            f = recurrent_act(z[..., units : 2 * units])
+            g = act(z[..., 2 * units : 3 * units])
+            o = recurrent_act(z[..., 3 * units :])
+            c_new = f * c + i * g
+            h_new = o * act(c_new)
+            if masks is not None:
+                h_new = np.where(masks[t], h_new, h)
+                c_new = np.where(masks[t], c_new, c)
+            h, c = h_new, c_new
+            if spec["return_sequences"]:
+                outputs.append(h)
+
+        if spec["return_sequences"]:
+            seq = np.stack(outputs, axis=2)  # (directions, batch, steps, units)
+            parts = [
+                seq[d, :, ::-1] if back else seq[d]
+                for d, back in enumerate(spec["go_backwards"])
+            ]
+        else:
+            parts = list(h)
+        x = self._merge(parts)
+
+        for i, layer in enumerate(spec["head"]):
+            kind = layer["type"]
+            if kind == "dense":
+                x = x @ self.arrays[f"head_{i}_kernel"]
+                if f"head_{i}_bias" in self.arrays:
+                    x = x + self.arrays[f"head_{i}_bias"]
+                x = _ACTIVATIONS[layer["activation"]](x)
+            elif kind == "activation":
+                x = _ACTIVATIONS[layer["activation"]](x)
+            elif kind == "GlobalMaxPooling1D":
+                x = x.max(axis=1)
+            elif kind == "GlobalAveragePooling1D":
+                x = x.mean(axis=1)
+            elif kind == "Flatten":
+                x = x.reshape(len(x), -1)
+        return x.astype(np.float32)
+
+    def _gates(self, ordered: list[np.ndarray]) -> np.ndarray:
+        return np.stack(
+            [table[seq.T] for table, seq in zip(self.arrays["tables"], ordered)], axis=1
+        )
+
+    def _merge(self, parts: list[np.ndarray]) -> np.ndarray:
+        mode = self.spec["merge_mode"]
+        if mode is None:
+            return parts[0]
+        if mode == "concat":
+            return np.concatenate(parts, axis=-1)
+        if mode == "sum":
+            return parts[0] + parts[1]
+        if mode == "ave":
+            return (parts[0] + parts[1]) / 2
+        if mode == "mul":
+            return parts[0] * parts[1]
+        raise ValueError(f"Unsupported merge_mode {mode}")
+
+    # ── Cost model ────────────────────────────────────────────────────
+    def flops_saved(self, rows: int, steps: int) -> dict:
+        """Multiply-add FLOPs the gather removes from the LSTM input path."""
+        directions, _, width = self.arrays["tables"].shape
+        embedding_dim = self.spec["embedding_dim"]
+        per_step = 2 * embedding_dim * width  # x_t @ kernel
+        recurrent = 2 * self.spec["units"] * width  # h @ recurrent_kernel, unchanged
+        return {
+            "input_flops_removed": rows * steps * directions * per_step,
+            "recurrent_flops_kept": rows * steps * directions * recurrent,
+            "table_mb": round(self.arrays["tables"].nbytes / 2**20, 1),
+        }
+
+
+class _UnfoldedBaseline(FoldedModel):
+    """The same numpy forward pass with the input projection left unfolded."""
+
+    def __init__(self, folded: FoldedModel, model):
+        super().__init__(folded.spec, folded.arrays)
+        layers = [l for l in model.layers if type(l).__name__ not in _PASSTHROUGH]
+        recurrent = layers[1]
+        cells = (
+            [recurrent.forward_layer, recurrent.backward_layer]
+            if type(recurrent).__name__ == "Bidirectional"
+            else [recurrent]
+        )
+        self.embedding = layers[0].get_weights()[0]
+        self.projections = [cell.get_weights() for cell in cells]
+
+    def _gates(self, ordered: list[np.ndarray]) -> np.ndarray:
+        gates = []
+        for (kernel, _, *bias), seq in zip(self.projections, ordered):
+            z = self.embedding[seq.T] @ kernel
+            gates.append(z + bias[0] if bias else z)
+        return np.stack(gates, axis=1)
+
+
+# ── CLI ───────────────────────────────────────────────────────────────
+def _read_corpus(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as handle:
+        return [line.rstrip("\n") for line in handle if line.strip()]
+
+
+def _time(fn, repeats: int) -> float:
+    fn()  # Warm-up
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1000
+
+
+def main(argv: list[str] | None = None):
+    from tf_keras.preprocessing.sequence import pad_sequences
+
+    from .classifier import ToxicClassifier
+    from .config import get_settings
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    fold_cmd = sub.add_parser("fold", help="Write the folded artifact for MODEL_PATH")
+    fold_cmd.add_argument("--out", default=get_settings().FOLDED_MODEL_PATH)
+    bench = sub.add_parser("bench", help="Parity, FLOPs and latency vs the Keras model")
+    bench.add_argument("--corpus", required=True, help="One comment per line")
+    bench.add_argument("--batch-sizes", default="1,32,128")
+    bench.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    engine = ToxicClassifier()
+    engine.load()
+    settings = engine.settings
+
+    if args.command == "fold":
+        folded = FoldedModel.fold(engine.model, engine.fingerprint)
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        folded.save(args.out)
+        print(
+            f"✅ Folded model {engine.fingerprint} → {args.out} "
+            f"({folded.arrays['tables'].nbytes / 2**20:.1f} MB of gate tables)"
+        )
+        return
+
+    folded = FoldedModel.fold(engine.model, engine.fingerprint)
+    baseline = _UnfoldedBaseline(folded, engine.model)
+    texts = _read_corpus(args.corpus)
+    for size in (int(s) for s in args.batch_sizes.split(",")):
+        batch = (texts * (size // max(len(texts), 1) + 1))[:size]
+        padded = pad_sequences(
+            engine.tokenizer.texts_to_sequences(batch), maxlen=settings.MAX_SEQUENCE_LENGTH
+        )
+
+        def keras_run():
+            return engine.model.predict(padded, batch_size=size, verbose=0)
+
+        def folded_run():
+            return folded.predict(padded, size)
+
+        def unfolded_run():
+            return baseline.predict(padded, size)
+
+        result = {
+            "batch": size,
+            "max_abs_diff": float(np.abs(folded_run() - keras_run()).max()),
+            **folded.flops_saved(size, settings.MAX_SEQUENCE_LENGTH),
+            "keras_ms": round(_time(keras_run, args.repeats), 2),
+            "numpy_unfolded_ms": round(_time(unfolded_run, args.repeats), 2),
+            "folded_ms": round(_time(folded_run, args.repeats), 2),
+        }
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
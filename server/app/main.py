@@ -3,26 +3,82 @@ FastAPI Server for Toxic Comment Classification
 Serves the Keras model via REST endpoints for the Chrome extension.
 """
 
+import asyncio
+import json
+import time
 from contextlib import asynccontextmanager
+from typing import Annotated
 
-from fastapi import FastAPI, Request
+from fastapi import (
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, field_validator
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from pydantic_core import to_json
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
-from .classifier import classifier
+from .classifier import StageTimings, classifier
+from .compression import CompressionMiddleware
 from .config import get_settings
-from .middleware import SecurityHeadersMiddleware, limiter
+from .memory import InflightBudget, MemoryTracker
+from .middleware import (
+    SecurityHeadersMiddleware,
+    charge_rate_limit,
+    client_key,
+    limiter,
+    origin_allowed,
+    require_admin_token,
+)
+from .pipeline import StagePipeline
+from .scheduler import FairScheduler
+from .sidecar import SidecarServer
+from .tokens import VocabularyMismatchError, decode_ids, unpack_sequences
+from .tuning import pin_worker_cpus
 
 settings = get_settings()
+scheduler = FairScheduler(classifier.predict)
+pipeline = StagePipeline(classifier)
+budget = InflightBudget(settings.MAX_INFLIGHT_COMMENTS)
+memory = MemoryTracker()
+sidecar = SidecarServer(classifier, settings.SIDECAR_SOCKET, budget)
 
 
 # ── Lifespan ──────────────────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if settings.SIDECAR_SOCKET and settings.WORKERS > 1:
+        # Every worker would bind the same path and take it from the others
+        raise RuntimeError(
+            "SIDECAR_SOCKET needs WORKERS=1; run `python -m app.sidecar serve` instead"
+        )
+    pin_worker_cpus(settings.CPUS_PER_WORKER)
     classifier.load()
+    memory.start()
+    if settings.MODEL_WATCH_INTERVAL > 0:
+        classifier.start_watcher(settings.MODEL_WATCH_INTERVAL)
+    if settings.FAIR_SCHEDULING:
+        scheduler.start(settings.FAIR_WORKERS)
+    if settings.PIPELINE_ENABLED:
+        pipeline.start(settings.PIPELINE_QUEUE_DEPTH)
+    if settings.SIDECAR_SOCKET:
+        await sidecar.start(settings.SIDECAR_SOCKET)
     yield
+    await sidecar.stop()
+    await scheduler.stop()
+    pipeline.stop()
+    memory.stop()
+    classifier.stop_watcher()
     print("👋 Shutting down server.")
 
 
@@ -41,12 +97,24 @@ app.add_middleware(SecurityHeadersMiddleware)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Profiling (opt-in; nothing is installed when disabled)
+if settings.PROFILING_ENABLED:
+    from .profiling import ProfilingMiddleware, router as profiling_router
+
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(profiling_router)
+
+# Compressed request bodies / negotiated response compression
+app.add_middleware(CompressionMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_methods=["GET", "POST", "OPTIONS"],
-    allow_headers=["Content-Type"],
+    allow_headers=["Content-Type", "Content-Encoding", "X-Vocab-Version"]
+    + ([settings.FAIR_CLIENT_HEADER] if settings.FAIR_CLIENT_HEADER else []),
+    expose_headers=["Server-Timing", "X-Request-ID"],
 )
 
 
@@ -64,6 +132,8 @@ class PredictRequest(BaseModel):
     def truncate_long_comments(cls, v):
         """Truncate each comment to MAX_COMMENT_LENGTH at the API boundary."""
         max_len = get_settings().MAX_COMMENT_LENGTH
+        if all(len(c) <= max_len for c in v):
+            return v
         return [c[:max_len] for c in v]
 
 
@@ -79,11 +149,121 @@ class PredictResponse(BaseModel):
     results: list[CommentResult]
 
 
+class ExplainRequest(PredictRequest):
+    comments: list[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.EXPLAIN_MAX_COMMENTS,
+    )
+
+
+class ExplainResult(CommentResult):
+    tokens: list[str]
+    contributions: dict[str, list[float]]
+    span: int  # Tokens occluded together; 1 unless the variant cap applied
+
+
+class ExplainResponse(BaseModel):
+    results: list[ExplainResult]
+
+
+class SocketPredictMessage(PredictRequest):
+    id: str | int
+
+
+class TokenPredictRequest(BaseModel):
+    """JSON form of POST /predict/tokens (see app.tokens for the binary form)."""
+
+    vocab_version: str
+    ids: str = Field(..., description="Base64 of little-endian int32 token ids")
+    lengths: list[Annotated[int, Field(ge=0)]] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.MAX_COMMENTS_PER_REQUEST,
+    )
+    threshold: float = Field(default=0.5, ge=0.0, le=1.0)
+
+
+# ── Inference ─────────────────────────────────────────────────────────
+def predict_windowed(batch, threshold, timings):
+    """classifier.predict() for (comment, windowed) pairs from window_plan()."""
+    texts, windows = zip(*batch)
+    return classifier.predict(list(texts), threshold, timings, list(windows))
+
+
+async def classify(
+    comments: list[str],
+    threshold: float,
+    timings: StageTimings | None = None,
+    client: str = "127.0.0.1",
+    run_batch=None,
+    rows: int | None = None,
+) -> list[dict]:
+    """
+    Shared inference path for HTTP and WebSocket clients. `run_batch`
+    replaces classifier.predict for other input forms (token ids,
+    explanations) and `rows` is then the model rows it will score, if more
+    than one per comment; plain text in LONG_COMMENT_MODE adds the window
+    rows planned for the whole request, so sub-batches and chunks share
+    one MAX_WINDOW_ROWS. Every request first waits for that many rows of
+    the in-flight budget, which counts towards the queue stage, and then
+    runs through the fair scheduler, the stage pipeline (plain text only)
+    or the threadpool, whichever is running.
+    """
+    timings = timings if timings is not None else StageTimings()
+    rows = len(comments) if rows is None else rows
+    items, batch_fn, windows = comments, run_batch, None
+    if run_batch is None and settings.LONG_COMMENT_MODE:
+        windows, extra = await run_in_threadpool(
+            classifier.window_plan, comments, timings
+        )
+        rows += extra
+        items, batch_fn = list(zip(comments, windows)), predict_windowed
+    queued = time.perf_counter()
+    if scheduler.running:
+        async with budget.hold(rows):
+            with memory.track():
+                return await scheduler.submit(
+                    client, items, threshold, timings, batch_fn, submitted=queued
+                )
+    if pipeline.running and run_batch is None:
+        async with budget.hold(rows):
+            with memory.track():
+                return await pipeline.submit(
+                    comments, threshold, timings, windows, submitted=queued
+                )
+    batch_fn = batch_fn or classifier.predict
+
+    def run():
+        timings["queue"] = (time.perf_counter() - queued) * 1000
+        with memory.track():
+            return batch_fn(items, threshold, timings)
+
+    async with budget.hold(rows):
+        return await run_in_threadpool(run)
+
+
 # ── Endpoints ─────────────────────────────────────────────────────────
 @app.get("/health")
 async def health():
     """Health check endpoint (no auth required)."""
-    return {"status": "ok", "model_loaded": classifier.is_loaded}
+    return {
+        "status": "ok",
+        "model_loaded": classifier.is_loaded,
+        "model_version": classifier.fingerprint,
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters — score cache hit rate and model version."""
+    return {
+        **classifier.metrics(),
+        "scheduler": scheduler.stats(),
+        "pipeline": pipeline.stats(),
+        "sidecar": sidecar.stats(),
+        "memory": {**memory.stats(), "inflight": budget.stats()},
+    }
 
 
 @app.post("/predict", response_model=PredictResponse)
@@ -93,8 +273,239 @@ async def predict(
     req: PredictRequest,
 ):
     """Classify a batch of comments for toxicity."""
-    results = classifier.predict(req.comments, req.threshold)
-    return PredictResponse(results=results)
+    timings = StageTimings()
+    results = await classify(
+        req.comments, req.threshold, timings, client=client_key(request)
+    )
+    return timed_response(request, results, timings)
+
+
+def timed_response(request: Request, results: list[dict], timings: StageTimings):
+    """
+    Serialize the results and attach the per-stage timings. The dicts are
+    encoded directly rather than through a response model, which would hold
+    a second copy of every result, by the same serializer and with the same
+    settings (non-finite scores become null), so the bytes match.
+    """
+    with timings.stage("serialize"):
+        body = to_json({"results": results}, inf_nan_mode="null")
+
+    response = Response(content=body, media_type="application/json")
+    if settings.SERVER_TIMING_HEADER:
+        response.headers["Server-Timing"] = timings.header()
+        response.headers["Timing-Allow-Origin"] = "*"
+    if settings.TIMING_LOG:
+        print(
+            json.dumps(
+                {
+                    "event": request.url.path.strip("/").replace("/", "_"),
+                    "request_id": getattr(request.state, "request_id", None),
+                    "comments": len(results),
+                    "stages_ms": {k: round(v, 3) for k, v in timings.items()},
+                    "total_ms": round(sum(timings.values()), 3),
+                }
+            )
+        )
+    return response
+
+
+@app.post("/explain", response_model=ExplainResponse)
+@limiter.limit(settings.RATE_LIMIT)
+async def explain(
+    request: Request,
+    req: ExplainRequest,
+):
+    """
+    Per-token occlusion contributions for each category: how much each
+    score drops when that token is removed. Positive values pushed the
+    comment towards the category.
+    """
+    try:
+        spans, rows = classifier.explain_plan(req.comments)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    def run_batch(batch, threshold, timings):
+        # Sub-batches from the fair scheduler keep the request's spans
+        texts, batch_spans = zip(*batch)
+        return classifier.explain(list(texts), threshold, timings, list(batch_spans))
+
+    timings = StageTimings()
+    results = await classify(
+        list(zip(req.comments, spans)),
+        req.threshold,
+        timings,
+        client=client_key(request),
+        run_batch=run_batch,
+        rows=rows,
+    )
+    return timed_response(request, results, timings)
+
+
+@app.get("/vocab")
+async def vocab(if_none_match: str | None = Header(default=None)):
+    """
+    The serving tokenizer's vocabulary for client-side tokenization.
+    `vocab_version` must accompany every POST /predict/tokens request.
+    """
+    etag = f'"{classifier.vocab_version}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(classifier.export_vocabulary(), headers={"ETag": etag})
+
+
+@app.post("/predict/tokens", response_model=PredictResponse)
+@limiter.limit(settings.RATE_LIMIT)
+async def predict_tokens(
+    request: Request,
+    threshold: float = Query(default=0.5, ge=0.0, le=1.0),
+    x_vocab_version: str | None = Header(default=None),
+):
+    """
+    Classify comments already tokenized with GET /vocab. Send either JSON
+    (TokenPredictRequest) or the packed binary layout as
+    application/octet-stream with the version in X-Vocab-Version.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("application/octet-stream"):
+            if x_vocab_version is None:
+                raise ValueError("X-Vocab-Version header is required")
+            sequences, vocab_version = unpack_sequences(body), x_vocab_version
+        else:
+            req = TokenPredictRequest.model_validate_json(body)
+            sequences = decode_ids(req.ids, req.lengths)
+            vocab_version, threshold = req.vocab_version, req.threshold
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    if not 1 <= len(sequences) <= settings.MAX_COMMENTS_PER_REQUEST:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Send 1 to {settings.MAX_COMMENTS_PER_REQUEST} sequences",
+        )
+
+    windows, extra = classifier.window_plan_tokens(sequences)
+
+    def run_batch(batch, threshold, timings):
+        if windows is None:
+            return classifier.predict_tokens(batch, vocab_version, threshold, timings)
+        # Sub-batches from the fair scheduler keep the request's window plan
+        seqs, batch_windows = zip(*batch)
+        return classifier.predict_tokens(
+            list(seqs), vocab_version, threshold, timings, list(batch_windows)
+        )
+
+    timings = StageTimings()
+    try:
+        results = await classify(
+            sequences if windows is None else list(zip(sequences, windows)),
+            threshold,
+            timings,
+            client=client_key(request),
+            run_batch=run_batch,
+            rows=len(sequences) + extra,
+        )
+    except VocabularyMismatchError as exc:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": str(exc), "vocab_version": classifier.vocab_version},
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return timed_response(request, results, timings)
+
+
+# WebSocket messages draw from the same per-client budget as POST /predict,
+# which slowapi keys by request path
+PREDICT_LIMIT_SCOPE = app.url_path_for("predict")
+
+
+@app.websocket("/ws")
+async def predict_socket(websocket: WebSocket):
+    """
+    Persistent classification channel. Clients send
+    {"id", "comments", "threshold"} messages without waiting for replies;
+    each reply carries the same id and is pushed as soon as it is ready.
+    At most WS_MAX_INFLIGHT messages per connection are in progress —
+    further frames are not read until one finishes.
+    """
+    if not origin_allowed(websocket.headers.get("origin")):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+
+    client = websocket.client.host if websocket.client else "127.0.0.1"
+    fair_key = client_key(websocket)
+    slots = asyncio.Semaphore(settings.WS_MAX_INFLIGHT)
+    send_lock = asyncio.Lock()
+    tasks: set[asyncio.Task] = set()
+
+    async def reply(payload: dict):
+        async with send_lock:
+            try:
+                await websocket.send_json(payload)
+            except (WebSocketDisconnect, RuntimeError):
+                pass  # Client went away mid-request
+
+    async def handle(raw: str):
+        msg_id = None
+        try:
+            try:
+                data = json.loads(raw)
+                msg_id = data.get("id") if isinstance(data, dict) else None
+                msg = SocketPredictMessage.model_validate(data)
+            except (ValueError, ValidationError) as exc:
+                detail = (
+                    exc.errors(include_url=False, include_context=False)
+                    if isinstance(exc, ValidationError)
+                    else "Invalid JSON"
+                )
+                await reply({"id": msg_id, "status": 422, "detail": detail})
+                return
+            if not charge_rate_limit(client, PREDICT_LIMIT_SCOPE):
+                await reply(
+                    {
+                        "id": msg.id,
+                        "status": 429,
+                        "detail": f"Rate limit exceeded: {settings.RATE_LIMIT}",
+                    }
+                )
+                return
+            results = await classify(msg.comments, msg.threshold, client=fair_key)
+            await reply({"id": msg.id, "status": 200, "results": results})
+        except Exception as exc:
+            print(f"⚠️ WebSocket request failed: {exc}")
+            await reply({"id": msg_id, "status": 500, "detail": "Internal error"})
+        finally:
+            slots.release()
+
+    try:
+        while True:
+            await slots.acquire()
+            raw = await websocket.receive_text()
+            task = asyncio.create_task(handle(raw))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/admin/reload", dependencies=[Depends(require_admin_token)])
+async def reload_model():
+    """Hot-swap the model and tokenizer from disk without dropping requests."""
+    return await run_in_threadpool(classifier.reload)
+
+
+@app.get("/admin/scheduler", dependencies=[Depends(require_admin_token)])
+async def scheduler_stats():
+    """Per-client queue depths and service shares under fair scheduling."""
+    return scheduler.stats(per_client=True)
 
 
 # ── Run ───────────────────────────────────────────────────────────────
@@ -107,4 +518,5 @@ if __name__ == "__main__":
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
+        workers=settings.WORKERS,
     )
@@ -0,0 +1,302 @@
+"""
+Memory module — bounded in-flight work and per-request allocation tracking.
+
+Every inference request holds part of a per-worker budget of
+MAX_INFLIGHT_COMMENTS while it runs, so concurrent full-size batches wait
+their turn instead of multiplying peak memory. With MEMORY_TRACKING on,
+each request's peak Python-heap growth (tracemalloc, which also sees numpy
+buffers) is recorded next to the process RSS for /metrics.
+
+Memory-ceiling benchmark for full-size batches under concurrency (from server/):
+    python -m app.memory --concurrency 8 --ceiling-mb 300
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+import numpy as np
+
+from .config import get_settings
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process right now."""
+    try:
+        with open("/proc/self/statm") as handle:
+            pages = int(handle.read().split()[1])
+        return pages * resource.getpagesize() / 2**20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Highest RSS this process has reached (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class InflightBudget:
+    """FIFO weighted semaphore over comments being processed; 0 capacity = unlimited."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self.peak = 0
+        self._waiters: deque[tuple[int, asyncio.Future]] = deque()
+
+    @asynccontextmanager
+    async def hold(self, comments: int):
+        # A request larger than the whole budget runs alone rather than never
+        need = min(comments, self.capacity) if self.capacity > 0 else 0
+        if need and (self._waiters or self.in_use + need > self.capacity):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append((need, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release(need)  # Granted just as the client went away
+                else:
+                    self._waiters.remove((need, waiter))
+                    self._wake()
+                raise
+        else:
+            self.in_use += need
+        self.peak = max(self.peak, self.in_use)
+        try:
+            yield
+        finally:
+            self._release(need)
+
+    def _release(self, amount: int):
+        self.in_use -= amount
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_use + self._waiters[0][0] <= self.capacity:
+            need, waiter = self._waiters.popleft()
+            self.in_use += need
+            waiter.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "waiting": len(self._waiters),
+            "peak": self.peak,
+        }
+
+
+class _Tracing:
+    """
+    Single owner of tracemalloc, shared by MemoryTracker and the profiler.
+    Tracing stops when the last user releases it, and only if it was started
+    here. While a user holds the peak (a profile session), nobody else may
+    reset it; every reset bumps `generation` so overlapping measurements can
+    tell their window was cut short.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = 0
+        self._owned = False
+        self._peak_holds = 0
+        self.generation = 0
+
+    def acquire(self, frames: int = 1, hold_peak: bool = False):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self._owned = True
+                self.generation += 1
+            elif hold_peak and not self._peak_holds:
+                self._reset()  # The holder's peak starts now
+            self._users += 1
+            self._peak_holds += hold_peak
+
+    def release(self, hold_peak: bool = False):
+        with self._lock:
+            self._users -= 1
+            self._peak_holds -= hold_peak
+            if self._users == 0 and self._owned:
+                tracemalloc.stop()
+                self._owned = False
+
+    def reset_peak(self) -> bool:
+        """Reset the peak unless a holder needs it intact."""
+        with self._lock:
+            if self._peak_holds or not tracemalloc.is_tracing():
+                return False
+            self._reset()
+            return True
+
+    def _reset(self):
+        tracemalloc.reset_peak()
+        self.generation += 1
+
+
+tracing = _Tracing()
+
+
+class MemoryTracker:
+    """Per-request peak heap growth over a rolling window of requests."""
+
+    def __init__(self, window: int = 1000):
+        self.peaks_kb: deque[float] = deque(maxlen=window)
+        self._active = 0
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        if get_settings().MEMORY_TRACKING and not self._started:
+            tracing.acquire()
+            self._started = True
+
+    def stop(self):
+        if self._started:
+            tracing.release()
+            self._started = False
+
+    @contextmanager
+    def track(self):
+        """
+        Record the heap high-water mark above the level at entry. The peak
+        counter is process-wide, so when requests overlap, or a profile
+        session holds the peak, the figure is an upper bound that includes
+        other allocations. Requests whose window another reset cut short
+        are not recorded.
+        """
+        if not tracemalloc.is_tracing():
+            yield
+            return
+        with self._lock:
+            if self._active == 0:
+                tracing.reset_peak()
+            self._active += 1
+            start = tracemalloc.get_traced_memory()[0]
+            generation = tracing.generation
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+                peak = tracemalloc.get_traced_memory()[1]
+            if tracing.generation == generation:
+                self.peaks_kb.append(max(peak - start, 0) / 1024)
+
+    def stats(self) -> dict:
+        peaks = np.array(self.peaks_kb)
+        return {
+            "rss_mb": round(current_rss_mb(), 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "tracking": tracemalloc.is_tracing(),
+            "request_peak_kb": {
+                "requests": len(peaks),
+                "p50": round(float(np.percentile(peaks, 50)), 1) if len(peaks) else None,
+                "p99": round(float(np.percentile(peaks, 99)), 1) if len(peaks) else None,
+                "max": round(float(peaks.max()), 1) if len(peaks) else None,
+            },
+        }
+
+
+# ── Benchmark ────────────────────────────────────────────────────────
+def full_size_batch(words: list[str], seed: int = 0) -> list[str]:
+    """MAX_COMMENTS_PER_REQUEST comments of MAX_COMMENT_LENGTH characters each."""
+    settings = get_settings()
+    rng = random.Random(seed)
+    comments = []
+    for _ in range(settings.MAX_COMMENTS_PER_REQUEST):
+        text = ""
+        while len(text) < settings.MAX_COMMENT_LENGTH:
+            text += rng.choice(words) + " "
+        comments.append(text[: settings.MAX_COMMENT_LENGTH])
+    return comments
+
+
+async def run_concurrent(app, batch: list[str], concurrency: int, rounds: int) -> list[int]:
+    """POST the batch to /predict from `concurrency` clients, `rounds` times each."""
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one_client():
+            codes = []
+            for _ in range(rounds):
+                response = await client.post("/predict", json={"comments": batch})
+                codes.append(response.status_code)
+            return codes
+
+        results = await asyncio.gather(*(one_client() for _ in range(concurrency)))
+    return [code for codes in results for code in codes]
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="Peak RSS for full-size /predict batches under concurrency."
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3, help="Requests per client")
+    parser.add_argument("--ceiling-mb", type=float, default=300.0, help="Max RSS growth")
+    parser.add_argument("--workload", help="Words to build comments from (default: built-in)")
+    args = parser.parse_args(argv)
+
+    from .classifier import classifier
+    from .main import app, budget
+    from .middleware import limiter
+
+    limiter.enabled = False
+    classifier.load()
+    words = (
+        open(args.workload, encoding="utf-8").read().split()
+        if args.workload
+        else "you are such an idiot what a lovely day thanks friend".split()
+    )
+    batch = full_size_batch(words)
+    asyncio.run(run_concurrent(app, batch, 1, 1))  # Warm every code path once
+
+    baseline = current_rss_mb()
+    peak, done = [baseline], threading.Event()
+
+    def sample():
+        while not done.wait(0.005):
+            peak[0] = max(peak[0], current_rss_mb())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    codes = asyncio.run(run_concurrent(app, batch, args.concurrency, args.rounds))
+    elapsed = time.perf_counter() - started
+    done.set()
+    sampler.join()
+
+    growth = peak[0] - baseline
+    report = {
+        "concurrency": args.concurrency,
+        "batch": len(batch),
+        "requests": len(codes),
+        "failed": sum(code != 200 for code in codes),
+        "seconds": round(elapsed, 2),
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(peak[0], 1),
+        "growth_mb": round(growth, 1),
+        "ceiling_mb": args.ceiling_mb,
+        "inflight": budget.stats(),
+    }
+    print(json.dumps(report))
+    ok = growth <= args.ceiling_mb and report["failed"] == 0
+    print(("✅ Within" if ok else "❌ Over") + f" the {args.ceiling_mb:g} MB ceiling")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,26 +2,92 @@
 Security middleware — rate limiting and security headers.
 """
 
+import ipaddress
+import secrets
 import uuid
+from fnmatch import fnmatch
 
-from fastapi import Request
+from fastapi import Header, HTTPException, Request
+from limits import parse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import HTTPConnection
 from starlette.responses import Response
 
+from .config import get_settings
+
 # ── Rate Limiter ──────────────────────────────────────────────────────
 limiter = Limiter(key_func=get_remote_address)
 
 
+def charge_rate_limit(key: str, scope: str) -> bool:
+    """
+    Count one request against RATE_LIMIT for `key` under an endpoint's
+    slowapi scope, for traffic the @limiter.limit decorator never sees
+    (WebSocket messages). Returns False once the budget is exhausted.
+    """
+    return limiter.limiter.hit(parse(get_settings().RATE_LIMIT), key, scope)
+
+
+def trusted_proxy(host: str) -> bool:
+    """Whether `host` matches an address or network in FAIR_TRUSTED_PROXIES."""
+    for entry in get_settings().FAIR_TRUSTED_PROXIES:
+        if host == entry:
+            return True
+        try:
+            if ipaddress.ip_address(host) in ipaddress.ip_network(entry, strict=False):
+                return True
+        except ValueError:
+            continue  # Not an IP address or network, e.g. a Unix socket peer
+    return False
+
+
+def client_key(conn: HTTPConnection) -> str:
+    """
+    Fair-scheduling key: FAIR_CLIENT_HEADER when a trusted proxy sent it,
+    else the remote address. Anyone else could pick a heavier weight, or
+    spread their load over many queues, by setting the header themselves.
+    """
+    header = get_settings().FAIR_CLIENT_HEADER
+    host = conn.client.host if conn.client else "127.0.0.1"
+    if header and conn.headers.get(header) and trusted_proxy(host):
+        return conn.headers[header]
+    return host
+
+
+def origin_allowed(origin: str | None) -> bool:
+    """Match a browser Origin against CORS_ORIGINS; non-browser clients pass."""
+    if origin is None:
+        return True
+    return any(fnmatch(origin, pattern) for pattern in get_settings().CORS_ORIGINS)
+
+
 # ── Security Headers ─────────────────────────────────────────────────
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     """Inject security headers on every response."""
 
     async def dispatch(self, request: Request, call_next) -> Response:
+        # Generated up front so endpoints can log it alongside their timings
+        request.state.request_id = str(uuid.uuid4())
         response = await call_next(request)
         response.headers["X-Content-Type-Options"] = "nosniff"
         response.headers["X-Frame-Options"] = "DENY"
         response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["X-Request-ID"] = str(uuid.uuid4())
+        response.headers["X-Request-ID"] = request.state.request_id
         return response
+
+
+# ── Admin Token ──────────────────────────────────────────────────────
+def is_admin_token(token: str | None) -> bool:
+    """Constant-time check against ADMIN_TOKEN; always False if it is unset."""
+    expected = get_settings().ADMIN_TOKEN
+    if not expected or token is None:
+        return False
+    return secrets.compare_digest(token.encode(), expected.encode())
+
+
+async def require_admin_token(x_admin_token: str | None = Header(default=None)):
+    """FastAPI dependency guarding the /admin endpoints."""
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid or missing admin token.")
@@ -0,0 +1,260 @@
+"""
+Pipeline module — overlapped stage execution for ToxicClassifier.predict.
+Requests are split into chunks that flow through three threads joined by
+bounded queues: prepare (cache, tokenize, prefilter, pad), infer (the model,
+which releases the GIL) and assemble (scores → result dicts). While chunk N
+is in the model, chunk N+1 is being tokenized and chunk N−1 assembled.
+
+Throughput against the sequential path (from server/):
+    python -m app.pipeline --workload comments.txt --chunk-size 64 --batches 200
+"""
+
+import argparse
+import asyncio
+import json
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+from .classifier import PreparedBatch, StageTimings, ToxicClassifier
+from .config import get_settings
+
+STAGES = ("prepare", "infer", "assemble")
+
+
+@dataclass
+class _Chunk:
+    comments: list[str]
+    threshold: float
+    future: asyncio.Future
+    loop: asyncio.AbstractEventLoop
+    timings: StageTimings = field(default_factory=StageTimings)
+    windows: list[bool] | None = None
+    started: float = 0.0
+    prepared: PreparedBatch | None = None
+    predicted: object = None
+    failed: bool = False
+
+
+def _resolve(future: asyncio.Future, result=None, error: BaseException | None = None):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class StagePipeline:
+    """Three stage threads with bounded hand-off queues between them."""
+
+    def __init__(self, engine: ToxicClassifier):
+        self.engine = engine
+        self._queues: list[queue.Queue] = []
+        self._threads: list[threading.Thread] = []
+        self._busy = dict.fromkeys(STAGES, 0.0)
+        self._items = dict.fromkeys(STAGES, 0)
+        self._started_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self, depth: int = 2):
+        """
+        Start the stage threads. The inbound queue is unbounded (admission
+        is bounded by the in-flight budget); each hand-off queue holds at
+        most `depth` chunks, so a slow stage stalls the one before it.
+        """
+        self._queues = [queue.Queue()] + [queue.Queue(depth) for _ in STAGES[1:]]
+        self._busy = dict.fromkeys(STAGES, 0.0)
+        self._items = dict.fromkeys(STAGES, 0)
+        self._started_at = time.perf_counter()
+        self._threads = [
+            threading.Thread(
+                target=self._run_stage, args=(i,), name=f"pipeline-{name}", daemon=True
+            )
+            for i, name in enumerate(STAGES)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Drain chunks already queued, then stop every stage."""
+        if not self._threads:
+            return
+        self._queues[0].put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    async def submit(
+        self,
+        comments: list[str],
+        threshold: float,
+        timings: StageTimings,
+        windows: list[bool] | None = None,
+        submitted: float | None = None,
+    ) -> list[dict]:
+        """
+        Queue a request as chunks and wait for all of them, in order. Each
+        chunk gets its slice of the request's window plan, if any; the queue
+        stage is timed from `submitted`, if the caller waited before.
+        """
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter() if submitted is None else submitted
+        size = get_settings().PIPELINE_CHUNK_SIZE
+        chunks = [
+            _Chunk(
+                comments[start : start + size],
+                threshold,
+                loop.create_future(),
+                loop,
+                windows=None if windows is None else windows[start : start + size],
+            )
+            for start in range(0, len(comments), size)
+        ]
+        for chunk in chunks:
+            self._queues[0].put(chunk)
+
+        try:
+            parts = await asyncio.gather(*(chunk.future for chunk in chunks))
+        except BaseException:
+            for chunk in chunks:
+                chunk.future.cancel()
+            raise
+
+        results = []
+        for part in parts:
+            results.extend(part)
+        for chunk in chunks:
+            for stage, ms in chunk.timings.items():
+                timings[stage] = timings.get(stage, 0.0) + ms
+        timings["queue"] = (min(chunk.started for chunk in chunks) - submitted) * 1000
+        return results
+
+    def _run_stage(self, index: int):
+        name = STAGES[index]
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(STAGES) else None
+        step = getattr(self, f"_{name}")
+        while True:
+            chunk = inbox.get()
+            if chunk is None:
+                if outbox is not None:
+                    outbox.put(None)
+                return
+            # Skip work for failed chunks and abandoned requests
+            if not chunk.failed and not chunk.future.done():
+                started = time.perf_counter()
+                result, error = None, None
+                try:
+                    result = step(chunk)
+                except Exception as exc:
+                    chunk.failed, error = True, exc
+                self._busy[name] += time.perf_counter() - started
+                self._items[name] += 1
+                if error is not None or outbox is None:
+                    chunk.loop.call_soon_threadsafe(_resolve, chunk.future, result, error)
+            if outbox is not None:
+                outbox.put(chunk)
+
+    def _prepare(self, chunk: _Chunk):
+        chunk.started = time.perf_counter()
+        chunk.prepared = self.engine.prepare(
+            chunk.comments, chunk.threshold, timings=chunk.timings, windows=chunk.windows
+        )
+
+    def _infer(self, chunk: _Chunk):
+        chunk.predicted = self.engine.infer(chunk.prepared, chunk.timings)
+
+    def _assemble(self, chunk: _Chunk) -> list[dict]:
+        results = self.engine.assemble(
+            chunk.comments, chunk.prepared, chunk.predicted, chunk.threshold, chunk.timings
+        )
+        chunk.prepared = chunk.predicted = None
+        return results
+
+    def stats(self) -> dict:
+        """Busy fraction of each stage since start, and hand-off queue depths."""
+        elapsed = max(time.perf_counter() - self._started_at, 1e-9)
+        return {
+            "running": self.running,
+            "stages": {
+                name: {
+                    "chunks": self._items[name],
+                    "busy_ms": round(self._busy[name] * 1000, 1),
+                    "utilization": round(self._busy[name] / elapsed, 4)
+                    if self.running
+                    else None,
+                    "queued": self._queues[i].qsize() if self._queues else 0,
+                }
+                for i, name in enumerate(STAGES)
+            },
+        }
+
+
+# ── Benchmark ────────────────────────────────────────────────────────
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="Pipelined vs sequential ToxicClassifier.predict throughput."
+    )
+    parser.add_argument("--workload", required=True, help="One comment per line")
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--depth", type=int, default=2, help="Hand-off queue depth")
+    args = parser.parse_args(argv)
+
+    with open(args.workload, encoding="utf-8") as handle:
+        corpus = [line.strip() for line in handle if line.strip()]
+    batches = [
+        [corpus[(b * args.chunk_size + i) % len(corpus)] for i in range(args.chunk_size)]
+        for b in range(args.batches)
+    ]
+    settings = get_settings()
+    settings.PIPELINE_CHUNK_SIZE = args.chunk_size
+    settings.SCORE_CACHE_ENABLED = False
+
+    engine = ToxicClassifier()
+    engine.load()
+    engine.predict(batches[0])  # Warm up
+
+    started = time.perf_counter()
+    for batch in batches:
+        engine.predict(batch)
+    sequential = time.perf_counter() - started
+
+    async def pipelined() -> tuple[float, dict]:
+        pipeline = StagePipeline(engine)
+        pipeline.start(args.depth)
+        try:
+            begun = time.perf_counter()
+            await asyncio.gather(
+                *(pipeline.submit(batch, 0.5, StageTimings()) for batch in batches)
+            )
+            return time.perf_counter() - begun, pipeline.stats()
+        finally:
+            pipeline.stop()
+
+    overlapped, stats = asyncio.run(pipelined())
+    comments = args.batches * args.chunk_size
+    print(
+        json.dumps(
+            {
+                "comments": comments,
+                "chunk_size": args.chunk_size,
+                "depth": args.depth,
+                "sequential_per_s": round(comments / sequential, 1),
+                "pipelined_per_s": round(comments / overlapped, 1),
+                "speedup": round(sequential / overlapped, 2),
+                "utilization": {
+                    name: stage["utilization"] for name, stage in stats["stages"].items()
+                },
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Prefilter module — cheap lexical first stage ahead of the LSTM.
+A hashed bag-of-words linear scorer over the tokenizer's own token ids,
+distilled offline from the LSTM's outputs. Comments it rates as clearly
+safe skip the model; everything else falls through.
+
+Offline usage (from server/):
+    python -m app.prefilter distill  --corpus comments.txt
+    python -m app.prefilter evaluate --corpus heldout.txt --bound 0.02
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Knuth multiplicative hash spreads neighbouring token ids across buckets.
+_HASH_MULTIPLIER = 2654435761
+
+
+class LexicalPrefilter:
+    """Linear multi-label scorer over hashed token-id counts."""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, model_version: str):
+        self.weights = weights.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+        self.model_version = model_version
+
+    @property
+    def num_buckets(self) -> int:
+        return self.weights.shape[0]
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalPrefilter":
+        data = np.load(path)
+        return cls(data["weights"], data["bias"], str(data["model_version"]))
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            model_version=np.array(self.model_version),
+        )
+
+    def _features(self, sequences: list[list[int]]) -> tuple[np.ndarray, np.ndarray]:
+        """Flatten sequences into (bucket ids, row offsets) for segment sums."""
+        lengths = np.fromiter((len(s) for s in sequences), np.int64, len(sequences))
+        offsets = np.zeros(len(sequences) + 1, np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        flat = np.fromiter(
+            (t for s in sequences for t in s), np.int64, int(offsets[-1])
+        )
+        return (flat * _HASH_MULTIPLIER) % self.num_buckets, offsets
+
+    def predict_proba(self, sequences: list[list[int]]) -> np.ndarray:
+        """Return (n, categories) sigmoid scores for tokenized comments."""
+        buckets, offsets = self._features(sequences)
+        totals = np.zeros((len(buckets) + 1, self.weights.shape[1]), np.float64)
+        np.cumsum(self.weights[buckets], axis=0, out=totals[1:])
+        logits = totals[offsets[1:]] - totals[offsets[:-1]] + self.bias
+        return (1.0 / (1.0 + np.exp(-logits))).astype(np.float32)
+
+    @classmethod
+    def distill(
+        cls,
+        sequences: list[list[int]],
+        targets: np.ndarray,
+        model_version: str,
+        num_buckets: int = 1 << 16,
+        epochs: int = 300,
+        learning_rate: float = 0.05,
+        l2: float = 1e-6,
+    ) -> "LexicalPrefilter":
+        """
+        Fit weights to the LSTM's soft labels with full-batch Adam on the
+        logistic loss. `targets` is the (n, categories) LSTM score matrix.
+        """
+        n, k = targets.shape
+        prefilter = cls(
+            np.zeros((num_buckets, k), np.float32),
+            np.log(np.clip(targets.mean(axis=0), 1e-4, 1 - 1e-4))
+            - np.log1p(-np.clip(targets.mean(axis=0), 1e-4, 1 - 1e-4)),
+            model_version,
+        )
+        buckets, offsets = prefilter._features(sequences)
+        rows = np.repeat(np.arange(n), np.diff(offsets))
+
+        params = [prefilter.weights, prefilter.bias]
+        moments = [(np.zeros_like(p), np.zeros_like(p)) for p in params]
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+        for step in range(1, epochs + 1):
+            err = (prefilter.predict_proba(sequences) - targets) / n
+            grad_w = np.stack(
+                [
+                    np.bincount(buckets, weights=err[rows, j], minlength=num_buckets)
+                    for j in range(k)
+                ],
+                axis=1,
+            ) + l2 * prefilter.weights
+            grads = [grad_w, err.sum(axis=0)]
+            for param, grad, (m, v) in zip(params, grads, moments):
+                m *= beta1
+                m += (1 - beta1) * grad
+                v *= beta2
+                v += (1 - beta2) * grad**2
+                m_hat = m / (1 - beta1**step)
+                v_hat = v / (1 - beta2**step)
+                param -= (learning_rate * m_hat / (np.sqrt(v_hat) + eps)).astype(
+                    np.float32
+                )
+        return prefilter
+
+
+def evaluate(
+    probs: np.ndarray, targets: np.ndarray, bound: float, threshold: float = 0.5
+) -> dict:
+    """
+    Share of comments the cascade would skip at `bound`, and how many of
+    those the LSTM would have flagged in any category at `threshold`.
+    """
+    skipped = probs.max(axis=1) < bound
+    flagged = (targets >= threshold).any(axis=1)
+    missed = int(np.sum(skipped & flagged))
+    return {
+        "bound": bound,
+        "comments": int(len(probs)),
+        "skip_rate": round(float(skipped.mean()), 4) if len(probs) else 0.0,
+        "disagreements": missed,
+        "disagreement_rate": round(missed / max(int(skipped.sum()), 1), 4),
+        "missed_flag_rate": round(missed / max(int(flagged.sum()), 1), 4),
+    }
+
+
+# ── CLI ───────────────────────────────────────────────────────────────
+def _read_corpus(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as handle:
+        return [line.rstrip("\n") for line in handle if line.strip()]
+
+
+def main(argv: list[str] | None = None):
+    from .classifier import ToxicClassifier
+    from .config import get_settings
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("distill", "evaluate"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("--corpus", required=True, help="One comment per line")
+        cmd.add_argument("--prefilter", default=get_settings().PREFILTER_PATH)
+        cmd.add_argument("--threshold", type=float, default=0.5)
+        cmd.add_argument(
+            "--bound",
+            type=float,
+            action="append",
+            help="Safe bound(s) to evaluate (default: 0.005, 0.01, 0.02, 0.05)",
+        )
+    sub.choices["distill"].add_argument("--buckets", type=int, default=1 << 16)
+    sub.choices["distill"].add_argument("--epochs", type=int, default=300)
+    sub.choices["distill"].add_argument(
+        "--holdout", type=float, default=0.2, help="Fraction kept for evaluation"
+    )
+    args = parser.parse_args(argv)
+    bounds = args.bound or [0.005, 0.01, 0.02, 0.05]
+
+    engine = ToxicClassifier()
+    engine.load()
+    texts = _read_corpus(args.corpus)
+    sequences = engine.tokenizer.texts_to_sequences(
+        [t[: engine.settings.MAX_COMMENT_LENGTH] for t in texts]
+    )
+    print(f"🔄 Scoring {len(texts):,} comments with the LSTM...")
+    targets = engine.score(texts, cascade=False)
+
+    if args.command == "distill":
+        order = np.random.default_rng(0).permutation(len(texts))
+        cut = int(len(texts) * (1 - args.holdout))
+        train, test = order[:cut], order[cut:]
+        prefilter = LexicalPrefilter.distill(
+            [sequences[i] for i in train],
+            targets[train],
+            engine.fingerprint,
+            num_buckets=args.buckets,
+            epochs=args.epochs,
+        )
+        Path(args.prefilter).parent.mkdir(parents=True, exist_ok=True)
+        prefilter.save(args.prefilter)
+        print(f"✅ Saved prefilter for model {engine.fingerprint} → {args.prefilter}")
+        sequences, targets = [sequences[i] for i in test], targets[test]
+    else:
+        prefilter = LexicalPrefilter.load(args.prefilter)
+
+    probs = prefilter.predict_proba(sequences)
+    for bound in bounds:
+        print(evaluate(probs, targets, bound, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
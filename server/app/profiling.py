@@ -0,0 +1,198 @@
+"""
+Profiling module — opt-in sampling profiler for live traffic.
+A background thread samples every Python stack at a fixed interval and
+writes collapsed-stack profiles (flamegraph.pl / speedscope format) plus
+tracemalloc allocation snapshots to PROFILING_DIR.
+
+Nothing in this module is imported into the request path unless
+PROFILING_ENABLED is set, so it costs nothing when switched off.
+"""
+
+import json
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse, Response
+
+from .config import get_settings
+from .memory import tracing
+from .middleware import is_admin_token, require_admin_token
+
+# Leaf frames in these files are threads parked on a lock or selector.
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+
+# ── Sampler ───────────────────────────────────────────────────────────
+class StackSampler(threading.Thread):
+    """Collects collapsed Python stacks from all other threads."""
+
+    def __init__(self, interval: float):
+        super().__init__(name="toxguard-profiler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == own or frame.f_code.co_filename.endswith(_IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({Path(code.co_filename).name}:"
+                        f"{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self) -> Counter:
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+
+# ── Session ───────────────────────────────────────────────────────────
+class ProfileSession:
+    """One profiling run: stack sampler + allocation tracing."""
+
+    def __init__(self, kind: str, label: str):
+        settings = get_settings()
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.kind = kind
+        self.label = label
+        self.started = time.perf_counter()
+        self.sampler = StackSampler(settings.PROFILING_INTERVAL_MS / 1000)
+        # Shared with MEMORY_TRACKING; if that started tracing first, the
+        # snapshot keeps its traceback depth rather than ours
+        tracing.acquire(settings.PROFILING_TRACEMALLOC_FRAMES, hold_peak=True)
+        self.sampler.start()
+
+    def finish(self) -> dict:
+        """Stop sampling, write the profile files, and return the summary."""
+        stacks = self.sampler.stop()
+        duration = time.perf_counter() - self.started
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracing.release(hold_peak=True)
+
+        out = Path(get_settings().PROFILING_DIR)
+        out.mkdir(parents=True, exist_ok=True)
+        with open(out / f"{self.id}.folded", "w") as handle:
+            for stack, count in stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+        top_allocations = snapshot.statistics("lineno")[:25]
+        with open(out / f"{self.id}.alloc.txt", "w") as handle:
+            handle.writelines(f"{stat}\n" for stat in top_allocations)
+
+        leaves: Counter[str] = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+
+        summary = {
+            "id": self.id,
+            "kind": self.kind,
+            "label": self.label,
+            "duration_ms": round(duration * 1000, 2),
+            "samples": self.sampler.samples,
+            "peak_traced_bytes": peak,
+            "top_frames": [
+                {"frame": frame, "share": round(count / total, 4)}
+                for frame, count in leaves.most_common(10)
+            ],
+            "top_allocations": [str(stat) for stat in top_allocations[:5]],
+        }
+        with open(out / f"{self.id}.json", "w") as handle:
+            json.dump(summary, handle, indent=2)
+        return summary
+
+
+# Only one session at a time — tracemalloc and the sampler are process-wide.
+_active_lock = threading.Lock()
+
+
+def try_start(kind: str, label: str) -> ProfileSession | None:
+    """Start a session unless one is already running."""
+    if not _active_lock.acquire(blocking=False):
+        return None
+    try:
+        return ProfileSession(kind, label)
+    except Exception:
+        _active_lock.release()
+        raise
+
+
+def finish(session: ProfileSession) -> dict:
+    try:
+        return session.finish()
+    finally:
+        _active_lock.release()
+
+
+# ── Per-request Middleware ────────────────────────────────────────────
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """
+    Profile a single request when it carries `X-Profile: 1` and a valid
+    `X-Admin-Token`. Installed only when PROFILING_ENABLED is set.
+    """
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        if request.headers.get("X-Profile") != "1":
+            return await call_next(request)
+        if not is_admin_token(request.headers.get("X-Admin-Token")):
+            return JSONResponse(
+                {"detail": "Invalid or missing admin token."}, status_code=403
+            )
+
+        session = try_start("request", f"{request.method} {request.url.path}")
+        if session is None:
+            response = await call_next(request)
+            response.headers["X-Profile-Skipped"] = "busy"
+            return response
+        try:
+            response = await call_next(request)
+        finally:
+            summary = finish(session)
+        response.headers["X-Profile-Id"] = summary["id"]
+        return response
+
+
+# ── Admin Endpoints ───────────────────────────────────────────────────
+router = APIRouter(prefix="/admin/profiles", dependencies=[Depends(require_admin_token)])
+
+
+@router.post("")
+async def start_window(seconds: float = Query(10.0, gt=0)):
+    """Profile all traffic for a time window; results land in the summary list."""
+    settings = get_settings()
+    seconds = min(seconds, settings.PROFILING_MAX_WINDOW_SECONDS)
+    session = try_start("window", f"{seconds:g}s window")
+    if session is None:
+        raise HTTPException(status_code=409, detail="A profile is already running.")
+    threading.Timer(seconds, finish, args=(session,)).start()
+    return {"id": session.id, "seconds": seconds}
+
+
+@router.get("")
+async def list_profiles():
+    """Summaries of saved profiles, newest first."""
+    out = Path(get_settings().PROFILING_DIR)
+    summaries = [
+        json.loads(path.read_text())
+        for path in sorted(out.glob("*.json"), reverse=True)
+    ]
+    return {"profiles": summaries}
@@ -0,0 +1,206 @@
+"""
+Replicas module — a pool of model instances for parallel inference.
+
+With MODEL_REPLICAS > 1 the loaded Keras model is cloned into independent
+copies that share the bundle's read-only tokenizer and prefilter. Every
+model call goes to the replica with the fewest rows in flight, and each
+replica runs one call at a time. TensorFlow's thread pools are
+process-wide, so the per-replica thread budget is expressed as
+REPLICA_THREADS intra-op threads per op with one inter-op slot per replica
+(see configure_threads); replicas cannot be pinned to their own CPUs, as
+TF's pool threads, not the caller, do the work. When the folded model
+serves, no replicas are made: its numpy tables are read-only and safe to
+share between concurrent calls.
+
+Throughput scaling with replica count and thread settings (from server/):
+    python -m app.replicas --workload comments.txt --replicas 1,2,4 --threads 1,2
+"""
+
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+
+class Replica:
+    """One model copy and what it has served."""
+
+    def __init__(self, index: int, model):
+        self.index = index
+        self.model = model
+        self.lock = threading.Lock()
+        self.pending_rows = 0  # Queued for or running on this replica
+        self.calls = 0
+        self.rows = 0
+        self.busy = 0.0
+
+
+class ReplicaPool:
+    """Least-loaded dispatch of model calls across replicas."""
+
+    def __init__(self, models: list):
+        self.replicas = [Replica(i, model) for i, model in enumerate(models)]
+        self._lock = threading.Lock()
+        self._started_at = time.perf_counter()
+
+    @classmethod
+    def clone(cls, model, count: int) -> "ReplicaPool":
+        """`model` plus `count - 1` weight-identical copies of it."""
+        from tf_keras.models import clone_model
+
+        models = [model]
+        for _ in range(count - 1):
+            copy = clone_model(model)
+            copy.set_weights(model.get_weights())
+            models.append(copy)
+        return cls(models)
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    def run(self, rows: int, call: Callable[[object], np.ndarray]) -> np.ndarray:
+        """Run `call(model)` on the least-loaded replica, waiting if it is busy."""
+        with self._lock:
+            replica = min(self.replicas, key=lambda r: (r.pending_rows, r.rows))
+            replica.pending_rows += rows
+        try:
+            with replica.lock:
+                started = time.perf_counter()
+                out = call(replica.model)
+                replica.busy += time.perf_counter() - started
+                replica.calls += 1
+                replica.rows += rows
+            return out
+        finally:
+            with self._lock:
+                replica.pending_rows -= rows
+
+    def each(self, call: Callable[[object], np.ndarray]) -> list[np.ndarray]:
+        """Run `call` once on every replica (warm-up and parity checks)."""
+        outputs = []
+        for replica in self.replicas:
+            with replica.lock:
+                outputs.append(call(replica.model))
+        return outputs
+
+    def stats(self) -> dict:
+        elapsed = max(time.perf_counter() - self._started_at, 1e-9)
+        total = sum(r.rows for r in self.replicas) or 1
+        return {
+            "replicas": len(self.replicas),
+            "pool": [
+                {
+                    "pending_rows": r.pending_rows,
+                    "calls": r.calls,
+                    "rows": r.rows,
+                    "share": round(r.rows / total, 4),
+                    "utilization": round(r.busy / elapsed, 4),
+                }
+                for r in self.replicas
+            ],
+        }
+
+
+# ── Benchmark ────────────────────────────────────────────────────────
+def _run_worker(args):
+    """Child process: `concurrency` threads calling predict() for `duration` seconds."""
+    from .classifier import ToxicClassifier
+
+    engine = ToxicClassifier()
+    engine.load()
+    with open(args.workload, encoding="utf-8") as handle:
+        texts = [line.rstrip("\n") for line in handle if line.strip()]
+    requests = [
+        texts[i : i + args.request_size] for i in range(0, len(texts), args.request_size)
+    ]
+    latencies, comments, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def client(offset: int):
+        for batch in itertools.islice(itertools.cycle(requests), offset, None):
+            if time.perf_counter() >= deadline:
+                return
+            started = time.perf_counter()
+            engine.predict(batch, 0.5)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                comments[0] += len(batch)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool = engine.replica_stats()
+    print(
+        json.dumps(
+            {
+                "throughput": round(comments[0] / args.duration, 1),
+                "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+                "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2),
+                "shares": [r["share"] for r in pool["pool"]] if pool else [1.0],
+            }
+        ),
+        flush=True,
+    )
+
+
+def measure(replicas: int, threads: int, args) -> dict:
+    """One configuration in a fresh process; TF thread pools are fixed at startup."""
+    env = {
+        **os.environ,
+        "MODEL_REPLICAS": str(replicas),
+        "REPLICA_THREADS": str(threads),
+        "SCORE_CACHE_ENABLED": "false",
+        "TF_CPP_MIN_LOG_LEVEL": "2",
+    }
+    cmd = [
+        sys.executable, "-m", "app.replicas", "_worker",
+        "--workload", args.workload,
+        "--request-size", str(args.request_size),
+        "--concurrency", str(args.concurrency),
+        "--duration", str(args.duration),
+    ]
+    out = subprocess.run(
+        cmd, cwd=Path(__file__).parent.parent, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return {"replicas": replicas, "threads": threads, **json.loads(out.stdout.splitlines()[-1])}
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Throughput by replica count and threads.")
+    parser.add_argument("mode", nargs="?", default="sweep", choices=["sweep", "_worker"])
+    parser.add_argument("--workload", required=True, help="One comment per line")
+    parser.add_argument("--replicas", type=_int_list, default=[1, 2, 4])
+    parser.add_argument("--threads", type=_int_list, default=[1, 2], help="Intra-op threads")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--request-size", type=int, default=32, help="Comments per call")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per config")
+    args = parser.parse_args(argv)
+
+    if args.mode == "_worker":
+        return _run_worker(args)
+
+    baseline = None
+    for replicas, threads in itertools.product(args.replicas, args.threads):
+        result = measure(replicas, threads, args)
+        baseline = baseline or result["throughput"]
+        result["scaling"] = round(result["throughput"] / baseline, 2)
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
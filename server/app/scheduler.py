@@ -0,0 +1,212 @@
+"""
+Scheduler module — weighted fair queuing of inference across clients.
+Large requests are split into sub-batches. Each sub-batch gets a virtual
+finish tag of `start + size / weight`, where `start` is the later of the
+scheduler's virtual clock and the client's previous finish tag. Workers
+always serve the pending sub-batch with the smallest tag, so a client
+sending back-to-back 500-comment batches cannot starve a light one.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable
+
+from fastapi.concurrency import run_in_threadpool
+
+from .classifier import StageTimings
+from .config import get_settings
+
+# Served-comment counters kept for share reporting before the smallest are dropped
+_MAX_TRACKED_CLIENTS = 1000
+
+
+@dataclass
+class _SubBatch:
+    comments: list  # Texts, or token id sequences
+    threshold: float
+    start_tag: float
+    finish_tag: float
+    future: asyncio.Future
+    run_batch: Callable
+
+
+@dataclass
+class _ClientQueue:
+    weight: float
+    last_finish: float = 0.0
+    pending: deque = field(default_factory=deque)
+
+    @property
+    def queued_comments(self) -> int:
+        return sum(len(sub.comments) for sub in self.pending)
+
+
+class FairScheduler:
+    """Serve sub-batches from per-client queues in virtual finish-tag order."""
+
+    def __init__(self, run_batch: Callable[[list[str], float, StageTimings], list[dict]]):
+        self.run_batch = run_batch
+        self._clients: dict[str, _ClientQueue] = {}
+        self._served: dict[str, int] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._wakeup: asyncio.Event | None = None
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self, workers: int = 1):
+        """Start worker tasks on the running event loop."""
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(workers)]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _weight(self, client: str) -> float:
+        settings = get_settings()
+        return settings.FAIR_WEIGHTS.get(client, settings.FAIR_DEFAULT_WEIGHT)
+
+    async def submit(
+        self,
+        client: str,
+        comments: list[str],
+        threshold: float,
+        timings: StageTimings,
+        run_batch: Callable | None = None,
+        submitted: float | None = None,
+    ) -> list[dict]:
+        """
+        Queue a request as sub-batches and wait for all of them. `run_batch`
+        overrides the scheduler's default for this request's items; the
+        queue stage is timed from `submitted`, if the caller waited before.
+        """
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter() if submitted is None else submitted
+        size = get_settings().FAIR_SUBBATCH_SIZE
+
+        queue = self._clients.get(client)
+        if queue is None:
+            queue = self._clients[client] = _ClientQueue(self._weight(client))
+
+        futures = []
+        for start in range(0, len(comments), size):
+            part = comments[start : start + size]
+            start_tag = max(self._virtual_time, queue.last_finish)
+            queue.last_finish = start_tag + len(part) / queue.weight
+            sub = _SubBatch(
+                part,
+                threshold,
+                start_tag,
+                queue.last_finish,
+                loop.create_future(),
+                run_batch or self.run_batch,
+            )
+            if not queue.pending:
+                heapq.heappush(self._heap, (sub.finish_tag, next(self._seq), client))
+            queue.pending.append(sub)
+            futures.append(sub.future)
+        self._wakeup.set()
+
+        try:
+            parts = await asyncio.gather(*futures)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        results = []
+        for part_results, part_timings, _ in parts:
+            results.extend(part_results)
+            for stage, ms in part_timings.items():
+                timings[stage] = timings.get(stage, 0.0) + ms
+        first_started = min(started for _, _, started in parts)
+        timings["queue"] = (first_started - submitted) * 1000
+        return results
+
+    async def _next(self) -> tuple[str, _SubBatch]:
+        """Pop the pending sub-batch with the smallest finish tag."""
+        while True:
+            while not self._heap:
+                self._purge_idle()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            _, _, client = heapq.heappop(self._heap)
+            queue = self._clients[client]
+            sub = queue.pending.popleft()
+            if queue.pending:
+                heapq.heappush(
+                    self._heap, (queue.pending[0].finish_tag, next(self._seq), client)
+                )
+            if not sub.future.done():  # Skip work for abandoned requests
+                self._virtual_time = max(self._virtual_time, sub.start_tag)
+                return client, sub
+
+    def _purge_idle(self):
+        """Forget clients with nothing queued whose finish tag has been passed."""
+        for client in [
+            key
+            for key, queue in self._clients.items()
+            if not queue.pending and queue.last_finish <= self._virtual_time
+        ]:
+            del self._clients[client]
+
+    async def _work(self):
+        while True:
+            client, sub = await self._next()
+            timings = StageTimings()
+            started = time.perf_counter()
+            try:
+                results = await run_in_threadpool(
+                    sub.run_batch, sub.comments, sub.threshold, timings
+                )
+            except Exception as exc:
+                if not sub.future.done():
+                    sub.future.set_exception(exc)
+                continue
+            self._record(client, len(sub.comments))
+            if not sub.future.done():
+                sub.future.set_result((results, timings, started))
+
+    def _record(self, client: str, served: int):
+        self._served[client] = self._served.get(client, 0) + served
+        if len(self._served) > _MAX_TRACKED_CLIENTS:
+            smallest = min(self._served, key=self._served.get)
+            del self._served[smallest]
+
+    def stats(self, per_client: bool = False) -> dict:
+        """Queue depths and service shares; per-client detail is admin-only."""
+        total = sum(self._served.values()) or 1
+        out = {
+            "running": self.running,
+            "active_clients": len(self._clients),
+            "queued_comments": sum(q.queued_comments for q in self._clients.values()),
+            "virtual_time": round(self._virtual_time, 2),
+        }
+        if per_client:
+            keys = set(self._clients) | set(self._served)
+            out["clients"] = {
+                key: {
+                    "weight": self._weight(key),
+                    "queued_sub_batches": len(self._clients[key].pending)
+                    if key in self._clients
+                    else 0,
+                    "queued_comments": self._clients[key].queued_comments
+                    if key in self._clients
+                    else 0,
+                    "served_comments": self._served.get(key, 0),
+                    "share": round(self._served.get(key, 0) / total, 4),
+                }
+                for key in sorted(keys)
+            }
+        return out
@@ -0,0 +1,391 @@
+"""
+Sidecar module — Unix-domain-socket server with compact binary framing for
+services on the same host, skipping HTTP, middleware and JSON.
+
+Every frame is a little-endian uint32 byte length followed by the payload:
+
+    request   uint32 id | float32 threshold | uint32 n | n × uint32 text bytes | UTF-8 texts
+    response  uint32 id | uint8 0 | uint32 rows | uint32 cols | rows × cols float32 scores
+    error     uint32 id | uint8 1 | UTF-8 message
+
+Clients may pipeline: send several requests before reading, and match the
+responses, which can arrive out of order, by id. Columns follow CATEGORIES.
+
+    python -m app.sidecar serve --socket /run/toxguard.sock
+    python -m app.sidecar bench --workload comments.txt --sizes 1,10,100
+
+Set SIDECAR_SOCKET to also serve the socket from the HTTP app's process, so
+both front ends drive the same ToxicClassifier.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+import numpy as np
+
+from .config import get_settings
+from .memory import InflightBudget
+
+_LENGTH = struct.Struct("<I")
+_REQUEST = struct.Struct("<IfI")
+_RESPONSE = struct.Struct("<IBII")
+_ERROR = struct.Struct("<IB")
+
+
+class SidecarError(RuntimeError):
+    """The sidecar answered a request with an error frame."""
+
+
+# ── Framing ──────────────────────────────────────────────────────────
+def encode_request(request_id: int, texts: list[str], threshold: float = 0.5) -> bytes:
+    encoded = [text.encode("utf-8") for text in texts]
+    payload = b"".join(
+        [
+            _REQUEST.pack(request_id, threshold, len(encoded)),
+            np.array([len(e) for e in encoded], "<u4").tobytes(),
+            *encoded,
+        ]
+    )
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def decode_request(payload: bytes) -> tuple[int, list[str], float]:
+    """Raises ValueError on malformed payloads."""
+    if len(payload) < _REQUEST.size:
+        raise ValueError("Request frame is too short")
+    request_id, threshold, n = _REQUEST.unpack_from(payload)
+    offset = _REQUEST.size + 4 * n
+    if len(payload) < offset:
+        raise ValueError("Request frame is truncated")
+    lengths = np.frombuffer(payload, "<u4", n, _REQUEST.size)
+    if offset + int(lengths.sum()) != len(payload):
+        raise ValueError("Text lengths do not match the frame size")
+    texts = []
+    for length in lengths.tolist():
+        texts.append(payload[offset : offset + length].decode("utf-8"))
+        offset += length
+    return request_id, texts, threshold
+
+
+def encode_response(request_id: int, scores: np.ndarray) -> bytes:
+    rows, cols = scores.shape
+    payload = _RESPONSE.pack(request_id, 0, rows, cols) + scores.astype("<f4").tobytes()
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def encode_error(request_id: int, message: str) -> bytes:
+    payload = _ERROR.pack(request_id, 1) + message.encode("utf-8")
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def decode_response(payload: bytes) -> tuple[int, np.ndarray | SidecarError]:
+    request_id, status = _ERROR.unpack_from(payload)
+    if status:
+        return request_id, SidecarError(payload[_ERROR.size :].decode("utf-8"))
+    _, _, rows, cols = _RESPONSE.unpack_from(payload)
+    scores = np.frombuffer(payload, "<f4", rows * cols, _RESPONSE.size)
+    return request_id, scores.reshape(rows, cols)
+
+
+# ── Server ───────────────────────────────────────────────────────────
+class SidecarServer:
+    """Serve ToxicClassifier.score over a Unix socket."""
+
+    def __init__(self, engine, path: str, budget: InflightBudget | None = None):
+        self.engine = engine
+        self.path = path
+        self.budget = budget or InflightBudget(get_settings().MAX_INFLIGHT_COMMENTS)
+        self._server: asyncio.AbstractServer | None = None
+        self._bound: tuple[int, int] | None = None  # (st_dev, st_ino) of our socket
+        self.requests = 0
+        self.errors = 0
+
+    async def start(self, path: str | None = None):
+        """Raises RuntimeError if another live server already owns the path."""
+        self.path = path or self.path
+        if os.path.exists(self.path):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(self.path)
+                except OSError:
+                    os.unlink(self.path)  # Stale socket from an unclean shutdown
+                else:
+                    raise RuntimeError(f"Sidecar socket {self.path} is already in use")
+        self._server = await asyncio.start_unix_server(self._serve, self.path)
+        os.chmod(self.path, 0o660)
+        info = os.stat(self.path)
+        self._bound = (info.st_dev, info.st_ino)
+        print(f"🔌 Sidecar listening on {self.path}")
+
+    async def stop(self):
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+        # Leave the path alone if another server has since bound it
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if (info.st_dev, info.st_ino) == self._bound:
+            os.unlink(self.path)
+        self._bound = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        settings = get_settings()
+        slots = asyncio.Semaphore(settings.SIDECAR_MAX_INFLIGHT)
+        tasks: set[asyncio.Task] = set()
+        try:
+            while True:
+                (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                if length > settings.SIDECAR_MAX_FRAME_BYTES:
+                    writer.write(encode_error(0, "Frame exceeds SIDECAR_MAX_FRAME_BYTES"))
+                    await writer.drain()
+                    break  # The stream cannot be resynchronized
+                payload = await reader.readexactly(length)
+                await slots.acquire()
+                task = asyncio.create_task(self._answer(payload, writer))
+                task.add_done_callback(lambda _: slots.release())
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Client went away
+        finally:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def _answer(self, payload: bytes, writer: asyncio.StreamWriter):
+        settings = get_settings()
+        self.requests += 1
+        request_id = _LENGTH.unpack_from(payload)[0] if len(payload) >= 4 else 0
+        try:
+            request_id, texts, threshold = decode_request(payload)
+            if not 1 <= len(texts) <= settings.MAX_COMMENTS_PER_REQUEST:
+                raise ValueError(
+                    f"Send 1 to {settings.MAX_COMMENTS_PER_REQUEST} texts per request"
+                )
+            if not 0.0 <= threshold <= 1.0:  # Also false for NaN
+                raise ValueError("Threshold must be between 0 and 1")
+            texts = [text[: settings.MAX_COMMENT_LENGTH] for text in texts]
+            async with self.budget.hold(len(texts)):
+                scores = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: self.engine.score(texts, threshold)
+                )
+            frame = encode_response(request_id, scores)
+        except Exception as exc:
+            self.errors += 1
+            frame = encode_error(request_id, f"{type(exc).__name__}: {exc}")
+        try:
+            writer.write(frame)
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "socket": self.path,
+            "running": self._server is not None,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+
+# ── Client ───────────────────────────────────────────────────────────
+class SidecarClient:
+    """Blocking client; one connection, safe for use from one thread at a time."""
+
+    def __init__(self, path: str, timeout: float | None = 30.0):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(path)
+        self._next_id = 1
+
+    def close(self):
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def score(self, texts: list[str], threshold: float = 0.5) -> np.ndarray:
+        """(n, categories) float32 scores for one batch."""
+        return self.score_many([texts], threshold)[0]
+
+    def score_many(
+        self, batches: list[list[str]], threshold: float = 0.5, window: int = 8
+    ) -> list[np.ndarray]:
+        """
+        Pipeline the batches with at most `window` unanswered at a time, so
+        neither side can block on a full socket buffer, and return the
+        scores in batch order. A response that matches no unanswered
+        request, such as the server's error for an unreadable frame,
+        raises SidecarError; the connection is unusable after that.
+        """
+        ids = list(range(self._next_id, self._next_id + len(batches)))
+        self._next_id += len(batches)
+        answers, sent = {}, 0
+        while len(answers) < len(ids):
+            ahead = min(len(ids), len(answers) + window)
+            if sent < ahead:
+                self._sock.sendall(
+                    b"".join(
+                        encode_request(i, batch, threshold)
+                        for i, batch in zip(ids[sent:ahead], batches[sent:ahead])
+                    )
+                )
+                sent = ahead
+            request_id, result = decode_response(self._read_frame())
+            if not ids[0] <= request_id < ids[0] + sent or request_id in answers:
+                if isinstance(result, SidecarError):
+                    raise result
+                raise SidecarError(f"Response for unknown request id {request_id}")
+            answers[request_id] = result
+        for result in answers.values():
+            if isinstance(result, SidecarError):
+                raise result
+        return [answers[i] for i in ids]
+
+    def _read_frame(self) -> bytes:
+        (length,) = _LENGTH.unpack(self._read_exactly(_LENGTH.size))
+        return self._read_exactly(length)
+
+    def _read_exactly(self, size: int) -> bytes:
+        buffer = bytearray()
+        while len(buffer) < size:
+            chunk = self._sock.recv(size - len(buffer))
+            if not chunk:
+                raise ConnectionError("Sidecar closed the connection")
+            buffer += chunk
+        return bytes(buffer)
+
+
+# ── Benchmark ────────────────────────────────────────────────────────
+def _percentiles(samples: list[float]) -> dict:
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(samples, 99)) * 1000, 3),
+    }
+
+
+def bench(path: str, http, corpus: list[str], size: int, repeats: int) -> dict:
+    """Latency of one batch over the socket and over POST /predict."""
+    batch = [corpus[i % len(corpus)] for i in range(size)]
+    socket_times, http_times = [], []
+    with SidecarClient(path) as client:
+        client.score(batch)
+        for _ in range(repeats):
+            started = time.perf_counter()
+            client.score(batch)
+            socket_times.append(time.perf_counter() - started)
+    http.post("/predict", json={"comments": batch}).raise_for_status()
+    for _ in range(repeats):
+        started = time.perf_counter()
+        http.post("/predict", json={"comments": batch}).raise_for_status()
+        http_times.append(time.perf_counter() - started)
+    return {
+        "batch": size,
+        "sidecar": _percentiles(socket_times),
+        "http": _percentiles(http_times),
+    }
+
+
+def _serve_in_thread(engine, path: str):
+    """Run a SidecarServer on a background event loop; returns its stop function."""
+    ready, done = threading.Event(), threading.Event()
+
+    async def run():
+        server = SidecarServer(engine, path)
+        await server.start()
+        ready.set()
+        while not done.is_set():
+            await asyncio.sleep(0.05)
+        await server.stop()
+
+    thread = threading.Thread(target=lambda: asyncio.run(run()), daemon=True)
+    thread.start()
+    ready.wait(30)
+
+    def stop():
+        done.set()
+        thread.join()
+
+    return stop
+
+
+def main(argv: list[str] | None = None):
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Unix-socket sidecar for ToxicClassifier.")
+    parser.add_argument("mode", choices=["serve", "bench"])
+    parser.add_argument(
+        "--socket",
+        default=settings.SIDECAR_SOCKET or str(Path(tempfile.gettempdir()) / "toxguard.sock"),
+    )
+    parser.add_argument("--workload", help="bench: one comment per line")
+    parser.add_argument("--sizes", default="1,10,100", help="bench: batch sizes")
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument(
+        "--url",
+        help="bench: running HTTP server to compare against "
+        "(default: the app in-process, without the TCP hop)",
+    )
+    args = parser.parse_args(argv)
+
+    from .classifier import classifier
+
+    if args.mode == "serve":
+        classifier.load()
+        server = SidecarServer(classifier, args.socket)
+
+        async def serve():
+            await server.start()
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await server.stop()
+
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            print("👋 Shutting down sidecar.")
+        return
+
+    import httpx
+
+    from .middleware import limiter
+
+    with open(args.workload, encoding="utf-8") as handle:
+        corpus = [line.strip() for line in handle if line.strip()]
+    with ExitStack() as stack:
+        if args.url:
+            http = stack.enter_context(httpx.Client(base_url=args.url, timeout=60))
+        else:
+            from fastapi.testclient import TestClient
+
+            from .main import app
+
+            limiter.enabled = False
+            # Entering the client runs the lifespan, which loads the model
+            http = stack.enter_context(TestClient(app))
+        if not classifier.is_loaded:
+            classifier.load()
+        if not os.path.exists(args.socket):
+            # No sidecar running there; serve one from this process
+            stack.callback(_serve_in_thread(classifier, args.socket))
+        for size in (int(s) for s in args.sizes.split(",")):
+            print(json.dumps(bench(args.socket, http, corpus, size, args.repeats)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Tokens module — vocabulary export and pre-tokenized request payloads.
+
+Bulk pipelines fetch GET /vocab once, tokenize on their own workers with
+VocabularyTokenizer (an exact replica of the server tokenizer), and send
+token ids to POST /predict/tokens together with the export's
+`vocab_version`. The server rejects ids built from any other vocabulary.
+
+Packed binary payload (little-endian, Content-Type application/octet-stream):
+    uint32 n | n × uint32 sequence lengths | sum(lengths) × int32 token ids
+The JSON form carries the same ids as base64 int32 plus a `lengths` list.
+"""
+
+import base64
+import hashlib
+import json
+import struct
+
+import numpy as np
+
+# Tokenizer attributes that change which ids a text maps to
+_VOCAB_CONFIG = ("num_words", "filters", "lower", "split", "char_level", "oov_token")
+
+
+class VocabularyMismatchError(ValueError):
+    """Token ids were produced with a different vocabulary than the one serving."""
+
+
+# ── Vocabulary ────────────────────────────────────────────────────────
+def _effective_word_index(tokenizer) -> dict[str, int]:
+    """Entries texts_to_sequences can emit; ids ≥ num_words are dropped there."""
+    limit = tokenizer.num_words
+    return {
+        word: index
+        for word, index in tokenizer.word_index.items()
+        if not limit or index < limit or word == tokenizer.oov_token
+    }
+
+
+def vocabulary_fingerprint(tokenizer) -> str:
+    """Short hash of everything that determines the text → ids mapping."""
+    payload = {key: getattr(tokenizer, key, None) for key in _VOCAB_CONFIG}
+    payload["word_index"] = _effective_word_index(tokenizer)
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def export_vocabulary(tokenizer, vocab_version: str) -> dict:
+    """JSON-serializable vocabulary for client-side tokenization."""
+    return {
+        "vocab_version": vocab_version,
+        **{key: getattr(tokenizer, key, None) for key in _VOCAB_CONFIG},
+        "word_index": _effective_word_index(tokenizer),
+    }
+
+
+def vocab_size(tokenizer) -> int:
+    """Exclusive upper bound on the ids texts_to_sequences can emit."""
+    return tokenizer.num_words or len(tokenizer.word_index) + 1
+
+
+class VocabularyTokenizer:
+    """Reproduces Keras `Tokenizer.texts_to_sequences` from a GET /vocab export."""
+
+    def __init__(self, export: dict):
+        self.vocab_version = export["vocab_version"]
+        self.word_index = export["word_index"]
+        self.num_words = export["num_words"]
+        self.lower = export["lower"]
+        self.split = export["split"]
+        self.char_level = export["char_level"]
+        oov_token = export["oov_token"]
+        self.oov_index = self.word_index.get(oov_token) if oov_token else None
+        self._table = str.maketrans({c: export["split"] for c in export["filters"]})
+
+    def _words(self, text: str) -> list[str]:
+        if self.lower:
+            text = text.lower()
+        if self.char_level:
+            return list(text)
+        return [w for w in text.translate(self._table).split(self.split) if w]
+
+    def texts_to_sequences(self, texts: list[str]) -> list[list[int]]:
+        sequences = []
+        for text in texts:
+            seq = []
+            for word in self._words(text):
+                index = self.word_index.get(word)
+                if index is not None and self.num_words and index >= self.num_words:
+                    index = None
+                if index is None:
+                    index = self.oov_index
+                if index is not None:
+                    seq.append(index)
+            sequences.append(seq)
+        return sequences
+
+
+# ── Payloads ──────────────────────────────────────────────────────────
+def _split(ids: np.ndarray, lengths: list[int]) -> list[list[int]]:
+    if sum(lengths) != len(ids):
+        raise ValueError(f"Lengths sum to {sum(lengths)} but {len(ids)} ids were sent")
+    ends = np.cumsum(lengths)
+    return [ids[end - n : end].tolist() for n, end in zip(lengths, ends)]
+
+
+def pack_sequences(sequences: list[list[int]]) -> bytes:
+    """Encode sequences in the packed binary layout."""
+    lengths = np.array([len(s) for s in sequences], "<u4")
+    ids = np.fromiter((t for s in sequences for t in s), "<i4", int(lengths.sum()))
+    return struct.pack("<I", len(sequences)) + lengths.tobytes() + ids.tobytes()
+
+
+def unpack_sequences(payload: bytes) -> list[list[int]]:
+    """Decode the packed binary layout; ValueError if it is malformed."""
+    if len(payload) < 4:
+        raise ValueError("Payload too short")
+    (n,) = struct.unpack_from("<I", payload)
+    header = 4 + 4 * n
+    if len(payload) < header or (len(payload) - header) % 4:
+        raise ValueError("Payload size does not match its header")
+    lengths = np.frombuffer(payload, "<u4", n, 4).tolist()
+    return _split(np.frombuffer(payload, "<i4", offset=header), lengths)
+
+
+def encode_ids(sequences: list[list[int]]) -> tuple[str, list[int]]:
+    """Base64 int32 ids plus lengths, for the JSON request form."""
+    ids = np.fromiter((t for s in sequences for t in s), "<i4")
+    return base64.b64encode(ids.tobytes()).decode("ascii"), [len(s) for s in sequences]
+
+
+def decode_ids(ids: str, lengths: list[int]) -> list[list[int]]:
+    """Inverse of encode_ids; ValueError if the payload is malformed."""
+    raw = base64.b64decode(ids, validate=True)
+    if len(raw) % 4:
+        raise ValueError("Token payload is not a whole number of int32 values")
+    return _split(np.frombuffer(raw, "<i4"), lengths)
@@ -0,0 +1,253 @@
+"""
+Tuning module — CPU runtime settings and the throughput/latency autotuner.
+
+At startup the server applies TF thread-pool sizes and, optionally, pins
+each worker process to its own slice of CPUs. The autotuner sweeps those
+settings over a representative workload through ToxicClassifier and writes
+the best profile that meets a p99 latency SLO:
+
+    python -m app.tuning --workload comments.txt --slo-ms 250
+
+The profile is written to tuning.env, which Settings loads after .env.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .config import TUNING_PROFILE_PATH, get_settings
+
+# Lock files held for the life of a worker so each claims a distinct CPU slice.
+_held_slots: list[int] = []
+
+
+# ── Runtime ───────────────────────────────────────────────────────────
+def configure_threads():
+    """
+    Apply TF thread-pool sizes; must run before TF executes its first op.
+    With several model replicas and no explicit sizes, each replica gets
+    REPLICA_THREADS intra-op threads and its own inter-op slot.
+    """
+    import tensorflow as tf
+
+    settings = get_settings()
+    intra, inter = settings.TF_INTRA_OP_THREADS, settings.TF_INTER_OP_THREADS
+    if settings.MODEL_REPLICAS > 1 and settings.REPLICA_THREADS:
+        intra = intra or settings.REPLICA_THREADS
+        inter = inter or settings.MODEL_REPLICAS
+    try:
+        if intra:
+            tf.config.threading.set_intra_op_parallelism_threads(intra)
+        if inter:
+            tf.config.threading.set_inter_op_parallelism_threads(inter)
+    except RuntimeError:
+        # TF is already initialized (e.g. a second load in the same process)
+        pass
+
+
+def pin_worker_cpus(cpus_per_worker: int) -> list[int] | None:
+    """
+    Pin this process to the first free slice of `cpus_per_worker` CPUs.
+    Slices are claimed with non-blocking file locks, so every uvicorn worker
+    on the host gets a different one; locks vanish when a worker exits.
+    """
+    if cpus_per_worker <= 0:
+        return None
+    if not hasattr(os, "sched_setaffinity"):
+        print("⚠️ CPU pinning is only supported on Linux; skipping")
+        return None
+    import fcntl
+
+    available = sorted(os.sched_getaffinity(0))
+    for slot in range(len(available) // cpus_per_worker):
+        path = Path(tempfile.gettempdir()) / f"toxguard-cpu-slot-{slot}.lock"
+        fd = os.open(path, os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue
+        _held_slots.append(fd)
+        cpus = available[slot * cpus_per_worker : (slot + 1) * cpus_per_worker]
+        os.sched_setaffinity(0, cpus)
+        print(f"📌 Worker {os.getpid()} pinned to CPUs {cpus}")
+        return cpus
+    print("⚠️ No free CPU slice left for this worker; running unpinned")
+    return None
+
+
+# ── Benchmark Worker ──────────────────────────────────────────────────
+def _run_worker(args):
+    """Child process: load, signal ready, wait for go, then hammer predict()."""
+    from .classifier import ToxicClassifier
+
+    pin_worker_cpus(get_settings().CPUS_PER_WORKER)
+    engine = ToxicClassifier()
+    engine.load()
+    texts = _read_workload(args.workload)
+    requests = [
+        texts[i : i + args.request_size]
+        for i in range(0, len(texts), args.request_size)
+    ]
+    print("ready", flush=True)
+    sys.stdin.readline()
+
+    latencies, comments = [], 0
+    deadline = time.perf_counter() + args.duration
+    for batch in itertools.cycle(requests):
+        if time.perf_counter() >= deadline:
+            break
+        started = time.perf_counter()
+        engine.predict(batch, 0.5)
+        latencies.append(time.perf_counter() - started)
+        comments += len(batch)
+    print(json.dumps({"latencies": latencies, "comments": comments}), flush=True)
+
+
+def _read_workload(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as handle:
+        return [line.rstrip("\n") for line in handle if line.strip()]
+
+
+def measure(config: dict, args) -> dict:
+    """Run `workers` benchmark processes concurrently under one config."""
+    env = {
+        **os.environ,
+        "TF_INTRA_OP_THREADS": str(config["TF_INTRA_OP_THREADS"]),
+        "TF_INTER_OP_THREADS": str(config["TF_INTER_OP_THREADS"]),
+        "INFERENCE_BATCH_SIZE": str(config["INFERENCE_BATCH_SIZE"]),
+        "CPUS_PER_WORKER": str(config["CPUS_PER_WORKER"]),
+        "SCORE_CACHE_ENABLED": "false",
+        "TF_CPP_MIN_LOG_LEVEL": "2",
+    }
+    cmd = [
+        sys.executable, "-m", "app.tuning", "_worker",
+        "--workload", args.workload,
+        "--request-size", str(args.request_size),
+        "--duration", str(args.duration),
+    ]
+    server_dir = Path(__file__).parent.parent
+    procs = [
+        subprocess.Popen(
+            cmd, cwd=server_dir, env=env, text=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+        for _ in range(config["WORKERS"])
+    ]
+    try:
+        for proc in procs:
+            while proc.stdout.readline().strip() != "ready":
+                if proc.poll() is not None:
+                    raise RuntimeError(f"Benchmark worker exited with {proc.returncode}")
+        for proc in procs:
+            proc.stdin.write("go\n")
+            proc.stdin.flush()
+        reports = [json.loads(proc.stdout.readlines()[-1]) for proc in procs]
+    finally:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+
+    latencies = np.array([lat for r in reports for lat in r["latencies"]])
+    return {
+        **config,
+        "throughput": round(sum(r["comments"] for r in reports) / args.duration, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2),
+    }
+
+
+def candidates(args) -> list[dict]:
+    """Every swept config that does not oversubscribe the available CPUs."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    configs = []
+    for intra, inter, workers, batch in itertools.product(
+        args.intra, args.inter, args.workers, args.batch_sizes
+    ):
+        if workers * intra > cpus:
+            continue
+        configs.append(
+            {
+                "TF_INTRA_OP_THREADS": intra,
+                "TF_INTER_OP_THREADS": inter,
+                "WORKERS": workers,
+                "INFERENCE_BATCH_SIZE": batch,
+                "CPUS_PER_WORKER": intra if args.pin else 0,
+            }
+        )
+    return configs
+
+
+def recommend(results: list[dict], slo_ms: float) -> tuple[dict, bool]:
+    """Highest throughput within the SLO, else the lowest p99 overall."""
+    within = [r for r in results if r["p99_ms"] <= slo_ms]
+    if within:
+        return max(within, key=lambda r: r["throughput"]), True
+    return min(results, key=lambda r: r["p99_ms"]), False
+
+
+def write_profile(path: str, best: dict, slo_ms: float, met: bool):
+    keys = [
+        "TF_INTRA_OP_THREADS",
+        "TF_INTER_OP_THREADS",
+        "WORKERS",
+        "INFERENCE_BATCH_SIZE",
+        "CPUS_PER_WORKER",
+    ]
+    with open(path, "w") as handle:
+        handle.write(
+            f"# Generated by `python -m app.tuning` on {time.strftime('%Y-%m-%d %H:%M')}\n"
+            f"# Target p99 ≤ {slo_ms:g} ms ({'met' if met else 'NOT met'}): "
+            f"{best['throughput']} comments/s, p99 {best['p99_ms']} ms\n"
+        )
+        handle.writelines(f"{key}={best[key]}\n" for key in keys)
+
+
+# ── CLI ───────────────────────────────────────────────────────────────
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Sweep CPU runtime settings against a latency SLO.")
+    parser.add_argument("mode", nargs="?", default="sweep", choices=["sweep", "_worker"])
+    parser.add_argument("--workload", required=True, help="One comment per line")
+    parser.add_argument("--slo-ms", type=float, default=250.0, help="Target p99 per request")
+    parser.add_argument("--request-size", type=int, default=50, help="Comments per request")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per config")
+    parser.add_argument("--intra", type=_int_list, default=[1, 2, 4, 8])
+    parser.add_argument("--inter", type=_int_list, default=[1, 2])
+    parser.add_argument("--workers", type=_int_list, default=[1, 2, 4])
+    parser.add_argument("--batch-sizes", type=_int_list, default=[16, 32, 64, 128])
+    parser.add_argument("--pin", action="store_true", help="Pin each worker to its own CPUs")
+    parser.add_argument("--out", default=TUNING_PROFILE_PATH)
+    args = parser.parse_args(argv)
+
+    if args.mode == "_worker":
+        return _run_worker(args)
+
+    configs = candidates(args)
+    print(f"🔄 Sweeping {len(configs)} configurations, {args.duration:g}s each...")
+    results = []
+    for config in configs:
+        result = measure(config, args)
+        results.append(result)
+        print(json.dumps(result))
+
+    best, met = recommend(results, args.slo_ms)
+    write_profile(args.out, best, args.slo_ms, met)
+    icon = "✅" if met else "⚠️"
+    print(f"{icon} Recommended profile → {args.out}: {json.dumps(best)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ from fastapi.testclient import TestClient
 from app.classifier import classifier
 from app.config import get_settings
 from app.main import app
+from app.middleware import limiter
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -20,6 +21,13 @@ def load_model():
     # No teardown needed
 
 
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Give every test a fresh rate-limit budget."""
+    limiter.reset()
+    yield
+
+
 @pytest.fixture
 def client():
     """Create a FastAPI test client."""
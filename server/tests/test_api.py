@@ -3,6 +3,8 @@ Comprehensive API endpoint tests for the ToxGuard server.
 Run with: cd server && python -m pytest tests/ -v
 """
 
+import json
+
 import pytest
 
 
@@ -24,6 +26,10 @@ class TestHealthEndpoint:
         assert "model_loaded" in data
         assert isinstance(data["model_loaded"], bool)
 
+    def test_health_reports_model_version(self, client):
+        data = client.get("/health").json()
+        assert isinstance(data["model_version"], str)
+
     def test_health_no_auth_required(self, client):
         """Health endpoint should work without API key."""
         response = client.get("/health")
@@ -394,3 +400,62 @@ class TestEdgeCases:
         result = response.json()["results"][0]
         assert result["flagged_categories"] == 0
         assert result["severity"] == "safe"
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Stage Timings
+# ═══════════════════════════════════════════════════════════════════════
+class TestServerTiming:
+
+    def test_server_timing_header_on_predict(self, client):
+        response = client.post("/predict", json={"comments": ["Test comment"]})
+        header = response.headers.get("Server-Timing")
+        assert header is not None
+        stages = {part.split(";")[0].strip() for part in header.split(",")}
+        assert {"queue", "tokenize", "pad", "infer", "postprocess", "serialize"} <= stages
+
+    def test_server_timing_can_be_disabled(self, client, settings, monkeypatch):
+        monkeypatch.setattr(settings, "SERVER_TIMING_HEADER", False)
+        response = client.post("/predict", json={"comments": ["Test comment"]})
+        assert "Server-Timing" not in response.headers
+
+    def test_timing_log_carries_request_id(self, client, settings, monkeypatch, capsys):
+        monkeypatch.setattr(settings, "TIMING_LOG", True)
+        response = client.post("/predict", json={"comments": ["Test comment"]})
+        line = [l for l in capsys.readouterr().out.splitlines() if '"predict"' in l][-1]
+        record = json.loads(line)
+        assert record["request_id"] == response.headers["X-Request-ID"]
+        assert record["comments"] == 1
+        assert "infer" in record["stages_ms"]
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Metrics Endpoint
+# ═══════════════════════════════════════════════════════════════════════
+class TestMetricsEndpoint:
+
+    def test_metrics_returns_200(self, client):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+
+    def test_metrics_reports_model_version(self, client):
+        data = client.get("/metrics").json()
+        assert isinstance(data["model_version"], str)
+        assert "score_cache" in data
+
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Admin Endpoints
+# ═══════════════════════════════════════════════════════════════════════
+class TestAdminReload:
+
+    def test_reload_requires_token(self, client):
+        response = client.post("/admin/reload")
+        assert response.status_code == 403
+
+    def test_reload_with_token(self, client, settings, monkeypatch):
+        monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+        response = client.post("/admin/reload", headers={"X-Admin-Token": "s3cret"})
+        assert response.status_code == 200
+        assert response.json()["status"] == "unchanged"
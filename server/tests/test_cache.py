@@ -0,0 +1,111 @@
+"""
+Unit tests for the persistent score cache.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.cache import ScoreCache
+from app.classifier import classifier
+
+
+@pytest.fixture
+def cache(tmp_path):
+    store = ScoreCache(str(tmp_path / "scores.db"), max_entries=3)
+    yield store
+    store.close()
+
+
+def _rows(n):
+    return np.arange(n * 6, dtype=np.float32).reshape(n, 6) / 100
+
+
+class TestScoreCache:
+    """Tests for ScoreCache lookups, eviction and metrics."""
+
+    def test_roundtrip(self, cache):
+        cache.put_many("v1", ["a", "b"], _rows(2))
+        hits = cache.get_many("v1", ["b", "missing", "a"])
+        assert set(hits) == {0, 2}
+        np.testing.assert_array_equal(hits[2], _rows(2)[0])
+        np.testing.assert_array_equal(hits[0], _rows(2)[1])
+
+    def test_namespace_isolation(self, cache):
+        """Entries from another model fingerprint must never be served."""
+        cache.put_many("v1", ["a"], _rows(1))
+        assert cache.get_many("v2", ["a"]) == {}
+
+    def test_eviction_keeps_max_entries(self, cache):
+        cache.put_many("v1", ["a", "b", "c", "d", "e"], _rows(5))
+        assert len(cache) == 3
+        assert cache.stats()["evictions"] == 2
+
+    def test_counts_rows_only_when_possibly_full(self, tmp_path):
+        store = ScoreCache(str(tmp_path / "scores.db"), max_entries=100)
+        counts = []
+        store._conn.set_trace_callback(
+            lambda sql: counts.append(sql) if "COUNT(*)" in sql else None
+        )
+        for i in range(100):
+            store.put_many("v1", [f"t{i}"], _rows(1))
+        assert counts == []
+
+        store.put_many("v1", ["one more"], _rows(1))
+        assert len(counts) == 1
+        store._conn.set_trace_callback(None)
+        assert len(store) == 90
+        assert store.stats()["evictions"] == 11
+        store.close()
+
+    def test_hit_rate(self, cache):
+        cache.put_many("v1", ["a"], _rows(1))
+        cache.get_many("v1", ["a", "b"])
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_counts_exact_under_concurrent_lookups(self, cache):
+        cache.put_many("v1", ["a"], _rows(1))
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda _: cache.get_many("v1", ["a", "b"]), range(200)))
+        stats = cache.stats()
+        assert stats["hits"] == 200
+        assert stats["misses"] == 200
+
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "scores.db")
+        first = ScoreCache(path, max_entries=10)
+        first.put_many("v1", ["a"], _rows(1))
+        first.close()
+
+        second = ScoreCache(path, max_entries=10)
+        assert 0 in second.get_many("v1", ["a"])
+        second.close()
+
+    def test_wal_mode(self, cache):
+        conn = sqlite3.connect(cache.path)
+        (mode,) = conn.execute("PRAGMA journal_mode").fetchone()
+        conn.close()
+        assert mode == "wal"
+
+
+class TestClassifierCache:
+    """Tests for the cache-aware ToxicClassifier.score() path."""
+
+    def test_cached_scores_match_model(self, tmp_path):
+        store = ScoreCache(str(tmp_path / "scores.db"), max_entries=100)
+        original = classifier.cache
+        classifier.cache = store
+        try:
+            first = classifier.score(["Hello there", "You idiot"])
+            second = classifier.score(["Hello there", "You idiot"])
+        finally:
+            classifier.cache = original
+            store.close()
+        np.testing.assert_array_equal(first, second)
+        assert store.hits == 2
@@ -3,9 +3,17 @@ Unit tests for the ToxicClassifier class.
 Run with: cd server && python -m pytest tests/ -v
 """
 
+import pickle
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pytest
 
-from app.classifier import ToxicClassifier, classifier
+from app.classifier import StageTimings, ToxicClassifier, classifier, plan_windows
+from app.folding import FoldedModel
+from app.prefilter import LexicalPrefilter
 
 
 class TestClassifierLoading:
@@ -116,3 +124,227 @@ class TestClassifierUnloaded:
         assert fresh.is_loaded is False
         with pytest.raises(RuntimeError, match="Model not loaded"):
             fresh.predict(["test"], threshold=0.5)
+
+
+@pytest.fixture
+def staged_classifier(settings, tmp_path, monkeypatch):
+    """A separate classifier serving copies of the artifacts from tmp_path."""
+    model_path = tmp_path / "tox_model.h5"
+    tokenizer_path = tmp_path / "tokenizer.pickle"
+    shutil.copy(settings.MODEL_PATH, model_path)
+    shutil.copy(settings.TOKENIZER_PATH, tokenizer_path)
+    monkeypatch.setattr(settings, "MODEL_PATH", str(model_path))
+    monkeypatch.setattr(settings, "TOKENIZER_PATH", str(tokenizer_path))
+    staged = ToxicClassifier()
+    staged.load()
+    yield staged
+    staged.stop_watcher()
+
+
+def _republish_tokenizer(staged):
+    """Write a functionally identical tokenizer with different bytes."""
+    tokenizer = staged.tokenizer
+    tokenizer.republished_at = time.time()
+    with open(staged.settings.TOKENIZER_PATH, "wb") as handle:
+        pickle.dump(tokenizer, handle)
+
+
+class TestHotReload:
+    """Tests for zero-downtime artifact swaps."""
+
+    def test_fingerprint_set_after_load(self):
+        assert isinstance(classifier.fingerprint, str)
+        assert len(classifier.fingerprint) == 16
+
+    def test_reload_unchanged(self, staged_classifier):
+        status = staged_classifier.reload()
+        assert status["status"] == "unchanged"
+
+    def test_unchanged_reload_skips_loading(self, staged_classifier, monkeypatch):
+        def fail(*args):
+            raise AssertionError("Loaded unchanged artifacts")
+
+        monkeypatch.setattr(staged_classifier, "_load_bundle", fail)
+        assert staged_classifier.reload()["status"] == "unchanged"
+
+    def test_loads_the_bytes_it_hashed(self, staged_classifier, monkeypatch):
+        old = staged_classifier.fingerprint
+        _republish_tokenizer(staged_classifier)
+        read = staged_classifier._read_artifacts
+
+        def read_then_break():
+            artifacts = read()
+            # Replaced on disk after hashing; the hashed copy must still load
+            with open(staged_classifier.settings.MODEL_PATH, "wb") as handle:
+                handle.write(b"not a model")
+            return artifacts
+
+        monkeypatch.setattr(staged_classifier, "_read_artifacts", read_then_break)
+        status = staged_classifier.reload()
+        assert status["status"] == "swapped"
+        assert staged_classifier.fingerprint != old
+
+    def test_unchanged_reload_rebuilds_prefilter(
+        self, staged_classifier, settings, tmp_path, monkeypatch
+    ):
+        path = str(tmp_path / "prefilter.npz")
+        k = len(settings.CATEGORIES)
+        LexicalPrefilter(
+            np.zeros((16, k)), np.zeros(k), staged_classifier.fingerprint
+        ).save(path)
+        monkeypatch.setattr(settings, "PREFILTER_PATH", path)
+        assert staged_classifier._bundle.prefilter is None
+
+        monkeypatch.setattr(settings, "PREFILTER_ENABLED", True)
+        assert staged_classifier.reload()["status"] == "unchanged"
+        assert staged_classifier._bundle.prefilter is not None
+
+        monkeypatch.setattr(settings, "PREFILTER_ENABLED", False)
+        staged_classifier.reload()
+        assert staged_classifier._bundle.prefilter is None
+
+    def test_unchanged_reload_picks_up_new_fold(
+        self, staged_classifier, settings, tmp_path, monkeypatch
+    ):
+        path = str(tmp_path / "folded.npz")
+        monkeypatch.setattr(settings, "FOLDED_MODEL_ENABLED", True)
+        monkeypatch.setattr(settings, "FOLDED_MODEL_PATH", path)
+        assert staged_classifier._bundle.folded is None
+
+        FoldedModel.fold(staged_classifier.model, staged_classifier.fingerprint).save(path)
+        assert staged_classifier.reload()["status"] == "unchanged"
+        assert staged_classifier._bundle.folded is not None
+
+        monkeypatch.setattr(settings, "FOLDED_MODEL_ENABLED", False)
+        staged_classifier.reload()
+        assert staged_classifier._bundle.folded is None
+
+    def test_watcher_picks_up_new_fold(
+        self, staged_classifier, settings, tmp_path, monkeypatch
+    ):
+        path = str(tmp_path / "folded.npz")
+        monkeypatch.setattr(settings, "FOLDED_MODEL_ENABLED", True)
+        monkeypatch.setattr(settings, "FOLDED_MODEL_PATH", path)
+        staged_classifier.start_watcher(0.05)
+        FoldedModel.fold(staged_classifier.model, staged_classifier.fingerprint).save(path)
+        deadline = time.time() + 10
+        while staged_classifier._bundle.folded is None and time.time() < deadline:
+            time.sleep(0.05)
+        assert staged_classifier._bundle.folded is not None
+
+    def test_reload_swaps_new_version(self, staged_classifier):
+        old = staged_classifier.fingerprint
+        _republish_tokenizer(staged_classifier)
+        status = staged_classifier.reload()
+        assert status["status"] == "swapped"
+        assert status["previous_version"] == old
+        assert staged_classifier.fingerprint != old
+        assert len(staged_classifier.predict(["hello"])) == 1
+
+    def test_reload_rolls_back_on_bad_artifact(self, staged_classifier):
+        old = staged_classifier.fingerprint
+        with open(staged_classifier.settings.MODEL_PATH, "wb") as handle:
+            handle.write(b"not a model")
+        status = staged_classifier.reload()
+        assert status["status"] == "rolled_back"
+        assert staged_classifier.fingerprint == old
+        assert len(staged_classifier.predict(["still serving"])) == 1
+
+    def test_watcher_picks_up_change(self, staged_classifier):
+        old = staged_classifier.fingerprint
+        staged_classifier.start_watcher(0.05)
+        _republish_tokenizer(staged_classifier)
+        deadline = time.time() + 10
+        while staged_classifier.fingerprint == old and time.time() < deadline:
+            time.sleep(0.05)
+        assert staged_classifier.fingerprint != old
+
+
+class TestStageCounts:
+
+    def test_exact_under_concurrent_calls(self, monkeypatch):
+        monkeypatch.setattr(classifier, "cache", None)
+        monkeypatch.setattr(
+            classifier, "stage_counts", dict.fromkeys(classifier.stage_counts, 0)
+        )
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda i: classifier.score([f"text {i}"] * 5), range(40)))
+        assert classifier.metrics()["stages"]["model_rows"] == 200
+
+
+class TestLongCommentMode:
+    """Tests for sliding-window scoring of comments beyond MAX_SEQUENCE_LENGTH."""
+
+    LONG = "you stupid idiot moron " + "lovely sunny weather today " * 60
+
+    @pytest.fixture(autouse=True)
+    def windowed(self, settings, monkeypatch):
+        monkeypatch.setattr(settings, "MAX_COMMENT_LENGTH", 5000)
+        monkeypatch.setattr(settings, "LONG_COMMENT_MODE", True)
+        monkeypatch.setattr(classifier, "cache", None)
+        monkeypatch.setattr(
+            classifier, "stage_counts", dict.fromkeys(classifier.stage_counts, 0)
+        )
+
+    def test_short_comments_unchanged(self, settings, monkeypatch):
+        windowed = classifier.score(["hello world", "you idiot"])
+        monkeypatch.setattr(settings, "LONG_COMMENT_MODE", False)
+        plain = classifier.score(["hello world", "you idiot"])
+        np.testing.assert_allclose(windowed, plain, rtol=1e-5)
+        assert classifier.stage_counts["window_extra_rows"] == 0
+
+    def test_start_of_long_comment_is_seen(self, settings, monkeypatch):
+        windowed = classifier.score([self.LONG])
+        monkeypatch.setattr(settings, "LONG_COMMENT_MODE", False)
+        truncated = classifier.score([self.LONG])
+        assert windowed[0].max() >= truncated[0].max()
+        assert classifier.stage_counts["window_extra_rows"] > 0
+
+    def test_windows_from_all_comments_share_one_call(self):
+        before = classifier.stage_counts["model_rows"]
+        classifier.score([self.LONG, "hello", self.LONG])
+        extra = classifier.stage_counts["window_extra_rows"]
+        assert classifier.stage_counts["model_rows"] - before == 3 + extra
+
+    def test_extra_rows_bounded(self, settings, monkeypatch):
+        monkeypatch.setattr(settings, "MAX_WINDOW_ROWS", 0)
+        scores = classifier.score([self.LONG])
+        assert scores.shape == (1, len(settings.CATEGORIES))
+        assert classifier.stage_counts["window_extra_rows"] == 0
+        assert classifier.stage_counts["window_fallbacks"] == 1
+
+    def test_mean_reducer_not_above_max(self, settings, monkeypatch):
+        maxed = classifier.score([self.LONG])
+        monkeypatch.setattr(settings, "WINDOW_REDUCER", "mean")
+        meaned = classifier.score([self.LONG])
+        assert np.all(meaned <= maxed + 1e-6)
+
+    def test_plan_windows_in_order(self):
+        # 10 tokens in windows of 4 with stride 2 take 3 extra rows each
+        allowed, extra = plan_windows([10, 3, 10, 10], 4, 2, 7)
+        assert allowed == [True, True, True, False]
+        assert extra == 6
+
+    def test_split_batches_share_one_plan(self, settings, monkeypatch):
+        monkeypatch.setattr(settings, "MAX_WINDOW_ROWS", 3)
+        comments = [self.LONG] * 5
+        windows, extra = classifier.window_plan(comments)
+        assert 0 < extra <= 3
+        for i in range(5):
+            classifier.predict(comments[i : i + 1], windows=windows[i : i + 1])
+        assert classifier.stage_counts["window_extra_rows"] == extra
+        assert classifier.stage_counts["window_fallbacks"] == windows.count(False)
+
+
+class TestStageTimings:
+    """Tests for per-stage timing capture."""
+
+    def test_predict_records_stages(self):
+        timings = StageTimings()
+        classifier.predict(["Hello there"], threshold=0.5, timings=timings)
+        for stage in ("tokenize", "pad", "infer", "postprocess"):
+            assert timings[stage] >= 0.0
+
+    def test_header_format(self):
+        timings = StageTimings(infer=1.234, pad=0.5)
+        assert timings.header() == "infer;dur=1.23, pad;dur=0.50"
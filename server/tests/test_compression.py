@@ -0,0 +1,112 @@
+"""
+Tests for compressed request bodies and negotiated response compression.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import gzip
+import json
+
+import pytest
+
+from app.compression import decompress_bounded, negotiate
+
+
+def _gzip_json(payload: dict) -> bytes:
+    return gzip.compress(json.dumps(payload).encode())
+
+
+class TestCodecs:
+
+    def test_negotiate_prefers_supported(self):
+        assert negotiate("gzip, deflate") == "gzip"
+        assert negotiate("br;q=1.0, gzip;q=0.5") == "gzip"
+
+    def test_negotiate_respects_q_zero(self):
+        assert negotiate("gzip;q=0") is None
+        assert negotiate("") is None
+        assert negotiate("identity") is None
+
+    def test_decompress_bounded_roundtrip(self):
+        data = b"x" * 10_000
+        assert decompress_bounded("gzip", gzip.compress(data), 10_000) == data
+
+    def test_decompress_bounded_rejects_bomb(self):
+        bomb = gzip.compress(b"\0" * 5_000_000)
+        assert len(bomb) < 10_000
+        with pytest.raises(ValueError):
+            decompress_bounded("gzip", bomb, 1_000_000)
+
+
+class TestCompressedRequests:
+
+    def test_gzip_body_matches_plain(self, client):
+        payload = {"comments": ["You are an idiot", "Nice day"], "threshold": 0.5}
+        plain = client.post("/predict", json=payload)
+        compressed = client.post(
+            "/predict",
+            content=_gzip_json(payload),
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+        )
+        assert compressed.status_code == 200
+        assert compressed.json() == plain.json()
+
+    def test_oversized_body_rejected(self, client, settings, monkeypatch):
+        monkeypatch.setattr(settings, "MAX_DECOMPRESSED_BODY_BYTES", 1000)
+        response = client.post(
+            "/predict",
+            content=_gzip_json({"comments": ["a" * 400] * 5}),
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+        )
+        assert response.status_code == 413
+
+    def test_unsupported_encoding(self, client):
+        response = client.post(
+            "/predict",
+            content=b"...",
+            headers={"Content-Type": "application/json", "Content-Encoding": "br"},
+        )
+        assert response.status_code == 415
+
+    def test_malformed_body(self, client):
+        response = client.post(
+            "/predict",
+            content=b"not gzip at all",
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+        )
+        assert response.status_code == 400
+
+
+class TestResponseCompression:
+
+    def test_large_response_compressed(self, client):
+        response = client.post(
+            "/predict",
+            json={"comments": ["Hello there friend"] * 50},
+            headers={"Accept-Encoding": "gzip"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert "Server-Timing" in response.headers
+        assert len(response.json()["results"]) == 50
+
+    def test_small_response_uncompressed(self, client):
+        response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    def test_not_compressed_without_negotiation(self, client):
+        response = client.post(
+            "/predict",
+            json={"comments": ["Hello there friend"] * 50},
+            headers={"Accept-Encoding": "identity"},
+        )
+        assert "content-encoding" not in response.headers
+
+    def test_disabled_by_setting(self, client, settings, monkeypatch):
+        monkeypatch.setattr(settings, "RESPONSE_COMPRESSION", False)
+        response = client.post(
+            "/predict",
+            json={"comments": ["Hello there friend"] * 50},
+            headers={"Accept-Encoding": "gzip"},
+        )
+        assert "content-encoding" not in response.headers
@@ -4,6 +4,7 @@ Run with: cd server && python -m pytest tests/ -v
 """
 
 import pytest
+from pydantic import ValidationError
 
 from app.config import Settings, get_settings
 
@@ -46,6 +47,14 @@ class TestSettings:
         s = Settings()
         assert s.MAX_SEQUENCE_LENGTH == 100
 
+    @pytest.mark.parametrize("stride", [0, -5, 101])
+    def test_window_stride_bounds(self, stride):
+        with pytest.raises(ValidationError, match="WINDOW_STRIDE"):
+            Settings(WINDOW_STRIDE=stride, MAX_SEQUENCE_LENGTH=100)
+
+    def test_window_stride_up_to_sequence_length(self):
+        assert Settings(WINDOW_STRIDE=100, MAX_SEQUENCE_LENGTH=100).WINDOW_STRIDE == 100
+
 
 class TestGetSettings:
     """Tests for the cached settings getter."""
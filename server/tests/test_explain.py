@@ -0,0 +1,126 @@
+"""
+Tests for occlusion explanations.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cache import ScoreCache
+from app.classifier import classifier, occlusion_spans
+from app.main import app
+
+
+@pytest.fixture
+def counted_passes(monkeypatch):
+    """Count model forward calls and the rows they carry."""
+    calls = []
+    original = classifier._run_model
+
+    def run_model(bundle, padded):
+        calls.append(len(padded))
+        return original(bundle, padded)
+
+    monkeypatch.setattr(classifier, "_run_model", run_model)
+    monkeypatch.setattr(classifier, "cache", None)
+    return calls
+
+
+class TestOcclusionSpans:
+
+    def test_exact_when_under_budget(self):
+        assert occlusion_spans([3, 5, 0], 100) == [1, 1, 1]
+
+    def test_long_comments_share_remainder(self):
+        spans = occlusion_spans([4, 100, 100], 50)
+        assert spans[0] == 1
+        variants = sum(-(-n // s) for n, s in zip([4, 100, 100], spans))
+        assert variants <= 50
+
+    def test_more_comments_than_budget(self):
+        with pytest.raises(ValueError, match="more than 2 variants"):
+            occlusion_spans([5, 5, 5], 2)
+        # Empty comments need no variants
+        assert occlusion_spans([0, 0, 5, 5], 2) == [1, 1, 5, 5]
+
+    def test_budget_is_never_exceeded(self):
+        for budget in range(5, 120):
+            lengths = [1, 7, 3, 100, 0, 2]
+            spans = occlusion_spans(lengths, budget)
+            assert sum(-(-n // s) for n, s in zip(lengths, spans)) <= budget
+
+
+class TestExplain:
+
+    def test_shape_and_direction(self, counted_passes):
+        (result,) = classifier.explain(["what stupid idiot lovely weather"])
+        assert result["tokens"] == ["what", "stupid", "idiot", "lovely", "weather"]
+        assert result["span"] == 1
+        toxic = result["contributions"]["toxic"]
+        assert len(toxic) == 5
+        assert max(toxic) in (toxic[1], toxic[2])
+        assert set(result["contributions"]) == set(classifier.settings.CATEGORIES)
+
+    def test_variants_share_one_pass(self, counted_passes):
+        comments = ["what idiot", "hello lovely friend", "stupid moron fool"]
+        classifier.explain(comments)
+        # One pass for the base scores, one for all eight variants
+        assert counted_passes == [3, 8]
+
+    def test_variant_cap(self, counted_passes, settings, monkeypatch):
+        monkeypatch.setattr(settings, "EXPLAIN_MAX_VARIANTS", 4)
+        (result,) = classifier.explain(["hello " * 8 + "idiot " * 8])
+        assert result["span"] == 4
+        assert len(result["contributions"]["toxic"]) == 16
+        assert counted_passes[-1] <= 4
+
+    def test_empty_comment(self, counted_passes):
+        (result,) = classifier.explain([""])
+        assert result["tokens"] == []
+        assert result["contributions"]["toxic"] == []
+
+    def test_reuses_cached_base_scores(self, counted_passes, tmp_path, monkeypatch):
+        cache = ScoreCache(str(tmp_path / "s.db"), 100)
+        monkeypatch.setattr(classifier, "cache", cache)
+        classifier.score(["what idiot"], cascade=False)
+        counted_passes.clear()
+        classifier.explain(["what idiot"])
+        assert counted_passes == [2]
+        # Variants are never cached, so only the base score was stored
+        assert cache.stats()["entries"] == 1
+
+
+class TestExplainEndpoint:
+
+    def test_explain_returns_contributions(self, client):
+        response = client.post("/explain", json={"comments": ["what idiot"]})
+        assert response.status_code == 200
+        result = response.json()["results"][0]
+        assert result["tokens"] == ["what", "idiot"]
+        assert len(result["contributions"]["insult"]) == 2
+        assert result["severity"] in ("safe", "medium", "toxic")
+        assert "Server-Timing" in response.headers
+
+    def test_variant_budget_spans_scheduler_sub_batches(self, settings, monkeypatch):
+        monkeypatch.setattr(settings, "FAIR_SCHEDULING", True)
+        monkeypatch.setattr(settings, "FAIR_SUBBATCH_SIZE", 1)
+        monkeypatch.setattr(settings, "EXPLAIN_MAX_VARIANTS", 4)
+        comments = ["what stupid idiot lovely weather", "you stupid moron fool idiot"]
+        with TestClient(app) as fair_client:
+            response = fair_client.post("/explain", json={"comments": comments})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        variants = sum(-(-len(r["tokens"]) // r["span"]) for r in results)
+        assert variants <= 4
+
+    def test_more_comments_than_variants(self, client, settings, monkeypatch):
+        monkeypatch.setattr(settings, "EXPLAIN_MAX_VARIANTS", 1)
+        response = client.post("/explain", json={"comments": ["what idiot", "stupid"]})
+        assert response.status_code == 422
+
+    def test_comment_limit(self, client, settings):
+        response = client.post(
+            "/explain",
+            json={"comments": ["a"] * (settings.EXPLAIN_MAX_COMMENTS + 1)},
+        )
+        assert response.status_code == 422
@@ -0,0 +1,126 @@
+"""
+Parity tests for the folded gate-table model.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import numpy as np
+import pytest
+import tf_keras as keras
+from tf_keras.preprocessing.sequence import pad_sequences
+
+from app.classifier import ToxicClassifier, classifier
+from app.folding import FoldedModel
+
+TEXTS = [
+    "hello friend, lovely weather",
+    "you are an idiot and a stupid moron",
+    "",
+    "what a day " * 40,
+]
+
+
+def _random_model(recurrent, head, mask_zero=False, vocab=50):
+    model = keras.Sequential(
+        [keras.layers.Embedding(vocab, 8, input_length=12, mask_zero=mask_zero)]
+        + [recurrent]
+        + head
+    )
+    model.build((None, 12))
+    return model
+
+
+def _assert_parity(model, tokens):
+    folded = FoldedModel.fold(model, "v1")
+    np.testing.assert_allclose(
+        folded.predict(tokens), model.predict(tokens, verbose=0), atol=1e-5
+    )
+
+
+@pytest.fixture
+def tokens():
+    rng = np.random.default_rng(0)
+    batch = rng.integers(1, 50, size=(9, 12))
+    batch[:3, :5] = 0  # Pre-padding, as pad_sequences produces
+    return batch
+
+
+class TestFold:
+
+    def test_matches_serving_model(self):
+        padded = pad_sequences(
+            classifier.tokenizer.texts_to_sequences(TEXTS),
+            maxlen=classifier.settings.MAX_SEQUENCE_LENGTH,
+        )
+        _assert_parity(classifier.model, padded)
+
+    def test_unidirectional_last_state(self, tokens):
+        model = _random_model(
+            keras.layers.LSTM(6), [keras.layers.Dense(3, activation="sigmoid")]
+        )
+        _assert_parity(model, tokens)
+
+    def test_bidirectional_sequences_with_pooling(self, tokens):
+        model = _random_model(
+            keras.layers.Bidirectional(keras.layers.LSTM(6, return_sequences=True)),
+            [
+                keras.layers.GlobalMaxPooling1D(),
+                keras.layers.Dropout(0.5),
+                keras.layers.Dense(5, activation="relu"),
+                keras.layers.Dense(3, activation="sigmoid"),
+            ],
+        )
+        _assert_parity(model, tokens)
+
+    def test_merge_sum_and_masking(self, tokens):
+        model = _random_model(
+            keras.layers.Bidirectional(keras.layers.LSTM(4), merge_mode="sum"),
+            [keras.layers.Dense(2, activation="sigmoid")],
+            mask_zero=True,
+        )
+        _assert_parity(model, tokens)
+
+    def test_unsupported_layer_rejected(self):
+        model = _random_model(keras.layers.GRU(4), [keras.layers.Dense(2)])
+        with pytest.raises(ValueError, match="GRU"):
+            FoldedModel.fold(model, "v1")
+
+    def test_save_load_roundtrip(self, tokens, tmp_path):
+        model = _random_model(keras.layers.LSTM(6), [keras.layers.Dense(3)])
+        folded = FoldedModel.fold(model, "v1")
+        folded.save(str(tmp_path / "folded.npz"))
+        loaded = FoldedModel.load(str(tmp_path / "folded.npz"))
+        assert loaded.model_version == "v1"
+        np.testing.assert_array_equal(loaded.predict(tokens), folded.predict(tokens))
+
+    def test_flops_saved(self):
+        model = _random_model(keras.layers.LSTM(6), [keras.layers.Dense(3)])
+        cost = FoldedModel.fold(model, "v1").flops_saved(rows=10, steps=12)
+        assert cost["input_flops_removed"] == 10 * 12 * 2 * 8 * 24
+
+
+class TestClassifierIntegration:
+
+    @pytest.fixture
+    def folded_settings(self, settings, tmp_path, monkeypatch):
+        path = tmp_path / "folded.npz"
+        FoldedModel.fold(classifier.model, classifier.fingerprint).save(str(path))
+        monkeypatch.setattr(settings, "FOLDED_MODEL_ENABLED", True)
+        monkeypatch.setattr(settings, "FOLDED_MODEL_PATH", str(path))
+        monkeypatch.setattr(settings, "SCORE_CACHE_ENABLED", False)
+        return settings
+
+    def test_serves_through_tables(self, folded_settings):
+        engine = ToxicClassifier()
+        engine.load()
+        assert engine.metrics()["folded_model"] is True
+        np.testing.assert_allclose(
+            engine.score(TEXTS), classifier.score(TEXTS, cascade=False), atol=1e-5
+        )
+
+    def test_stale_tables_ignored(self, folded_settings):
+        FoldedModel.fold(classifier.model, "stale").save(
+            folded_settings.FOLDED_MODEL_PATH
+        )
+        engine = ToxicClassifier()
+        engine.load()
+        assert engine.metrics()["folded_model"] is False
@@ -0,0 +1,209 @@
+"""
+Tests for the in-flight budget and per-request memory tracking.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import asyncio
+import json
+import tracemalloc
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, profiling
+from app.main import PredictResponse, app
+from app.memory import InflightBudget, MemoryTracker, full_size_batch, run_concurrent
+
+WORDS = "you are such an idiot what a lovely day thanks friend".split()
+
+
+async def _hold(budget: InflightBudget, need: int, log: list, name: str):
+    async with budget.hold(need):
+        log.append((name, budget.in_use))
+        await asyncio.sleep(0.01)
+
+
+class TestInflightBudget:
+
+    def test_bounds_concurrent_comments(self):
+        budget, log = InflightBudget(10), []
+
+        async def scenario():
+            await asyncio.gather(*(_hold(budget, 6, log, str(i)) for i in range(3)))
+
+        asyncio.run(scenario())
+        assert [name for name, _ in log] == ["0", "1", "2"]
+        assert budget.peak == 6
+        assert budget.in_use == 0
+
+    def test_oversized_request_runs_alone(self):
+        budget, log = InflightBudget(10), []
+
+        async def scenario():
+            await asyncio.gather(_hold(budget, 50, log, "big"), _hold(budget, 1, log, "small"))
+
+        asyncio.run(scenario())
+        assert log == [("big", 10), ("small", 1)]
+
+    def test_cancelled_waiter_releases_nothing(self):
+        budget = InflightBudget(4)
+
+        async def scenario():
+            async with budget.hold(4):
+                waiter = asyncio.create_task(_hold(budget, 2, [], "w"))
+                await asyncio.sleep(0)
+                assert budget.stats()["waiting"] == 1
+                waiter.cancel()
+                await asyncio.sleep(0)
+            assert budget.stats() == {"capacity": 4, "in_use": 0, "waiting": 0, "peak": 4}
+
+        asyncio.run(scenario())
+
+    def test_zero_capacity_is_unbounded(self):
+        budget, log = InflightBudget(0), []
+
+        async def scenario():
+            await asyncio.gather(*(_hold(budget, 500, log, str(i)) for i in range(3)))
+
+        asyncio.run(scenario())
+        assert budget.stats()["waiting"] == 0
+
+
+class TestMemoryTracker:
+
+    def test_records_request_peak(self):
+        tracker = MemoryTracker()
+        tracemalloc.start()
+        try:
+            with tracker.track():
+                block = bytearray(4 * 2**20)
+                del block
+        finally:
+            tracemalloc.stop()
+        peak = tracker.stats()["request_peak_kb"]
+        assert peak["requests"] == 1
+        assert peak["max"] >= 4 * 1024
+
+    def test_idle_when_not_tracing(self):
+        tracker = MemoryTracker()
+        with tracker.track():
+            pass
+        assert tracker.stats()["request_peak_kb"]["requests"] == 0
+
+
+class TestTracingOwnership:
+
+    def test_profile_keeps_memory_tracking(self, settings, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "MEMORY_TRACKING", True)
+        monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+        tracker = MemoryTracker()
+        tracker.start()
+        try:
+            session = profiling.try_start("window", "test")
+            block = bytearray(8 * 2**20)
+            del block
+            with tracker.track():  # Must not reset the session's peak
+                pass
+            summary = profiling.finish(session)
+            assert summary["peak_traced_bytes"] >= 8 * 2**20
+
+            assert tracker.stats()["tracking"] is True
+            with tracker.track():
+                block = bytearray(4 * 2**20)
+                del block
+            assert tracker.stats()["request_peak_kb"]["max"] >= 4 * 1024
+        finally:
+            tracker.stop()
+        assert not tracemalloc.is_tracing()
+
+    def test_profile_alone_stops_its_tracing(self, settings, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+        profiling.finish(profiling.try_start("window", "test"))
+        assert not tracemalloc.is_tracing()
+
+
+class TestRequestPath:
+
+    def test_serialization_matches_response_model(self, client):
+        response = client.post("/predict", json={"comments": ["hello", "what idiot ✨"]})
+        results = response.json()["results"]
+        assert response.content == PredictResponse(results=results).model_dump_json().encode()
+
+    def test_serialization_matches_for_non_finite_scores(self):
+        result = {"text": "x", "scores": {"toxic": float("nan"), "insult": 1e-05}}
+        result.update(is_toxic=False, severity="safe", flagged_categories=0)
+        response = main.timed_response(MagicMock(), [result], main.StageTimings())
+        expected = PredictResponse(results=[result]).model_dump_json().encode()
+        assert response.body == expected
+
+    def test_short_comments_are_not_copied(self):
+        comments = ["hello", "what idiot"]
+        assert main.PredictRequest.truncate_long_comments(comments) is comments
+
+    def test_metrics_report_memory(self, client):
+        memory = client.get("/metrics").json()["memory"]
+        assert memory["rss_mb"] > 0
+        assert memory["inflight"]["capacity"] == main.budget.capacity
+
+    def test_explain_charges_variant_rows(self, client, monkeypatch):
+        budget = InflightBudget(10_000)
+        monkeypatch.setattr(main, "budget", budget)
+        response = client.post("/explain", json={"comments": ["what stupid idiot", "lovely weather"]})
+        assert response.status_code == 200
+        # Two base rows, then one variant per token
+        assert budget.peak == 7
+
+    def test_scheduler_holds_budget(self, settings, monkeypatch):
+        monkeypatch.setattr(settings, "FAIR_SCHEDULING", True)
+        budget = InflightBudget(10_000)
+        monkeypatch.setattr(main, "budget", budget)
+        with TestClient(app) as fair_client:
+            response = fair_client.post("/predict", json={"comments": ["hello"] * 40})
+        assert response.status_code == 200
+        assert budget.peak == 40
+
+    @pytest.mark.parametrize("fair", [False, True])
+    def test_window_rows_planned_per_request(self, settings, monkeypatch, fair):
+        """Scheduler sub-batches share the request's MAX_WINDOW_ROWS, which the budget is charged."""
+        monkeypatch.setattr(settings, "MAX_COMMENT_LENGTH", 5000)
+        monkeypatch.setattr(settings, "LONG_COMMENT_MODE", True)
+        monkeypatch.setattr(settings, "MAX_WINDOW_ROWS", 3)
+        monkeypatch.setattr(settings, "FAIR_SCHEDULING", fair)
+        monkeypatch.setattr(settings, "FAIR_SUBBATCH_SIZE", 1)
+        monkeypatch.setattr(main.classifier, "cache", None)
+        monkeypatch.setattr(
+            main.classifier,
+            "stage_counts",
+            dict.fromkeys(main.classifier.stage_counts, 0),
+        )
+        budget = InflightBudget(10_000)
+        monkeypatch.setattr(main, "budget", budget)
+        comments = ["you stupid idiot moron " + "lovely sunny weather today " * 60] * 5
+        with TestClient(app) as test_client:
+            response = test_client.post("/predict", json={"comments": comments})
+        assert response.status_code == 200
+        extra = main.classifier.stage_counts["window_extra_rows"]
+        assert 0 < extra <= 3
+        assert main.classifier.stage_counts["window_fallbacks"] > 0
+        assert budget.peak == 5 + extra
+
+    def test_full_size_batches_under_concurrency(self, settings, monkeypatch):
+        """Four concurrent full-size batches stay within one batch's budget and a heap ceiling."""
+        budget = InflightBudget(settings.MAX_COMMENTS_PER_REQUEST)
+        monkeypatch.setattr(main, "budget", budget)
+        monkeypatch.setattr(main, "memory", MemoryTracker())
+        batch = full_size_batch(WORDS)
+        assert len(json.dumps(batch)) >= 250_000
+
+        tracemalloc.start()
+        try:
+            codes = asyncio.run(run_concurrent(app, batch, concurrency=4, rounds=1))
+            _, heap_peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert codes == [200] * 4
+        assert budget.peak == settings.MAX_COMMENTS_PER_REQUEST
+        assert main.memory.stats()["request_peak_kb"]["requests"] == 4
+        assert heap_peak < 32 * 2**20
@@ -0,0 +1,106 @@
+"""
+Tests for pipelined stage execution.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.classifier import StageTimings, classifier
+from app.main import app
+from app.pipeline import StagePipeline
+
+TEXTS = ["hello friend", "what idiot", "stupid moron fool", "lovely weather", ""] * 7
+
+
+@pytest.fixture
+def pipeline_settings(settings, monkeypatch):
+    monkeypatch.setattr(settings, "PIPELINE_CHUNK_SIZE", 8)
+    monkeypatch.setattr(classifier, "cache", None)
+    return settings
+
+
+async def _run(pipeline: StagePipeline, batches: list[list[str]], depth: int = 2):
+    pipeline.start(depth)
+    try:
+        return await asyncio.gather(
+            *(pipeline.submit(batch, 0.5, StageTimings()) for batch in batches)
+        )
+    finally:
+        pipeline.stop()
+
+
+class TestStagePipeline:
+
+    def test_matches_sequential_predict(self, pipeline_settings):
+        (results,) = asyncio.run(_run(StagePipeline(classifier), [TEXTS]))
+        assert results == classifier.predict(TEXTS)
+
+    def test_stages_overlap(self, pipeline_settings, monkeypatch):
+        """Chunk 2 is prepared while chunk 1 is still in the model."""
+        in_model, overlapped = threading.Event(), []
+        original_prepare, original_run = classifier.prepare, classifier._run_model
+
+        def prepare(*args, **kwargs):
+            overlapped.append(in_model.is_set())
+            return original_prepare(*args, **kwargs)
+
+        def run_model(bundle, padded):
+            in_model.set()
+            try:
+                threading.Event().wait(0.05)
+                return original_run(bundle, padded)
+            finally:
+                in_model.clear()
+
+        monkeypatch.setattr(classifier, "prepare", prepare)
+        monkeypatch.setattr(classifier, "_run_model", run_model)
+        asyncio.run(_run(StagePipeline(classifier), [TEXTS]))
+        assert len(overlapped) == 5
+        assert any(overlapped[1:])
+
+    def test_timings_and_utilization(self, pipeline_settings):
+        pipeline = StagePipeline(classifier)
+        timings = StageTimings()
+
+        async def scenario():
+            pipeline.start()
+            try:
+                await pipeline.submit(TEXTS, 0.5, timings)
+                return pipeline.stats()
+            finally:
+                pipeline.stop()
+
+        stats = asyncio.run(scenario())
+        assert {"queue", "tokenize", "pad", "infer", "postprocess"} <= set(timings)
+        for stage in stats["stages"].values():
+            assert stage["chunks"] == 5
+            assert 0 < stage["utilization"] <= 1
+
+    def test_stage_error_fails_request(self, pipeline_settings, monkeypatch):
+        def broken(bundle, padded):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(classifier, "_run_model", broken)
+        pipeline = StagePipeline(classifier)
+        with pytest.raises(RuntimeError, match="boom"):
+            asyncio.run(_run(pipeline, [TEXTS]))
+        assert not pipeline.running
+
+
+class TestPipelineEndpoint:
+
+    def test_predict_through_pipeline(self, pipeline_settings, monkeypatch):
+        monkeypatch.setattr(pipeline_settings, "PIPELINE_ENABLED", True)
+        with TestClient(app) as client:
+            response = client.post("/predict", json={"comments": TEXTS})
+            stats = client.get("/metrics").json()["pipeline"]
+        assert response.status_code == 200
+        assert [r["scores"] for r in response.json()["results"]] == [
+            r["scores"] for r in classifier.predict(TEXTS)
+        ]
+        assert stats["running"] is True
+        assert stats["stages"]["infer"]["chunks"] == 5
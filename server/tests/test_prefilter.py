@@ -0,0 +1,111 @@
+"""
+Unit tests for the lexical prefilter cascade.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import numpy as np
+import pytest
+
+from app.classifier import classifier
+from app.prefilter import LexicalPrefilter, evaluate
+
+
+def _naive_proba(prefilter, sequences):
+    rows = []
+    for seq in sequences:
+        logits = prefilter.bias.astype(np.float64).copy()
+        for token in seq:
+            logits += prefilter.weights[(token * 2654435761) % prefilter.num_buckets]
+        rows.append(1 / (1 + np.exp(-logits)))
+    return np.array(rows)
+
+
+@pytest.fixture
+def prefilter():
+    rng = np.random.default_rng(0)
+    return LexicalPrefilter(
+        rng.normal(size=(64, 6)).astype(np.float32),
+        rng.normal(size=6).astype(np.float32),
+        "v1",
+    )
+
+
+class TestLexicalPrefilter:
+
+    def test_matches_naive_scoring(self, prefilter):
+        sequences = [[1, 2, 3], [], [7, 7, 7, 7], [1000]]
+        np.testing.assert_allclose(
+            prefilter.predict_proba(sequences),
+            _naive_proba(prefilter, sequences),
+            rtol=1e-5,
+        )
+
+    def test_save_load_roundtrip(self, prefilter, tmp_path):
+        path = str(tmp_path / "prefilter.npz")
+        prefilter.save(path)
+        loaded = LexicalPrefilter.load(path)
+        assert loaded.model_version == "v1"
+        np.testing.assert_array_equal(loaded.weights, prefilter.weights)
+
+    def test_distill_separates_tokens(self):
+        """Token 1 always toxic, token 2 always benign — the fit should learn it."""
+        sequences = [[1, 3]] * 50 + [[2, 3]] * 50
+        targets = np.vstack([np.full((50, 6), 0.9), np.full((50, 6), 0.01)])
+        fitted = LexicalPrefilter.distill(sequences, targets, "v1", num_buckets=32)
+        probs = fitted.predict_proba([[1, 3], [2, 3]])
+        assert probs[0].min() > 0.5
+        assert probs[1].max() < 0.05
+
+
+class TestEvaluate:
+
+    def test_skip_and_disagreement(self):
+        probs = np.array([[0.001] * 6, [0.001] * 6, [0.5] * 6])
+        targets = np.array([[0.0] * 6, [0.9] + [0.0] * 5, [0.9] * 6])
+        report = evaluate(probs, targets, bound=0.01)
+        assert report["skip_rate"] == round(2 / 3, 4)
+        assert report["disagreements"] == 1
+        assert report["disagreement_rate"] == 0.5
+
+
+class TestCascade:
+
+    @pytest.fixture
+    def cascaded(self, settings, monkeypatch):
+        texts = ["hello friend", "lovely weather", "you idiot", "stupid moron"]
+        sequences = classifier.tokenizer.texts_to_sequences(texts)
+        targets = classifier.score(texts, cascade=False)
+        fitted = LexicalPrefilter.distill(sequences, targets, classifier.fingerprint)
+        monkeypatch.setattr(
+            classifier, "_bundle", classifier._bundle._replace(prefilter=fitted)
+        )
+        monkeypatch.setattr(classifier, "cache", None)
+        monkeypatch.setattr(
+            classifier, "stage_counts", dict.fromkeys(classifier.stage_counts, 0)
+        )
+        return fitted
+
+    def test_everything_skipped_at_bound_one(self, cascaded, settings, monkeypatch):
+        monkeypatch.setattr(settings, "PREFILTER_SAFE_BOUND", 1.0)
+        scores = classifier.score(["hello friend", "you idiot"])
+        np.testing.assert_allclose(
+            scores, cascaded.predict_proba(
+                classifier.tokenizer.texts_to_sequences(["hello friend", "you idiot"])
+            )
+        )
+        assert classifier.stage_counts["prefilter_skipped"] == 2
+        assert classifier.stage_counts["model_rows"] == 0
+
+    def test_threshold_caps_bound(self, cascaded, settings, monkeypatch):
+        """A threshold of 0 can flag anything, so nothing may skip the LSTM."""
+        monkeypatch.setattr(settings, "PREFILTER_SAFE_BOUND", 1.0)
+        results = classifier.predict(["hello friend", "you idiot"], threshold=0.0)
+        assert len(results) == 2
+        assert classifier.stage_counts["prefilter_skipped"] == 0
+        assert classifier.stage_counts["model_rows"] == 2
+
+    def test_metrics_report_stage_counts(self, cascaded):
+        classifier.score(["hello friend"])
+        metrics = classifier.metrics()
+        assert metrics["cascade"]["enabled"] is True
+        assert metrics["stages"]["prefilter_seen"] == 1
@@ -0,0 +1,108 @@
+"""
+Tests for the opt-in profiling facility and admin token guard.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.middleware import is_admin_token
+from app.profiling import ProfilingMiddleware, StackSampler
+
+
+@pytest.fixture
+def profiling_settings(settings, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILING_INTERVAL_MS", 1.0)
+    return settings
+
+
+@pytest.fixture
+def profiled_client(profiling_settings):
+    """A tiny app wired the same way main.py wires profiling when enabled."""
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(profiling.router)
+
+    @app.get("/work")
+    async def work():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+class TestAdminToken:
+
+    def test_rejects_when_unset(self, settings, monkeypatch):
+        monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+        assert is_admin_token("") is False
+        assert is_admin_token("anything") is False
+
+    def test_accepts_matching_token(self, profiling_settings):
+        assert is_admin_token("s3cret") is True
+        assert is_admin_token("wrong") is False
+        assert is_admin_token(None) is False
+
+
+class TestStackSampler:
+
+    def test_collects_samples(self):
+        sampler = StackSampler(0.001)
+        sampler.start()
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        stacks = sampler.stop()
+        assert sampler.samples > 0
+        assert any("test_collects_samples" in stack for stack in stacks)
+
+
+class TestProfilingMiddleware:
+
+    def test_unprofiled_request_untouched(self, profiled_client):
+        response = profiled_client.get("/work")
+        assert response.status_code == 200
+        assert "X-Profile-Id" not in response.headers
+
+    def test_profile_requires_token(self, profiled_client):
+        response = profiled_client.get("/work", headers={"X-Profile": "1"})
+        assert response.status_code == 403
+
+    def test_profiled_request_writes_files(self, profiled_client, tmp_path):
+        response = profiled_client.get(
+            "/work", headers={"X-Profile": "1", "X-Admin-Token": "s3cret"}
+        )
+        assert response.status_code == 200
+        profile_id = response.headers["X-Profile-Id"]
+        assert (tmp_path / f"{profile_id}.folded").exists()
+        assert (tmp_path / f"{profile_id}.alloc.txt").exists()
+        summary = json.loads((tmp_path / f"{profile_id}.json").read_text())
+        assert summary["kind"] == "request"
+        assert summary["samples"] > 0
+
+    def test_summary_endpoint(self, profiled_client):
+        headers = {"X-Admin-Token": "s3cret"}
+        profiled_client.get("/work", headers={"X-Profile": "1", **headers})
+        data = profiled_client.get("/admin/profiles", headers=headers).json()
+        assert len(data["profiles"]) == 1
+        assert data["profiles"][0]["top_frames"]
+
+    def test_summary_endpoint_requires_token(self, profiled_client):
+        assert profiled_client.get("/admin/profiles").status_code == 403
+
+    def test_window_rejects_overlap(self, profiled_client):
+        headers = {"X-Admin-Token": "s3cret"}
+        first = profiled_client.post("/admin/profiles?seconds=0.2", headers=headers)
+        assert first.status_code == 200
+        second = profiled_client.post("/admin/profiles?seconds=0.2", headers=headers)
+        assert second.status_code == 409
+        time.sleep(0.5)
@@ -0,0 +1,85 @@
+"""
+Tests for the in-process model replica pool.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.classifier import ToxicClassifier, classifier
+from app.folding import FoldedModel
+from app.replicas import ReplicaPool
+
+TEXTS = ["hello friend", "what idiot", "stupid moron fool", "lovely weather", ""]
+
+
+class TestReplicaPool:
+
+    def test_busy_replica_is_skipped(self):
+        pool = ReplicaPool(["a", "b"])
+        entered, release = threading.Event(), threading.Event()
+
+        def slow(model):
+            entered.set()
+            release.wait(5)
+            return model
+
+        with ThreadPoolExecutor(1) as executor:
+            first = executor.submit(pool.run, 10, slow)
+            entered.wait(5)
+            assert pool.run(1, lambda model: model) == "b"
+            release.set()
+            assert first.result() == "a"
+
+    def test_spreads_load(self):
+        pool = ReplicaPool(["a", "b", "c"])
+
+        def call(_):
+            return pool.run(4, lambda model: threading.Event().wait(0.01))
+
+        with ThreadPoolExecutor(6) as executor:
+            list(executor.map(call, range(30)))
+        stats = pool.stats()
+        assert sum(r["calls"] for r in stats["pool"]) == 30
+        assert all(r["calls"] > 0 for r in stats["pool"])
+        assert all(r["pending_rows"] == 0 for r in stats["pool"])
+
+
+class TestClassifierReplicas:
+
+    @pytest.fixture
+    def engine(self, settings, monkeypatch):
+        monkeypatch.setattr(settings, "MODEL_REPLICAS", 2)
+        monkeypatch.setattr(settings, "SCORE_CACHE_ENABLED", False)
+        engine = ToxicClassifier()
+        engine.load()
+        return engine
+
+    def test_replicas_share_tokenizer_and_agree(self, engine):
+        pool = engine._bundle.replicas
+        assert len(pool) == 2
+        assert pool.replicas[0].model is not pool.replicas[1].model
+        np.testing.assert_allclose(
+            engine.score(TEXTS), classifier.score(TEXTS, cascade=False), atol=1e-6
+        )
+
+    def test_concurrent_calls_use_both(self, engine):
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(lambda _: engine.predict(TEXTS * 20), range(8)))
+        stats = engine.metrics()["replicas"]
+        assert stats["replicas"] == 2
+        assert all(r["calls"] > 0 for r in stats["pool"])
+
+    def test_folded_model_skips_replicas(self, settings, tmp_path, monkeypatch):
+        path = str(tmp_path / "folded.npz")
+        FoldedModel.fold(classifier.model, classifier.fingerprint).save(path)
+        monkeypatch.setattr(settings, "FOLDED_MODEL_ENABLED", True)
+        monkeypatch.setattr(settings, "FOLDED_MODEL_PATH", path)
+        monkeypatch.setattr(settings, "MODEL_REPLICAS", 2)
+        engine = ToxicClassifier()
+        engine.load()
+        assert engine._bundle.folded is not None
+        assert engine._bundle.replicas is None
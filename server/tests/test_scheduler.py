@@ -0,0 +1,180 @@
+"""
+Tests for weighted fair queuing across clients.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import HTTPConnection
+
+from app.classifier import StageTimings
+from app.main import app
+from app.middleware import client_key
+from app.scheduler import FairScheduler
+
+
+@pytest.fixture
+def fair_settings(settings, monkeypatch):
+    monkeypatch.setattr(settings, "FAIR_SUBBATCH_SIZE", 32)
+    monkeypatch.setattr(settings, "FAIR_WEIGHTS", {})
+    monkeypatch.setattr(settings, "FAIR_DEFAULT_WEIGHT", 1.0)
+    return settings
+
+
+def _recording_batch(served: list[str]):
+    """Stand-in for ToxicClassifier.predict that logs which client ran."""
+
+    def run_batch(comments, threshold, timings):
+        with timings.stage("infer"):
+            served.append(comments[0])
+        return [{"text": c} for c in comments]
+
+    return run_batch
+
+
+async def _serve(scheduler: FairScheduler, requests: list[tuple[str, list[str]]]):
+    scheduler.start()
+    try:
+        return await asyncio.gather(
+            *(
+                scheduler.submit(client, comments, 0.5, StageTimings())
+                for client, comments in requests
+            )
+        )
+    finally:
+        await scheduler.stop()
+
+
+class TestFairScheduler:
+
+    def test_light_client_not_starved(self, fair_settings):
+        served = []
+        scheduler = FairScheduler(_recording_batch(served))
+        heavy, light = asyncio.run(
+            _serve(scheduler, [("heavy", ["h"] * 500), ("light", ["l"] * 10)])
+        )
+        assert len(heavy) == 500 and len(light) == 10
+        assert served.index("l") <= 1
+        assert len(served) == 16 + 1
+
+    def test_results_keep_request_order(self, fair_settings):
+        scheduler = FairScheduler(_recording_batch([]))
+        comments = [f"c{i}" for i in range(100)]
+        (results,) = asyncio.run(_serve(scheduler, [("a", comments)]))
+        assert [r["text"] for r in results] == comments
+
+    def test_weights_set_service_share(self, fair_settings, monkeypatch):
+        monkeypatch.setattr(fair_settings, "FAIR_SUBBATCH_SIZE", 1)
+        monkeypatch.setattr(fair_settings, "FAIR_WEIGHTS", {"a": 3.0})
+        served = []
+        scheduler = FairScheduler(_recording_batch(served))
+        asyncio.run(_serve(scheduler, [("a", ["a"] * 12), ("b", ["b"] * 12)]))
+        assert served[:8].count("a") == 6
+
+    def test_timings_merged_with_queue(self, fair_settings):
+        scheduler = FairScheduler(_recording_batch([]))
+        timings = StageTimings()
+
+        async def run():
+            scheduler.start()
+            try:
+                await scheduler.submit("a", ["x"] * 70, 0.5, timings)
+            finally:
+                await scheduler.stop()
+
+        asyncio.run(run())
+        assert set(timings) == {"infer", "queue"}
+
+    def test_queue_timed_from_caller_start(self, fair_settings):
+        """Time the caller spent waiting for the in-flight budget counts as queueing."""
+        scheduler = FairScheduler(_recording_batch([]))
+        timings = StageTimings()
+
+        async def run():
+            scheduler.start()
+            try:
+                submitted = time.perf_counter() - 0.5
+                await scheduler.submit("a", ["x"], 0.5, timings, submitted=submitted)
+            finally:
+                await scheduler.stop()
+
+        asyncio.run(run())
+        assert timings["queue"] >= 500
+
+    def test_errors_propagate(self, fair_settings):
+        def failing(comments, threshold, timings):
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            asyncio.run(_serve(FairScheduler(failing), [("a", ["x"])]))
+
+    def test_stats_report_shares(self, fair_settings):
+        scheduler = FairScheduler(_recording_batch([]))
+        asyncio.run(_serve(scheduler, [("a", ["x"] * 30), ("b", ["y"] * 10)]))
+        stats = scheduler.stats(per_client=True)
+        assert stats["queued_comments"] == 0
+        assert stats["clients"]["a"]["served_comments"] == 30
+        assert stats["clients"]["a"]["share"] == 0.75
+        assert "clients" not in scheduler.stats()
+
+
+class TestClientKey:
+
+    @staticmethod
+    def _conn(host: str, key: str | None = "team-a"):
+        headers = [(b"x-api-key", key.encode())] if key else []
+        return HTTPConnection({"type": "http", "client": (host, 1234), "headers": headers})
+
+    @pytest.fixture
+    def keyed(self, fair_settings, monkeypatch):
+        monkeypatch.setattr(fair_settings, "FAIR_CLIENT_HEADER", "X-API-Key")
+        monkeypatch.setattr(fair_settings, "FAIR_TRUSTED_PROXIES", ["10.0.0.0/8", "::1"])
+
+    def test_header_from_trusted_proxy(self, keyed):
+        assert client_key(self._conn("10.1.2.3")) == "team-a"
+        assert client_key(self._conn("::1")) == "team-a"
+
+    def test_header_from_anyone_else_is_ignored(self, keyed):
+        assert client_key(self._conn("203.0.113.9")) == "203.0.113.9"
+
+    def test_missing_header_falls_back_to_address(self, keyed):
+        assert client_key(self._conn("10.1.2.3", key=None)) == "10.1.2.3"
+
+
+class TestFairSchedulingEndpoints:
+
+    @pytest.fixture
+    def fair_client(self, fair_settings, monkeypatch):
+        monkeypatch.setattr(fair_settings, "FAIR_SCHEDULING", True)
+        monkeypatch.setattr(fair_settings, "FAIR_CLIENT_HEADER", "X-API-Key")
+        monkeypatch.setattr(fair_settings, "FAIR_TRUSTED_PROXIES", ["testclient"])
+        monkeypatch.setattr(fair_settings, "ADMIN_TOKEN", "s3cret")
+        with TestClient(app) as client:
+            yield client
+
+    def test_predict_through_scheduler(self, fair_client):
+        response = fair_client.post(
+            "/predict",
+            json={"comments": ["Hello"] * 40},
+            headers={"X-API-Key": "team-a"},
+        )
+        assert response.status_code == 200
+        assert len(response.json()["results"]) == 40
+        assert "queue;dur=" in response.headers["Server-Timing"]
+
+        stats = fair_client.get(
+            "/admin/scheduler", headers={"X-Admin-Token": "s3cret"}
+        ).json()
+        assert stats["running"] is True
+        assert stats["clients"]["team-a"]["served_comments"] >= 40
+
+    def test_admin_stats_require_token(self, fair_client):
+        assert fair_client.get("/admin/scheduler").status_code == 403
+
+    def test_metrics_include_scheduler(self, fair_client):
+        data = fair_client.get("/metrics").json()
+        assert data["scheduler"]["running"] is True
+        assert "clients" not in data["scheduler"]
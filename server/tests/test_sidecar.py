@@ -0,0 +1,191 @@
+"""
+Tests for the Unix-domain-socket sidecar.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import asyncio
+import os
+import socket
+import struct
+import threading
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.classifier import classifier
+from app.main import app
+from app.sidecar import (
+    SidecarClient,
+    SidecarServer,
+    SidecarError,
+    _serve_in_thread,
+    decode_request,
+    decode_response,
+    encode_error,
+    encode_request,
+    encode_response,
+)
+
+TEXTS = ["hello friend", "what idiot", "", "stupid moron ✨"]
+
+
+@pytest.fixture
+def sidecar_path(tmp_path):
+    path = str(tmp_path / "s.sock")
+    stop = _serve_in_thread(classifier, path)
+    yield path
+    stop()
+
+
+class TestFraming:
+
+    def test_request_roundtrip(self):
+        frame = encode_request(7, TEXTS, 0.25)
+        assert struct.unpack_from("<I", frame)[0] == len(frame) - 4
+        assert decode_request(frame[4:]) == (7, TEXTS, 0.25)
+
+    def test_response_roundtrip(self):
+        scores = np.arange(12, dtype=np.float32).reshape(2, 6)
+        request_id, decoded = decode_response(encode_response(3, scores)[4:])
+        assert request_id == 3
+        np.testing.assert_array_equal(decoded, scores)
+
+    def test_error_roundtrip(self):
+        request_id, error = decode_response(encode_error(9, "nope")[4:])
+        assert request_id == 9 and isinstance(error, SidecarError)
+
+    def test_malformed_request_rejected(self):
+        with pytest.raises(ValueError):
+            decode_request(encode_request(1, TEXTS)[4:-1])
+        with pytest.raises(ValueError):
+            decode_request(b"\x01")
+
+
+class TestSidecarServer:
+
+    def test_scores_match_classifier(self, sidecar_path):
+        with SidecarClient(sidecar_path) as client:
+            scores = client.score(TEXTS)
+        np.testing.assert_array_equal(scores, classifier.score(TEXTS))
+
+    def test_pipelined_requests_keep_order(self, sidecar_path):
+        batches = [[f"text {i}", "what idiot"][: 1 + i % 2] for i in range(20)]
+        with SidecarClient(sidecar_path) as client:
+            results = client.score_many(batches, window=4)
+        assert [len(r) for r in results] == [len(b) for b in batches]
+        np.testing.assert_array_equal(results[3], classifier.score(batches[3]))
+
+    def test_error_keeps_connection_usable(self, sidecar_path, settings):
+        too_many = ["a"] * (settings.MAX_COMMENTS_PER_REQUEST + 1)
+        with SidecarClient(sidecar_path) as client:
+            with pytest.raises(SidecarError, match="texts per request"):
+                client.score(too_many)
+            assert client.score(["hello"]).shape == (1, len(settings.CATEGORIES))
+
+    @pytest.mark.parametrize(
+        "texts, threshold",
+        [([], 0.5), (["hello"], float("nan")), (["hello"], 1.5), (["hello"], -0.1)],
+    )
+    def test_rejects_invalid_requests(self, sidecar_path, texts, threshold):
+        with SidecarClient(sidecar_path) as client:
+            with pytest.raises(SidecarError, match="ValueError"):
+                client.score(texts, threshold)
+
+    def test_oversized_frame_closes_connection(self, sidecar_path, settings, monkeypatch):
+        monkeypatch.setattr(settings, "SIDECAR_MAX_FRAME_BYTES", 64)
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(sidecar_path)
+            sock.sendall(encode_request(1, ["x" * 100]))
+            reply = sock.recv(4096)
+            _, error = decode_response(reply[4:])
+            assert isinstance(error, SidecarError)
+            assert sock.recv(4096) == b""
+
+
+def _answer_once(path: str, frame: bytes) -> threading.Thread:
+    """A server that reads one request and replies with `frame`."""
+    listener = socket.socket(socket.AF_UNIX)
+    listener.bind(path)
+    listener.listen()
+
+    def serve():
+        with listener, listener.accept()[0] as conn:
+            conn.recv(4096)
+            conn.sendall(frame)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    return thread
+
+
+class TestClientIds:
+
+    @pytest.mark.parametrize(
+        "frame, message",
+        [
+            (encode_error(0, "Frame exceeds SIDECAR_MAX_FRAME_BYTES"), "Frame exceeds"),
+            (encode_response(999, np.zeros((1, 6), np.float32)), "unknown request id"),
+        ],
+    )
+    def test_unmatched_response_raises(self, tmp_path, frame, message):
+        path = str(tmp_path / "fake.sock")
+        thread = _answer_once(path, frame)
+        with SidecarClient(path) as client:
+            with pytest.raises(SidecarError, match=message):
+                client.score(["hello"])
+        thread.join(5)
+
+
+class TestSocketPath:
+
+    def test_stop_keeps_a_replaced_path(self, tmp_path):
+        path = str(tmp_path / "s.sock")
+
+        async def scenario():
+            server = SidecarServer(classifier, path)
+            await server.start()
+            os.unlink(path)
+            open(path, "w").close()  # Someone else's file now
+            await server.stop()
+
+        asyncio.run(scenario())
+        assert os.path.exists(path)
+
+    def test_refuses_a_live_socket(self, sidecar_path):
+        with pytest.raises(RuntimeError, match="already in use"):
+            asyncio.run(SidecarServer(classifier, sidecar_path).start())
+        with SidecarClient(sidecar_path) as client:
+            assert client.score(["hello"]).shape[0] == 1
+
+    def test_replaces_a_stale_socket(self, tmp_path):
+        path = str(tmp_path / "s.sock")
+        with socket.socket(socket.AF_UNIX) as stale:
+            stale.bind(path)  # Bound, never listening
+        stop = _serve_in_thread(classifier, path)
+        try:
+            with SidecarClient(path) as client:
+                assert client.score(["hello"]).shape[0] == 1
+        finally:
+            stop()
+        assert not os.path.exists(path)
+
+
+class TestAlongsideHttp:
+
+    def test_refuses_several_workers(self, settings, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "SIDECAR_SOCKET", str(tmp_path / "app.sock"))
+        monkeypatch.setattr(settings, "WORKERS", 2)
+        with pytest.raises(RuntimeError, match="WORKERS=1"):
+            with TestClient(app):
+                pass
+
+    def test_lifespan_serves_socket(self, settings, tmp_path, monkeypatch):
+        path = str(tmp_path / "app.sock")
+        monkeypatch.setattr(settings, "SIDECAR_SOCKET", path)
+        with TestClient(app) as http:
+            with SidecarClient(path) as client:
+                client.score(TEXTS)
+            stats = http.get("/metrics").json()["sidecar"]
+        assert stats["requests"] >= 1
+        assert stats["running"] is True
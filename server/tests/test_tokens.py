@@ -0,0 +1,164 @@
+"""
+Tests for the vocabulary export and pre-tokenized input path.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import pytest
+from tf_keras.preprocessing.text import Tokenizer
+
+from app.classifier import classifier
+from app.tokens import (
+    VocabularyMismatchError,
+    VocabularyTokenizer,
+    decode_ids,
+    encode_ids,
+    export_vocabulary,
+    pack_sequences,
+    unpack_sequences,
+    vocabulary_fingerprint,
+)
+
+TEXTS = [
+    "Hello, WORLD!! what's up?",
+    "you are an idiot",
+    "",
+    "tabs\tand\nnewlines -- and unknownwordzz",
+]
+
+
+class TestVocabularyTokenizer:
+
+    def test_matches_server_tokenizer(self):
+        export = classifier.export_vocabulary()
+        replica = VocabularyTokenizer(export)
+        assert replica.texts_to_sequences(TEXTS) == (
+            classifier.tokenizer.texts_to_sequences(TEXTS)
+        )
+
+    def test_matches_with_oov_and_num_words(self):
+        tokenizer = Tokenizer(num_words=4, oov_token="<unk>")
+        tokenizer.fit_on_texts(["a a a b b c d e", "c d"])
+        replica = VocabularyTokenizer(export_vocabulary(tokenizer, "v"))
+        texts = ["a b c d e f", "E, A!"]
+        assert replica.texts_to_sequences(texts) == tokenizer.texts_to_sequences(texts)
+
+    def test_fingerprint_tracks_vocabulary(self):
+        first = Tokenizer()
+        first.fit_on_texts(["a b c"])
+        second = Tokenizer()
+        second.fit_on_texts(["a b c"])
+        assert vocabulary_fingerprint(first) == vocabulary_fingerprint(second)
+        second.fit_on_texts(["d"])
+        assert vocabulary_fingerprint(first) != vocabulary_fingerprint(second)
+
+
+class TestPayloads:
+
+    SEQUENCES = [[1, 2, 3], [], [19999], [5] * 10]
+
+    def test_packed_roundtrip(self):
+        assert unpack_sequences(pack_sequences(self.SEQUENCES)) == self.SEQUENCES
+
+    def test_base64_roundtrip(self):
+        ids, lengths = encode_ids(self.SEQUENCES)
+        assert decode_ids(ids, lengths) == self.SEQUENCES
+
+    def test_length_mismatch_rejected(self):
+        ids, _ = encode_ids(self.SEQUENCES)
+        with pytest.raises(ValueError):
+            decode_ids(ids, [1, 1])
+
+    def test_truncated_packed_rejected(self):
+        with pytest.raises(ValueError):
+            unpack_sequences(pack_sequences(self.SEQUENCES)[:-2])
+
+
+class TestScoreTokens:
+
+    def test_matches_text_scores(self):
+        sequences = classifier.tokenizer.texts_to_sequences(TEXTS)
+        by_text = classifier.score(TEXTS)
+        by_ids = classifier.score_tokens(sequences, classifier.vocab_version)
+        assert by_ids.tolist() == by_text.tolist()
+
+    def test_wrong_vocabulary_rejected(self):
+        with pytest.raises(VocabularyMismatchError):
+            classifier.score_tokens([[1, 2]], "0000000000000000")
+
+    def test_out_of_range_ids_rejected(self):
+        with pytest.raises(ValueError):
+            classifier.score_tokens([[10**9]], classifier.vocab_version)
+        with pytest.raises(ValueError):
+            classifier.score_tokens([[-1]], classifier.vocab_version)
+
+
+class TestTokenEndpoints:
+
+    def test_vocab_export(self, client):
+        response = client.get("/vocab")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["vocab_version"] == classifier.vocab_version
+        assert response.headers["etag"] == f'"{classifier.vocab_version}"'
+        assert data["word_index"]
+
+    def test_vocab_not_modified(self, client):
+        etag = client.get("/vocab").headers["etag"]
+        assert client.get("/vocab", headers={"If-None-Match": etag}).status_code == 304
+
+    def test_json_form_matches_predict(self, client):
+        replica = VocabularyTokenizer(client.get("/vocab").json())
+        ids, lengths = encode_ids(replica.texts_to_sequences(TEXTS))
+        response = client.post(
+            "/predict/tokens",
+            json={"vocab_version": replica.vocab_version, "ids": ids, "lengths": lengths},
+        )
+        assert response.status_code == 200
+        expected = client.post("/predict", json={"comments": TEXTS}).json()["results"]
+        results = response.json()["results"]
+        assert [r["scores"] for r in results] == [r["scores"] for r in expected]
+        assert all(r["text"] == "" for r in results)
+
+    def test_binary_form(self, client):
+        payload = pack_sequences(classifier.tokenizer.texts_to_sequences(TEXTS))
+        response = client.post(
+            "/predict/tokens?threshold=0.3",
+            content=payload,
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-Vocab-Version": classifier.vocab_version,
+            },
+        )
+        assert response.status_code == 200
+        assert len(response.json()["results"]) == len(TEXTS)
+
+    def test_binary_requires_version_header(self, client):
+        response = client.post(
+            "/predict/tokens",
+            content=pack_sequences([[1]]),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert response.status_code == 422
+
+    def test_stale_vocabulary_conflict(self, client):
+        ids, lengths = encode_ids([[1, 2]])
+        response = client.post(
+            "/predict/tokens",
+            json={"vocab_version": "stale", "ids": ids, "lengths": lengths},
+        )
+        assert response.status_code == 409
+        assert response.json()["detail"]["vocab_version"] == classifier.vocab_version
+
+    def test_invalid_payload(self, client):
+        response = client.post(
+            "/predict/tokens",
+            json={"vocab_version": classifier.vocab_version, "ids": "!!", "lengths": [1]},
+        )
+        assert response.status_code == 422
+
+    def test_empty_request_rejected(self, client):
+        response = client.post(
+            "/predict/tokens",
+            json={"vocab_version": classifier.vocab_version, "ids": "", "lengths": []},
+        )
+        assert response.status_code == 422
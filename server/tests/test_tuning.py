@@ -0,0 +1,71 @@
+"""
+Unit tests for the CPU runtime settings and autotuner helpers.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import argparse
+
+import pytest
+
+from app.config import Settings
+from app.tuning import candidates, pin_worker_cpus, recommend, write_profile
+
+
+def _result(throughput, p99, **config):
+    return {"throughput": throughput, "p99_ms": p99, **config}
+
+
+class TestRecommend:
+
+    def test_best_throughput_within_slo(self):
+        results = [_result(100, 50), _result(300, 120), _result(500, 400)]
+        best, met = recommend(results, slo_ms=200)
+        assert met is True
+        assert best["throughput"] == 300
+
+    def test_falls_back_to_lowest_p99(self):
+        results = [_result(100, 500), _result(300, 300)]
+        best, met = recommend(results, slo_ms=200)
+        assert met is False
+        assert best["p99_ms"] == 300
+
+
+class TestCandidates:
+
+    def test_skips_oversubscribed_configs(self, monkeypatch):
+        monkeypatch.setattr("os.sched_getaffinity", lambda pid: set(range(4)), raising=False)
+        args = argparse.Namespace(
+            intra=[1, 2, 4], inter=[1], workers=[1, 2, 4], batch_sizes=[32], pin=True
+        )
+        configs = candidates(args)
+        assert configs
+        for config in configs:
+            assert config["WORKERS"] * config["TF_INTRA_OP_THREADS"] <= 4
+            assert config["CPUS_PER_WORKER"] == config["TF_INTRA_OP_THREADS"]
+
+
+class TestProfile:
+
+    def test_profile_loads_into_settings(self, tmp_path):
+        best = _result(
+            550.0,
+            126.5,
+            TF_INTRA_OP_THREADS=2,
+            TF_INTER_OP_THREADS=1,
+            WORKERS=3,
+            INFERENCE_BATCH_SIZE=128,
+            CPUS_PER_WORKER=2,
+        )
+        path = tmp_path / "tuning.env"
+        write_profile(str(path), best, slo_ms=250, met=True)
+        loaded = Settings(_env_file=str(path))
+        assert loaded.WORKERS == 3
+        assert loaded.INFERENCE_BATCH_SIZE == 128
+        assert loaded.CPUS_PER_WORKER == 2
+
+
+class TestPinning:
+
+    def test_disabled_by_default(self, settings):
+        assert settings.CPUS_PER_WORKER == 0
+        assert pin_worker_cpus(0) is None
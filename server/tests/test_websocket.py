@@ -0,0 +1,79 @@
+"""
+Tests for the persistent WebSocket classification channel.
+Run with: cd server && python -m pytest tests/ -v
+"""
+
+import pytest
+from limits import parse
+from starlette.websockets import WebSocketDisconnect
+
+
+class TestWebSocketPredict:
+
+    def test_single_message(self, client):
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"id": 1, "comments": ["Hello world"], "threshold": 0.5})
+            reply = ws.receive_json()
+        assert reply["id"] == 1
+        assert reply["status"] == 200
+        assert len(reply["results"]) == 1
+        assert reply["results"][0]["severity"] in ("safe", "medium", "toxic")
+
+    def test_pipelined_messages_correlate(self, client):
+        with client.websocket_connect("/ws") as ws:
+            for i in range(5):
+                ws.send_json({"id": f"m{i}", "comments": ["a"] * (i + 1)})
+            replies = {r["id"]: r for r in (ws.receive_json() for _ in range(5))}
+        assert set(replies) == {f"m{i}" for i in range(5)}
+        for i in range(5):
+            assert len(replies[f"m{i}"]["results"]) == i + 1
+
+    def test_matches_http_results(self, client):
+        body = {"comments": ["You are an idiot", "Nice day"], "threshold": 0.5}
+        http = client.post("/predict", json=body).json()["results"]
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"id": 7, **body})
+            assert ws.receive_json()["results"] == http
+
+    def test_invalid_message(self, client):
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"id": 3, "comments": []})
+            reply = ws.receive_json()
+            assert reply["id"] == 3
+            assert reply["status"] == 422
+            ws.send_text("not json")
+            assert ws.receive_json()["status"] == 422
+
+    def test_http_requests_count_against_socket(self, client, settings):
+        allowed = parse(settings.RATE_LIMIT).amount
+        for _ in range(allowed - 2):
+            assert client.post("/predict", json={"comments": ["hi"]}).status_code == 200
+        with client.websocket_connect("/ws") as ws:
+            statuses = []
+            for i in range(3):
+                ws.send_json({"id": i, "comments": ["hi"]})
+                statuses.append(ws.receive_json()["status"])
+        assert statuses == [200, 200, 429]
+
+    def test_socket_messages_count_against_http(self, client, settings):
+        allowed = parse(settings.RATE_LIMIT).amount
+        with client.websocket_connect("/ws") as ws:
+            for i in range(allowed - 1):
+                ws.send_json({"id": i, "comments": ["hi"]})
+                assert ws.receive_json()["status"] == 200
+        assert client.post("/predict", json={"comments": ["hi"]}).status_code == 200
+        assert client.post("/predict", json={"comments": ["hi"]}).status_code == 429
+
+    def test_rejects_foreign_origin(self, client):
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect(
+                "/ws", headers={"Origin": "https://evil.example"}
+            ) as ws:
+                ws.receive_json()
+
+    def test_accepts_extension_origin(self, client):
+        with client.websocket_connect(
+            "/ws", headers={"Origin": "chrome-extension://abcdef"}
+        ) as ws:
+            ws.send_json({"id": 1, "comments": ["hi"]})
+            assert ws.receive_json()["status"] == 200
@@ -1,15 +1,19 @@
-import pickle
 import os
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.sequence import pad_sequences
+import sys
+
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
-# Resolve paths to root-level models/ directory
+# Reuse the server's inference engine (same model, tokenizer and score cache)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MODEL_PATH = os.path.join(BASE_DIR, "models", "tox_model.h5")
-TOKENIZER_PATH = os.path.join(BASE_DIR, "models", "tokenizer.pickle")
+sys.path.insert(0, os.path.join(BASE_DIR, "server"))
+
+from app.classifier import ToxicClassifier  # noqa: E402
+
+# Rows scored per model call in batch mode
+BATCH_CHUNK_SIZE = 1000
 
 # Page configuration
 st.set_page_config(
@@ -48,92 +52,200 @@ st.markdown("""
 
 # Load model and tokenizer
 @st.cache_resource
-def load_model_and_tokenizer():
-    model = load_model(MODEL_PATH)
-    with open(TOKENIZER_PATH, 'rb') as handle:
-        tokenizer = pickle.load(handle)
-    return model, tokenizer
+def load_classifier():
+    engine = ToxicClassifier()
+    engine.load()
+    return engine
 
-model, tokenizer = load_model_and_tokenizer()
+classifier = load_classifier()
+CATEGORIES = classifier.settings.CATEGORIES
 
 def predict_custom_comment(comment):
-    tokenized_comment = tokenizer.texts_to_sequences([comment])
-    padded_comment = pad_sequences(tokenized_comment, maxlen=100)
-    prediction = model.predict(padded_comment)
-    return {field: round(float(score), 4) for field, score in 
-            zip(["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"], prediction[0])}
+    prediction = classifier.score([comment])[0]
+    return {field: round(float(score), 4) for field, score in
+            zip(CATEGORIES, prediction)}
+
+@st.cache_data(show_spinner=False, max_entries=10_000)
+def score_chunk(texts, model_version):
+    """Score one chunk of comments; memoized across reruns per model version."""
+    return classifier.score(list(texts))
+
+def score_batch(texts):
+    """Score a whole upload in large chunks, updating a progress bar."""
+    progress = st.progress(0.0, text="Scoring comments...")
+    chunks = []
+    for start in range(0, len(texts), BATCH_CHUNK_SIZE):
+        chunk = tuple(texts[start:start + BATCH_CHUNK_SIZE])
+        chunks.append(score_chunk(chunk, classifier.fingerprint))
+        done = min(start + BATCH_CHUNK_SIZE, len(texts))
+        progress.progress(done / len(texts), text=f"Scored {done:,} / {len(texts):,} comments")
+    progress.empty()
+    return np.concatenate(chunks) if chunks else np.empty((0, len(CATEGORIES)))
+
+def classify_frame(texts, scores, threshold):
+    """Apply the server's 3-tier severity rules to a score matrix."""
+    flagged = (scores >= threshold).sum(axis=1)
+    severity = np.select([flagged == 0, flagged <= 2], ["safe", "medium"], "toxic")
+    df = pd.DataFrame(scores.round(4), columns=CATEGORIES)
+    df.insert(0, "text", texts)
+    df["flagged_categories"] = flagged
+    df["severity"] = severity
+    return df
 
 # Header section
 st.title("🛡️ Toxic Comment Analyzer")
 
 # Main interface
-col1, col2 = st.columns([2, 1])
-
-with col1:
-    custom_comment = st.text_area(
-        "Enter text for analysis:",
-        height=150,
-        placeholder="Type or paste your text here..."
-    )
-
-    if st.button("🔍 Analyze Text", use_container_width=True):
-        if custom_comment:
-            with st.spinner("Analyzing text..."):
-                prediction = predict_custom_comment(custom_comment)
+single_tab, batch_tab = st.tabs(["📝 Single Text", "📂 Batch File"])
+
+with single_tab:
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        custom_comment = st.text_area(
+            "Enter text for analysis:",
+            height=150,
+            placeholder="Type or paste your text here..."
+        )
+
+        if st.button("🔍 Analyze Text", use_container_width=True):
+            if custom_comment:
+                with st.spinner("Analyzing text..."):
+                    prediction = predict_custom_comment(custom_comment)
                 
-                # Convert predictions to DataFrame for visualization
-                df = pd.DataFrame({
-                    'Category': prediction.keys(),
-                    'Score': prediction.values()
-                })
+                    # Convert predictions to DataFrame for visualization
+                    df = pd.DataFrame({
+                        'Category': prediction.keys(),
+                        'Score': prediction.values()
+                    })
                 
-                # Create bar chart
-                fig = px.bar(
-                    df,
-                    x='Category',
-                    y='Score',
-                    color='Score',
-                    color_continuous_scale='RdYlBu_r',
-                    range_y=[0, 1]
-                )
-                fig.update_layout(
-                    title='Toxicity Analysis Results',
-                    xaxis_title='',
-                    yaxis_title='Probability Score',
-                    plot_bgcolor='white'
-                )
+                    # Create bar chart
+                    fig = px.bar(
+                        df,
+                        x='Category',
+                        y='Score',
+                        color='Score',
+                        color_continuous_scale='RdYlBu_r',
+                        range_y=[0, 1]
+                    )
+                    fig.update_layout(
+                        title='Toxicity Analysis Results',
+                        xaxis_title='',
+                        yaxis_title='Probability Score',
+                        plot_bgcolor='white'
+                    )
                 
-                st.plotly_chart(fig, use_container_width=True)
+                    st.plotly_chart(fig, use_container_width=True)
                 
-                # Display metrics for highest risk categories
-                st.subheader("Key Findings")
-                metrics = st.columns(3)
-                sorted_pred = sorted(prediction.items(), key=lambda x: x[1], reverse=True)
-                for i, (category, score) in enumerate(sorted_pred[:3]):
-                    with metrics[i]:
-                        st.metric(
-                            label=category.replace('_', ' ').title(),
-                            value=f"{score:.1%}"
-                        )
-        else:
-            st.error("Please enter some text to analyze.")
-
-with col2:
-    st.markdown("""
-    ### About the Categories
+                    # Display metrics for highest risk categories
+                    st.subheader("Key Findings")
+                    metrics = st.columns(3)
+                    sorted_pred = sorted(prediction.items(), key=lambda x: x[1], reverse=True)
+                    for i, (category, score) in enumerate(sorted_pred[:3]):
+                        with metrics[i]:
+                            st.metric(
+                                label=category.replace('_', ' ').title(),
+                                value=f"{score:.1%}"
+                            )
+            else:
+                st.error("Please enter some text to analyze.")
+
+    with col2:
+        st.markdown("""
+        ### About the Categories
     
-    - **Toxic**: General toxicity
-    - **Severe Toxic**: Extreme toxicity
-    - **Obscene**: Explicit content
-    - **Threat**: Threatening language
-    - **Insult**: Insulting content
-    - **Identity Hate**: Bias against identity groups
+        - **Toxic**: General toxicity
+        - **Severe Toxic**: Extreme toxicity
+        - **Obscene**: Explicit content
+        - **Threat**: Threatening language
+        - **Insult**: Insulting content
+        - **Identity Hate**: Bias against identity groups
     
-    ### How to Use
-    1. Enter or paste text in the input box
-    2. Click "Analyze Text"
-    3. View results in the interactive chart
-    4. Check detailed metrics below
+        ### How to Use
+        1. Enter or paste text in the input box
+        2. Click "Analyze Text"
+        3. View results in the interactive chart
+        4. Check detailed metrics below
     
-    > 💡 The scores range from 0 (safe) to 1 (high risk)
-    """)
+        > 💡 The scores range from 0 (safe) to 1 (high risk)
+        """)
+
+with batch_tab:
+    uploaded = st.file_uploader("Upload a CSV of comments:", type=["csv"])
+
+    if uploaded is not None:
+        comments_df = pd.read_csv(uploaded)
+        text_columns = list(comments_df.select_dtypes(include=["object", "string"]).columns)
+        if not text_columns:
+            st.error("The file has no text columns.")
+            st.stop()
+
+        column = st.selectbox("Comment column:", text_columns)
+        threshold = st.slider("Toxicity threshold:", 0.0, 1.0, 0.5, 0.05)
+
+        if st.button("🔍 Analyze File", use_container_width=True):
+            texts = comments_df[column].fillna("").astype(str).tolist()
+            st.session_state["batch"] = (uploaded.file_id, column, score_batch(texts))
+
+        batch = st.session_state.get("batch")
+        if batch and batch[:2] == (uploaded.file_id, column):
+            texts = comments_df[column].fillna("").astype(str).tolist()
+            results = classify_frame(texts, batch[2], threshold)
+
+            # Summary metrics over the whole file
+            counts = results["severity"].value_counts()
+            metrics = st.columns(4)
+            metrics[0].metric("Comments", f"{len(results):,}")
+            for col, level in zip(metrics[1:], ["toxic", "medium", "safe"]):
+                share = counts.get(level, 0) / max(len(results), 1)
+                col.metric(level.title(), f"{counts.get(level, 0):,}", f"{share:.1%}", delta_color="off")
+
+            chart1, chart2 = st.columns(2)
+            with chart1:
+                fig = px.pie(
+                    names=counts.index,
+                    values=counts.values,
+                    color=counts.index,
+                    color_discrete_map={"safe": "#2ecc71", "medium": "#f1c40f", "toxic": "#e74c3c"},
+                    title="Severity Distribution",
+                )
+                st.plotly_chart(fig, use_container_width=True)
+            with chart2:
+                rates = pd.DataFrame({
+                    'Category': CATEGORIES,
+                    'Flag Rate': (results[CATEGORIES] >= threshold).mean().values,
+                })
+                fig = px.bar(
+                    rates,
+                    x='Category',
+                    y='Flag Rate',
+                    color='Flag Rate',
+                    color_continuous_scale='RdYlBu_r',
+                    range_y=[0, 1],
+                    title='Share of Comments Flagged per Category',
+                )
+                fig.update_layout(xaxis_title='', plot_bgcolor='white')
+                st.plotly_chart(fig, use_container_width=True)
+
+            fig = px.histogram(
+                results[CATEGORIES].max(axis=1),
+                nbins=50,
+                title='Distribution of Highest Category Score',
+            )
+            fig.update_layout(xaxis_title='Score', yaxis_title='Comments', showlegend=False, plot_bgcolor='white')
+            st.plotly_chart(fig, use_container_width=True)
+
+            st.subheader("Most Toxic Comments")
+            worst = results.assign(max_score=results[CATEGORIES].max(axis=1))
+            st.dataframe(
+                worst.nlargest(20, "max_score").drop(columns="max_score"),
+                use_container_width=True,
+                hide_index=True,
+            )
+
+            st.download_button(
+                "⬇️ Download Results CSV",
+                results.to_csv(index=False).encode("utf-8"),
+                file_name="toxicity_results.csv",
+                mime="text/csv",
+            )